@@ -548,7 +548,7 @@ def start(debug=False, daemonize=True, args=[], skip_job_scheduler=False, port=N
         # cleanly
         print("Asking KA Lite job scheduler to terminate...")
         from fle_utils.chronograph.management.commands import cronserver_blocking
-        cronserver_blocking.shutdown = True
+        cronserver_blocking.stop()
         cron_thread.join()
         print("Job scheduler terminated.")
 
@@ -1,18 +1,24 @@
 from math import ceil
+import base64
 import datetime
 import json
 
 from django.conf import settings; logging = settings.LOG
 from django.utils.translation import ugettext as _
-from django.db.models import Q, Sum, Avg
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, Sum
+from django.http import StreamingHttpResponse
 
 from fle_utils.internet.classes import JsonResponse, JsonResponseMessage, JsonResponseMessageError
 
-from kalite.main.models import ExerciseLog, VideoLog, ContentLog, AttemptLog, UserLogSummary
+from kalite.main.models import ExerciseLog, VideoLog, ContentLog, AttemptLog, UserLogSummary, LearnerContentSummary, GroupDaySummary
 from kalite.facility.models import FacilityUser
 from kalite.shared.decorators.auth import require_admin
 from kalite.topic_tools.content_models import get_topic_contents, get_topic_nodes, get_leafed_topics, get_content_parents
 
+# Number of logs encoded at a time when streaming learner logs
+LOG_CHUNK_SIZE = 500
+
 
 def unique_by_id_and_kind_sort(seq):
     """
@@ -55,7 +61,7 @@ def get_learners_from_GET(request):
         # Do this to ensure that we never return more than one facility's worth of anything.
         learner_filter = Q(facility__pk__in=facility_ids)
 
-    return FacilityUser.objects.filter(learner_filter & Q(is_teacher=False)).order_by("last_name")
+    return FacilityUser.objects.filter(learner_filter & Q(is_teacher=False)).order_by("last_name", "pk")
 
 def return_log_type_details(log_type, topic_ids=None):
     fields = ["user", "points", "complete", "completion_timestamp", "completion_counter", "latest_activity_timestamp"]
@@ -82,15 +88,58 @@ def return_log_type_details(log_type, topic_ids=None):
         obj_ids = {}
     return LogModel, fields, id_field, obj_ids, objects
 
+def encode_cursor(learner):
+    """
+    An opaque token for the position of a learner in the (last_name, pk) ordering of get_learners_from_GET.
+    """
+    return base64.urlsafe_b64encode(json.dumps([learner.last_name, learner.pk]))
+
+
+def decode_cursor(cursor):
+    """
+    The (last_name, pk) a cursor was made from. Raises ValueError if it's not a cursor.
+    """
+    try:
+        last_name, pk = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError, UnicodeEncodeError):
+        raise ValueError("Invalid cursor %r" % cursor)
+    return last_name, pk
+
+
+def stream_json(data, streamed_key, items, trailer):
+    """
+    Write out a JSON object made of data, a list under streamed_key which is encoded a chunk of
+    items at a time, and whatever the trailer function returns once all items have been written.
+    """
+    prefix = json.dumps(data, cls=DjangoJSONEncoder)
+    yield "%s, %s: [" % (prefix[:-1], json.dumps(streamed_key))
+    chunk = []
+    separator = ""
+    for item in items:
+        chunk.append(json.dumps(item, cls=DjangoJSONEncoder))
+        if len(chunk) == LOG_CHUNK_SIZE:
+            yield separator + ", ".join(chunk)
+            separator = ", "
+            chunk = []
+    if chunk:
+        yield separator + ", ".join(chunk)
+    yield "], %s" % json.dumps(trailer(), cls=DjangoJSONEncoder)[1:]
+
+
 @require_admin
 def learner_logs(request):
+    """
+    Logs of one page of learners, along with the content items they're for.
+    Learners are ordered by last name; pass the next_cursor of one page as cursor to get the next.
+    The logs are streamed, and can be restricted to the fields listed in the fields parameter.
+    """
 
-    page = request.GET.get("page", 1)
+    limit = int(request.GET.get("limit", 50))
 
-    limit = request.GET.get("limit", 50)
+    cursor = request.GET.get("cursor")
 
     # Look back a week by default
-    time_window = request.GET.get("time_window", 7)
+    time_window = int(request.GET.get("time_window", 7))
 
     start_date = request.GET.get("start_date")
 
@@ -98,45 +147,74 @@ def learner_logs(request):
 
     topic_ids = json.loads(request.GET.get("topic_ids", "[]"))
 
+    requested_fields = request.GET.getlist("fields")
+
     learners = get_learners_from_GET(request)
 
-    pages = int(ceil(len(learners)/float(limit)))
+    pages = int(ceil(learners.count()/float(limit)))
 
-    if page*limit < len(learners):
+    if cursor:
+        try:
+            last_name, pk = decode_cursor(cursor)
+        except ValueError:
+            return JsonResponseMessageError(_("Invalid cursor."), status=400)
+        page = learners.filter(Q(last_name__lt=last_name) | Q(last_name=last_name, pk__lte=pk)).count()//limit + 1
+        learners = learners.filter(Q(last_name__gt=last_name) | Q(last_name=last_name, pk__gt=pk))[:limit + 1]
+    else:
+        page = int(request.GET.get("page", 1))
+        learners = learners[(page - 1)*limit: page*limit + 1]
 
-        learners = learners[(page - 1)*limit: page*limit]
+    # Fetch one more learner than we need, to know whether there is a next page.
+    learners = list(learners)
+    next_cursor = encode_cursor(learners[limit - 1]) if len(learners) > limit else None
+    learners = learners[:limit]
 
     log_types = request.GET.getlist("log_type", ["exercise", "video", "content"])
 
-    output_logs = []
-
-    output_objects = []
-
     end_date = datetime.datetime.strptime(end_date,'%Y/%m/%d') if end_date else datetime.datetime.now()
 
     start_date = datetime.datetime.strptime(start_date,'%Y/%m/%d') if start_date else end_date - datetime.timedelta(time_window)
 
+    log_querysets = []
+
+    output_objects = []
+
+    content_ids = set()
+
     for log_type in log_types:
         LogModel, fields, id_field, obj_ids, objects = return_log_type_details(log_type, topic_ids)
 
-        log_objects = LogModel.objects.filter(user__in=learners, **obj_ids).values(*fields)
+        if requested_fields:
+            # The tabular report needs to know whose log is for what, and when it was last active.
+            fields = [field for field in fields if field in requested_fields or field in ("user", id_field, "latest_activity_timestamp")]
+
+        log_querysets.append(LogModel.objects.filter(user__in=learners, **obj_ids).order_by("user", "pk").values(*fields))
+        if topic_ids:
+            output_objects.extend(objects)
+        else:
+            content_ids.update(LearnerContentSummary.objects.filter(
+                user__in=learners,
+                kind=log_type,
+                day__gte=start_date.date(),
+                day__lte=end_date.date()).values_list("content_id", flat=True).distinct())
+
+    logged_ids = set()
+
+    def logs():
+        for queryset in log_querysets:
+            for log in queryset.iterator():
+                if not topic_ids:
+                    logged_ids.add(log.get("exercise_id") or log.get("video_id") or log.get("content_id"))
+                yield log
+
+    def contents():
+        objects = output_objects
         if not topic_ids:
-            topic_objects = log_objects.filter(latest_activity_timestamp__gte=start_date, latest_activity_timestamp__lte=end_date)
-            if topic_objects.count() == 0:
-                topic_objects = log_objects
             # Can return multiple items with same id, due to topic tree redundancy, so make unique by id here.
-            objects = dict([(item.get("id"), item) for item in get_topic_nodes(ids=[obj[id_field] for obj in topic_objects]) or []]).values()
-        output_objects.extend(objects)
-        output_logs.extend(log_objects)
-
-    output_objects = unique_by_id_and_kind_sort(output_objects)
-
-    return JsonResponse({
-        # All learner log objects for each content item.
-        "logs": output_logs,
-        # All content items for which logs are being returned.
-        "contents": output_objects,
-        # Sometimes 'learners' gets collapsed to a list from the Queryset. This insures against that eventuality.
+            objects = dict([(item.get("id"), item) for item in get_topic_nodes(ids=list(content_ids or logged_ids)) or []]).values()
+        return {"contents": unique_by_id_and_kind_sort(objects)}
+
+    return StreamingHttpResponse(stream_json({
         "learners": [{
             "first_name": learner.first_name,
             "last_name": learner.last_name,
@@ -145,18 +223,39 @@ def learner_logs(request):
             } for learner in learners],
         "page": page,
         "pages": pages,
-        "limit": limit
-    })
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }, "logs", logs(), contents), content_type="application/json; charset=utf-8")
+
+def get_group_summary_filter(request):
+    """
+    Like get_learners_from_GET, but returns a filter on the GroupDaySummaries of those learners,
+    or None when the learners were picked individually rather than by group or facility.
+    """
+    if request.GET.getlist("user_id"):
+        return None
+
+    group_ids = request.GET.getlist("group_id")
+
+    facility_ids = request.GET.getlist("facility_id")
+
+    if group_ids:
+        if "Ungrouped" in group_ids and facility_ids:
+            return (Q(group__pk__in=group_ids) | Q(group__isnull=True)) & Q(facility__pk__in=facility_ids)
+        else:
+            return Q(group__pk__in=group_ids)
+    else:
+        return Q(facility__pk__in=facility_ids)
 
 @require_admin
 def aggregate_learner_logs(request):
 
     learners = get_learners_from_GET(request)
 
-    event_limit = request.GET.get("event_limit", 10)
+    event_limit = int(request.GET.get("event_limit", 10))
 
     # Look back a week by default
-    time_window = request.GET.get("time_window", 7)
+    time_window = int(request.GET.get("time_window", 7))
 
     start_date = request.GET.get("start_date")
 
@@ -169,8 +268,6 @@ def aggregate_learner_logs(request):
     # log_types = request.GET.getlist("log_type", ["exercise", "video", "content"])
     log_types = request.GET.getlist("log_type", ["exercise"])
 
-    output_logs = []
-
     output_dict = {
         "content_time_spent": 0,
         "exercise_attempts": 0,
@@ -186,71 +283,63 @@ def aggregate_learner_logs(request):
 
     start_date = datetime.datetime.strptime(start_date,'%Y/%m/%d') if start_date else end_date - datetime.timedelta(time_window)
 
-    number_content = 0
+    # Everything below is read from the summaries maintained as logs are saved, filed by day of latest activity.
+    summaries = LearnerContentSummary.objects.filter(
+        user__in=learners,
+        kind__in=log_types,
+        day__gte=start_date.date(),
+        day__lte=end_date.date())
 
-    all_object_ids = set()
+    all_object_ids = set(summaries.values_list("content_id", flat=True).distinct())
 
-    for log_type in log_types:
+    if topic_ids:
+        topic_filter = Q(pk__in=[])
+        for log_type in log_types:
+            _, _, _, _, objects = return_log_type_details(log_type, topic_ids)
+            topic_filter |= Q(kind=log_type, content_id__in=[obj.get("id") for obj in objects])
+        summaries = summaries.filter(topic_filter)
+
+    # Whole groups or facilities can be totalled from the group summaries, without touching each learner's.
+    group_filter = None if topic_ids else get_group_summary_filter(request)
+    if group_filter is not None:
+        totals = GroupDaySummary.totals_by_kind(GroupDaySummary.objects.filter(
+            group_filter,
+            kind__in=log_types,
+            day__gte=start_date.date(),
+            day__lte=end_date.date()))
+    else:
+        totals = GroupDaySummary.totals_by_kind_from_learners(summaries)
+
+    for kind, total in totals.iteritems():
+        output_dict["total_complete"] += total.complete
+        output_dict["total_struggling"] += total.struggling
+        output_dict["total_in_progress"] += total.in_progress
+        output_dict["content_time_spent"] += total.time_spent
+        if kind == "exercise" and total.logs:
+            output_dict["exercise_attempts"] = total.logs
+            output_dict["exercise_mastery"] = round(total.progress / total.logs)
+
+    number_content = summaries.values("kind", "content_id").distinct().count()
 
-        LogModel, fields, id_field, obj_ids, objects = return_log_type_details(log_type, topic_ids)   
-
-        log_objects = LogModel.objects.filter(
-            user__in=learners,
-            latest_activity_timestamp__gte=start_date,
-            latest_activity_timestamp__lte=end_date, **obj_ids).order_by("-latest_activity_timestamp")
-
-        number_content += len(set(log_objects.values_list(id_field, flat=True)))
-
-        output_dict["total_complete"] += log_objects.filter(complete=True).count()
-        if log_type == "video":
-            output_dict["total_in_progress"] += log_objects.filter(complete=False).count()
-            output_dict["content_time_spent"] += log_objects.aggregate(Sum("total_seconds_watched"))["total_seconds_watched__sum"] or 0
-        elif log_type == "content":
-            output_dict["total_in_progress"] += log_objects.filter(complete=False).count()
-            output_dict["content_time_spent"] += log_objects.aggregate(Sum("time_spent"))["time_spent__sum"] or 0
-        elif log_type == "exercise":
-            output_dict["total_struggling"] += log_objects.filter(struggling=True).count()
-            output_dict["total_in_progress"] += log_objects.filter(complete=False, struggling=False).count()
-            
-            # Summarize struggling, in progress, and completed
-            output_dict["exercise_attempts"] += output_dict["total_struggling"] + output_dict["total_complete"] + output_dict["total_in_progress"]
-            # The below doesn't filter correctly, suspecting either bad
-            # AttemptLog generated in generaterealdata or because timestamp
-            # isn't correctly updated
-            # output_dict["exercise_attempts"] = AttemptLog.objects.filter(user__in=learners,
-            #     timestamp__gte=start_date,
-            #     timestamp__lte=end_date, **obj_ids).count()
-            if log_objects.aggregate(Avg("streak_progress"))["streak_progress__avg"] is not None:
-                output_dict["exercise_mastery"] = round(log_objects.aggregate(Avg("streak_progress"))["streak_progress__avg"])
-        output_logs.extend(log_objects)
-
-        object_buffer = LogModel.objects.filter(
-            user__in=learners,
-            latest_activity_timestamp__gte=start_date,
-            latest_activity_timestamp__lte=end_date).values_list(id_field, flat=True)
-
-        if len(object_buffer) > 1:
-            all_object_ids.update(object_buffer)
-        elif len(object_buffer) == 1:
-            all_object_ids.add(object_buffer)
     if len(all_object_ids) > 0:
         output_dict["available_topics"] = map(lambda x: {"id": x.get("id"), "title": x.get("title")}, get_content_parents(ids=list(all_object_ids)))
-    output_dict["total_not_attempted"] = number_content*len(learners) - (
+    output_dict["total_not_attempted"] = number_content*learners.count() - (
         output_dict["total_complete"] + output_dict["total_struggling"] + output_dict["total_in_progress"])
     # Report total time in hours
     output_dict["content_time_spent"] = round(output_dict["content_time_spent"]/3600.0,1)
-    output_logs.sort(key=lambda x: x.latest_activity_timestamp, reverse=True)
+
+    learner_events = summaries.select_related("user").order_by("-latest_activity_timestamp")[:event_limit]
 
     learner_event_objects = dict([(item["id"], item) for item in get_topic_nodes(
-        ids=[getattr(log, "exercise_id", getattr(log, "video_id", getattr(log, "content_id", ""))) for log in output_logs[:event_limit]], language=request.language) or []])
+        ids=[summary.content_id for summary in learner_events], language=request.language) or []])
 
     output_dict["learner_events"] = [{
-        "learner": log.user.get_name(),
-        "complete": log.complete,
-        "struggling": getattr(log, "struggling", None),
-        "progress": getattr(log, "streak_progress", getattr(log, "progress", None)),
-        "content": learner_event_objects.get(getattr(log, "exercise_id", getattr(log, "video_id", getattr(log, "content_id", ""))), {}),
-        } for log in output_logs[:event_limit]]
+        "learner": summary.user.get_name(),
+        "complete": summary.complete,
+        "struggling": summary.struggling if summary.kind == "exercise" else None,
+        "progress": summary.progress,
+        "content": learner_event_objects.get(summary.content_id, {}),
+        } for summary in learner_events]
     output_dict["total_time_logged"] = round((UserLogSummary.objects\
         .filter(user__in=learners, start_datetime__gte=start_date, start_datetime__lte=end_date)\
         .aggregate(Sum("total_seconds")).get("total_seconds__sum") or 0)/3600.0, 1)
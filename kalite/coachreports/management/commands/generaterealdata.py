@@ -32,6 +32,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
 from fle_utils.general import datediff
+from kalite.distributed.sqlite import single_writer
 from kalite.facility.models import Facility, FacilityUser, FacilityGroup
 from kalite.main.models import ExerciseLog, VideoLog, UserLog, AttemptLog
 from kalite.topic_tools.content_models import get_topic_contents
@@ -504,7 +505,7 @@ class Command(BaseCommand):
         handler = self.choose_handler(*args, **options)
 
         if options["in_transaction"]:
-            with transaction.commit_on_success():
+            with single_writer(), transaction.commit_on_success():
                 handler(*args, **options)
         else:
             handler(*args, **options)
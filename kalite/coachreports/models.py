@@ -1,5 +1,6 @@
 """Classes used by the student progress tastypie API"""
 import json
+from collections import Counter, defaultdict
 from fle_utils.config.models import Settings
 
 from django.conf import settings
@@ -9,7 +10,47 @@ from django.utils.translation import ugettext as _
 
 from kalite.facility.models import FacilityUser
 from kalite.main.models import ExerciseLog, VideoLog
-from kalite.topic_tools.content_models import get_topic_node, get_content_parents, get_topic_contents, get_content_item,  get_topic_nodes
+from kalite.topic_tools import settings as topic_settings
+from kalite.topic_tools.connections import file_signature
+from kalite.topic_tools.content_models import get_topic_node, get_content_parents, get_content_item,  get_topic_nodes
+from kalite.topic_tools.content_models import get_playlist_entries as get_playlist_entries_from_db
+
+
+playlist_entries = {}
+def get_playlist_entries(channel=topic_settings.CHANNEL, language="en"):
+    """Return lookup tables between playlists and the videos and exercises in them.
+
+    Returns a dictionary with:
+    playlists -- playlist ids to a tuple of the sets of their video ids and exercise ids
+    content_playlists -- video and exercise ids to the set of ids of the playlists they're in
+    parents -- video and exercise ids to the set of ids of the playlists they're direct children of
+
+    The tables are built from a single query, and kept in memory until the content database changes.
+    """
+
+    path = topic_settings.CONTENT_DATABASE_PATH.format(channel=channel, language=language)
+    version = file_signature(path)
+    cached_version, tables = playlist_entries.get(path, (None, None))
+    if tables is not None and cached_version == version:
+        return tables
+
+    playlists = {}
+    content_playlists = {}
+    parents = {}
+    for playlist_id, content_id, kind, is_parent in get_playlist_entries_from_db(channel=channel, language=language) or []:
+        pl_video_ids, pl_exercise_ids = playlists.setdefault(playlist_id, (set(), set()))
+        (pl_video_ids if kind == "Video" else pl_exercise_ids).add(content_id)
+        content_playlists.setdefault(content_id, set()).add(playlist_id)
+        if is_parent:
+            parents.setdefault(content_id, set()).add(playlist_id)
+
+    tables = {
+        "playlists": playlists,
+        "content_playlists": content_playlists,
+        "parents": parents,
+    }
+    playlist_entries[path] = (version, tables)
+    return tables
 
 
 class PlaylistProgressParent:
@@ -18,25 +59,26 @@ class PlaylistProgressParent:
     @classmethod
     def get_playlist_entry_ids(cls, playlist):
         """Return a tuple of the playlist's video ids and exercise ids as sets"""
-        items = get_topic_contents(topic_id=playlist.get("id"))
-        pl_video_ids = set([item.get("id") for item in items if item.get("kind") == "Video"])
-        pl_exercise_ids = set([item.get("id") for item in items if item.get("kind") == "Exercise"])
-        return (pl_video_ids, pl_exercise_ids)
+        return get_playlist_entries()["playlists"].get(playlist.get("id"), (set(), set()))
 
     @classmethod
-    def get_user_logs(cls, user, pl_video_ids=None, pl_exercise_ids=None):
-        user_ex_logs = list(ExerciseLog.objects \
-            .filter(user=user) \
-            .values("exercise_id", "complete", "points", "attempts", "streak_progress", "struggling", "completion_timestamp"))
-        user_vid_logs = list(VideoLog.objects \
-            .filter(user=user) \
-            .values("video_id", "complete", "total_seconds_watched", "points", "completion_timestamp"))
+    def get_user_logs(cls, users, pl_video_ids=None, pl_exercise_ids=None):
+        """Return a dictionary of user ids to a tuple of the user's video logs and exercise logs,
+        keyed by video id and exercise id. Logs can be restricted to the ids of a playlist's entries."""
+        ex_logs = ExerciseLog.objects.filter(user__in=users)
+        vid_logs = VideoLog.objects.filter(user__in=users)
 
-        if pl_video_ids and pl_exercise_ids:
-            user_ex_logs = [ex_log for ex_log in user_ex_logs if ex_log.get("exercise_id") in pl_exercise_ids]
-            user_vid_logs = [vid_log for vid_log in user_vid_logs if vid_log.get("video_id") in pl_video_ids]
+        if pl_video_ids is not None and pl_exercise_ids is not None:
+            ex_logs = ex_logs.filter(exercise_id__in=pl_exercise_ids)
+            vid_logs = vid_logs.filter(video_id__in=pl_video_ids)
 
-        return (user_vid_logs, user_ex_logs)
+        user_logs = dict((getattr(user, "id", user), ({}, {})) for user in users)
+        for vid_log in vid_logs.values("user", "video_id", "complete", "total_seconds_watched", "points", "completion_timestamp"):
+            user_logs[vid_log["user"]][0][vid_log["video_id"]] = vid_log
+        for ex_log in ex_logs.values("user", "exercise_id", "complete", "points", "attempts", "streak_progress", "struggling", "completion_timestamp"):
+            user_logs[ex_log["user"]][1][ex_log["exercise_id"]] = ex_log
+
+        return user_logs
 
 
 class PlaylistProgress(PlaylistProgressParent):
@@ -51,87 +93,135 @@ class PlaylistProgress(PlaylistProgressParent):
         """
         Return a list of PlaylistProgress objects associated with the user.
         """
+        FacilityUser.objects.get(id=user_id)  # Raise if the user doesn't exist
+        return cls.group_progress([user_id], language=language)[user_id]
+
+    @classmethod
+    def group_progress(cls, user_ids, language=None):
+        """
+        Return a dictionary of user ids to the list of PlaylistProgress objects associated with each user.
+        Each user's logs are bucketed into the playlists they fall under in a single pass,
+        and all users share the queries for logs and playlists.
+        """
 
         if not language:
             language = Settings.get("default_language") or settings.LANGUAGE_CODE
 
-        user = FacilityUser.objects.get(id=user_id)
-
-        # Retrieve video, exercise, and quiz logs that appear in this playlist
-        user_vid_logs, user_ex_logs = cls.get_user_logs(user)
+        entries = get_playlist_entries()
+
+        # Retrieve video, exercise, and quiz logs
+        user_logs = cls.get_user_logs(user_ids)
+
+        # Count the logs in each playlist, and find the playlists for which each user has at least one data point
+        user_stats = {}
+        user_playlist_ids = {}
+        for user_id, (user_vid_logs, user_ex_logs) in user_logs.iteritems():
+            stats = user_stats[user_id] = defaultdict(Counter)
+            playlist_ids = user_playlist_ids[user_id] = set()
+
+            for video_id, vid_log in user_vid_logs.iteritems():
+                playlist_ids.update(entries["parents"].get(video_id, ()))
+                for playlist_id in entries["content_playlists"].get(video_id, ()):
+                    if vid_log["complete"]:
+                        stats[playlist_id]["n_vid_complete"] += 1
+                    elif vid_log["total_seconds_watched"] > 0:
+                        stats[playlist_id]["n_vid_started"] += 1
+
+            for exercise_id, ex_log in user_ex_logs.iteritems():
+                playlist_ids.update(entries["parents"].get(exercise_id, ()))
+                for playlist_id in entries["content_playlists"].get(exercise_id, ()):
+                    stats[playlist_id]["n_ex_mastered"] += bool(ex_log["complete"])
+                    stats[playlist_id]["n_ex_started"] += ex_log["attempts"] > 0
+                    stats[playlist_id]["n_ex_incomplete"] += ex_log["attempts"] > 0 and not ex_log["complete"]
+                    stats[playlist_id]["n_ex_struggling"] += bool(ex_log["struggling"])
+
+        # Build a list of playlists for which any user has at least one data point
+        logged_ids = set()
+        for user_vid_logs, user_ex_logs in user_logs.itervalues():
+            logged_ids.update(user_vid_logs, user_ex_logs)
+        playlists = get_content_parents(ids=list(logged_ids), language=language)
 
-        exercise_ids = list(set([ex_log["exercise_id"] for ex_log in user_ex_logs]))
-        video_ids = list(set([vid_log["video_id"] for vid_log in user_vid_logs]))
+        # Store stats for each playlist
+        progress = dict((user_id, []) for user_id in user_ids)
+        seen_playlist_ids = set()
+        for p in playlists or []:
+            # The same playlist can appear in several places in the topic tree, so make unique by id here.
+            if p.get("id") in seen_playlist_ids:
+                continue
+            seen_playlist_ids.add(p.get("id"))
 
-        # Build a list of playlists for which the user has at least one data point
-        user_playlists = get_content_parents(ids=exercise_ids+video_ids, language=language)
+            try:
+                url = reverse("view_playlist", kwargs={"playlist_id": p.get("id")})
+            except NoReverseMatch:
+                url = reverse("learn") + p.get("path")
 
-        # Store stats for each playlist
-        user_progress = list()
-        for i, p in enumerate(user_playlists):
             # Playlist entry totals
-            pl_video_ids, pl_exercise_ids = cls.get_playlist_entry_ids(p)
+            pl_video_ids, pl_exercise_ids = entries["playlists"].get(p.get("id"), ((), ()))
             n_pl_videos = float(len(pl_video_ids))
             n_pl_exercises = float(len(pl_exercise_ids))
 
-            # Vid & exercise logs in this playlist
-            pl_ex_logs = [ex_log for ex_log in user_ex_logs if ex_log["exercise_id"] in pl_exercise_ids]
-            pl_vid_logs = [vid_log for vid_log in user_vid_logs if vid_log["video_id"] in pl_video_ids]
-
-            # Compute video stats
-            n_vid_complete = len([vid for vid in pl_vid_logs if vid["complete"]])
-            n_vid_started = len([vid for vid in pl_vid_logs if (vid["total_seconds_watched"] > 0) and (not vid["complete"])])
-            vid_pct_complete = int(float(n_vid_complete) / n_pl_videos * 100) if n_pl_videos else 0
-            vid_pct_started = int(float(n_vid_started) / n_pl_videos * 100) if n_pl_videos else 0
-            if vid_pct_complete == 100:
-                vid_status = "complete"
-            elif n_vid_started > 0:
-                vid_status = "inprogress"
-            else:
-                vid_status = "notstarted"
-
-            # Compute exercise stats
-            n_ex_mastered = len([ex for ex in pl_ex_logs if ex["complete"]])
-            n_ex_started = len([ex for ex in pl_ex_logs if ex["attempts"] > 0])
-            n_ex_incomplete = len([ex for ex in pl_ex_logs if (ex["attempts"] > 0 and not ex["complete"])])
-            n_ex_struggling = len([ex for ex in pl_ex_logs if ex["struggling"]])
-            ex_pct_mastered = int(float(n_ex_mastered) / (n_pl_exercises or 1) * 100)
-            ex_pct_incomplete = int(float(n_ex_incomplete) / (n_pl_exercises or 1) * 100)
-            ex_pct_struggling = int(float(n_ex_struggling) / (n_pl_exercises or 1) * 100)
-            if not n_ex_started:
-                ex_status = "notstarted"
-            elif ex_pct_struggling > 0:
-                # note: we want to help students prioritize areas they need to focus on
-                # therefore if they are struggling in this exercise group, we highlight it for them
-                ex_status = "struggling"
-            elif ex_pct_mastered < 99:
-                ex_status = "inprogress"
-            else:
-                ex_status = "complete"
-
-            progress = {
-                "title": p.get("title"),
-                "id": p.get("id"),
-                "tag": p.get("tag"),
-                "vid_pct_complete": vid_pct_complete,
-                "vid_pct_started": vid_pct_started,
-                "vid_status": vid_status,
-                "ex_pct_mastered": ex_pct_mastered,
-                "ex_pct_incomplete": ex_pct_incomplete,
-                "ex_pct_struggling": ex_pct_struggling,
-                "ex_status": ex_status,
-                "n_pl_videos": n_pl_videos,
-                "n_pl_exercises": n_pl_exercises,
-            }
-
-            try:
-                progress["url"] = reverse("view_playlist", kwargs={"playlist_id": p.get("id")})
-            except NoReverseMatch:
-                progress["url"] = reverse("learn") + p.get("path")
+            for user_id in user_ids:
+                if p.get("id") not in user_playlist_ids[user_id]:
+                    continue
+                progress[user_id].append(cls(**cls._playlist_stats(
+                    user_stats[user_id][p.get("id")],
+                    n_pl_videos,
+                    n_pl_exercises,
+                    title=p.get("title"),
+                    id=p.get("id"),
+                    tag=p.get("tag"),
+                    url=url,
+                )))
+
+        return progress
 
-            user_progress.append(cls(**progress))
-
-        return user_progress
+    @classmethod
+    def _playlist_stats(cls, counts, n_pl_videos, n_pl_exercises, **progress):
+        """Turn counts of a user's logs in a playlist into the progress shown for it."""
+
+        # Compute video stats
+        n_vid_complete = counts["n_vid_complete"]
+        n_vid_started = counts["n_vid_started"]
+        vid_pct_complete = int(float(n_vid_complete) / n_pl_videos * 100) if n_pl_videos else 0
+        vid_pct_started = int(float(n_vid_started) / n_pl_videos * 100) if n_pl_videos else 0
+        if vid_pct_complete == 100:
+            vid_status = "complete"
+        elif n_vid_started > 0:
+            vid_status = "inprogress"
+        else:
+            vid_status = "notstarted"
+
+        # Compute exercise stats
+        n_ex_mastered = counts["n_ex_mastered"]
+        n_ex_started = counts["n_ex_started"]
+        n_ex_incomplete = counts["n_ex_incomplete"]
+        n_ex_struggling = counts["n_ex_struggling"]
+        ex_pct_mastered = int(float(n_ex_mastered) / (n_pl_exercises or 1) * 100)
+        ex_pct_incomplete = int(float(n_ex_incomplete) / (n_pl_exercises or 1) * 100)
+        ex_pct_struggling = int(float(n_ex_struggling) / (n_pl_exercises or 1) * 100)
+        if not n_ex_started:
+            ex_status = "notstarted"
+        elif ex_pct_struggling > 0:
+            # note: we want to help students prioritize areas they need to focus on
+            # therefore if they are struggling in this exercise group, we highlight it for them
+            ex_status = "struggling"
+        elif ex_pct_mastered < 99:
+            ex_status = "inprogress"
+        else:
+            ex_status = "complete"
+
+        progress.update({
+            "vid_pct_complete": vid_pct_complete,
+            "vid_pct_started": vid_pct_started,
+            "vid_status": vid_status,
+            "ex_pct_mastered": ex_pct_mastered,
+            "ex_pct_incomplete": ex_pct_incomplete,
+            "ex_pct_struggling": ex_pct_struggling,
+            "ex_status": ex_status,
+            "n_pl_videos": n_pl_videos,
+            "n_pl_exercises": n_pl_exercises,
+        })
+        return progress
 
 class PlaylistProgressDetail(PlaylistProgressParent):
     """Detailed progress on a specific playlist for a specific user"""
@@ -156,7 +246,7 @@ class PlaylistProgressDetail(PlaylistProgressParent):
         pl_video_ids, pl_exercise_ids = cls.get_playlist_entry_ids(playlist)
 
         # Retrieve video, exercise, and quiz logs that appear in this playlist
-        user_vid_logs, user_ex_logs = cls.get_user_logs(user, pl_video_ids, pl_exercise_ids)
+        user_vid_logs, user_ex_logs = cls.get_user_logs([user], pl_video_ids, pl_exercise_ids)[user.id]
 
         # Finally, sort an ordered list of the playlist entries, with user progress
         # injected where it exists.
@@ -169,7 +259,7 @@ class PlaylistProgressDetail(PlaylistProgressParent):
             score = 0
 
             if kind == "Video":
-                vid_log = next((vid_log for vid_log in user_vid_logs if vid_log["video_id"] == entity_id), None)
+                vid_log = user_vid_logs.get(entity_id)
                 if vid_log:
                     if vid_log.get("complete"):
                         status = "complete"
@@ -179,7 +269,7 @@ class PlaylistProgressDetail(PlaylistProgressParent):
                     score = int(float(vid_log.get("points")) / float(750) * 100)
 
             elif kind == "Exercise":
-                ex_log = next((ex_log for ex_log in user_ex_logs if ex_log["exercise_id"] == entity_id), None)
+                ex_log = user_ex_logs.get(entity_id)
                 if ex_log:
                     if ex_log.get("struggling"):
                         status = "struggling"
@@ -52,6 +52,7 @@ var CoachReportModel = Backbone.Model.extend({
         this.start_date = options.start_date;
         this.end_date = options.end_date;
         this.topic_ids = options.topic_ids;
+        this.cursor = options.cursor;
     },
 
     url: function() {
@@ -60,7 +61,8 @@ var CoachReportModel = Backbone.Model.extend({
             group_id: this.group,
             start_date: this.start_date,
             end_date: normalizeEndDate(this.end_date),
-            topic_ids: this.topic_ids
+            topic_ids: this.topic_ids,
+            cursor: this.cursor
         });
     }
 });
@@ -374,31 +374,48 @@ var TabularReportView = BaseView.extend({
         // Retrieve a single instance of this.model to be accessed by tabular_reports.views
         var main_coachreport_model = $("html").data("main_coachreport_model");
         var self = this;
-        this.data_model = new Models.CoachReportModel({
+        var options = {
             facility: this.model.get("facility"),
             group: this.model.get("group"),
             start_date: date_string(main_coachreport_model.get("start_date")),
             end_date: date_string(main_coachreport_model.get("end_date")),
             topic_ids: this.model.get("topic_ids")
-        });
-        if (this.model.get("facility")) {
-            this.data_model.fetch().then(function() {
-                self.learners = new Backbone.Collection(self.data_model.get("learners"));
-                self.contents = new Backbone.Collection(self.data_model.get("contents"));
-                if (self.learners.length > 0) {
-                    self.learners.each(function(model){
-                        model.set("logs", _.object(
-                            _.map(_.filter(self.data_model.get("logs"), function(log) {
-                                return log.user === model.get("pk") && new Date(log.latest_activity_timestamp) >= main_coachreport_model.get("start_date") && new Date(log.latest_activity_timestamp) <= main_coachreport_model.get("end_date");
-                            }), function(item) {
-                                return [item.exercise_id || item.video_id || item.content_id, item];
-                            })));
-                    });
-                    self.render();
-                } else {
-                    self.no_user_error();
-                }
+        };
+        var learners = new Backbone.Collection();
+        var contents = new Backbone.Collection();
+        var data_model = this.data_model = new Models.CoachReportModel(options);
+
+        // Learner logs are paginated, so fetch one page after another, each one picking up where the last left off.
+        var add_page = function() {
+            if (self.data_model !== data_model) {
+                // The report has changed since, so this is no longer wanted.
+                return;
+            }
+            contents.add(data_model.get("contents"));
+            _.each(data_model.get("learners"), function(learner) {
+                var model = new Backbone.Model(learner);
+                model.set("logs", _.object(
+                    _.map(_.filter(data_model.get("logs"), function(log) {
+                        return log.user === learner.pk && new Date(log.latest_activity_timestamp) >= main_coachreport_model.get("start_date") && new Date(log.latest_activity_timestamp) <= main_coachreport_model.get("end_date");
+                    }), function(item) {
+                        return [item.exercise_id || item.video_id || item.content_id, item];
+                    })));
+                learners.add(model);
             });
+            if (data_model.get("next_cursor")) {
+                data_model = self.data_model = new Models.CoachReportModel(_.extend({cursor: data_model.get("next_cursor")}, options));
+                data_model.fetch().then(add_page);
+            } else if (learners.length > 0) {
+                self.learners = learners;
+                self.contents = contents;
+                self.render();
+            } else {
+                self.no_user_error();
+            }
+        };
+
+        if (this.model.get("facility")) {
+            data_model.fetch().then(add_page);
         }
     },
 
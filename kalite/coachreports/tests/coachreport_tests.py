@@ -1,3 +1,4 @@
+import datetime
 import json
 import urllib
 import peewee
@@ -13,9 +14,14 @@ from kalite.testing.mixins.facility_mixins import FacilityMixins
 from kalite.testing.mixins.student_progress_mixins import StudentProgressMixin
 from kalite.topic_tools.content_models import get_content_parents, Item, set_database, create
 from kalite.i18n.api_views import set_default_language
+from kalite.coachreports.models import PlaylistProgress
 from django.test.utils import override_settings
 
 
+def streamed_json(response):
+    return json.loads("".join(response.streaming_content))
+
+
 class ExternalAPITests(FacilityMixins,
                        StudentProgressMixin,
                        CreateZoneMixin,
@@ -86,7 +92,7 @@ class InternalAPITests(FacilityMixins,
     def test_learner_log_endpoint(self):
         response_keys = ["logs","contents","learners","page","pages","limit"]
         self.client.login(username='admin', password='admin')
-        api_resp = json.loads(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)).content)
+        api_resp = streamed_json(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)))
         for key in response_keys:
             assert key in api_resp, "{key} not found in learner log API response".format(key)
         self.client.logout()
@@ -113,6 +119,25 @@ class InternalAPITests(FacilityMixins,
             assert key in api_resp, "{key} not found in learner log API response".format(key)
         self.client.logout()
 
+    def test_aggregate_endpoint_totals(self):
+        self.student = self.create_student(username="student2", facility=self.facility)
+        for exercise_id, streak_progress in [("a", 100), ("b", 40)]:
+            log = self.create_exercise_log(user=self.student, exercise_id=exercise_id)
+            log.streak_progress = streak_progress
+            log.latest_activity_timestamp = datetime.datetime.now()
+            log.save()
+
+        self.client.login(username='admin', password='admin')
+        # Totals for the facility come from group summaries, and for a single learner from their own summaries
+        for learner_filter in ["facility_id=%s" % self.facility.id, "user_id=%s" % self.student.id]:
+            api_resp = json.loads(self.client.get("%s?%s" % (self.reverse("aggregate_learner_logs"), learner_filter)).content)
+            self.assertEqual(api_resp["total_complete"], 1)
+            self.assertEqual(api_resp["total_in_progress"], 1)
+            self.assertEqual(api_resp["exercise_attempts"], 2)
+            self.assertEqual(api_resp["exercise_mastery"], 70)
+            self.assertEqual(len(api_resp["learner_events"]), 2)
+        self.client.logout()
+
 class PlaylistProgressResourceTestCase(FacilityMixins, StudentProgressMixin, KALiteClientTestCase):
 
     @set_database
@@ -156,6 +181,20 @@ class PlaylistProgressResourceTestCase(FacilityMixins, StudentProgressMixin, KAL
         #checking if the returned list is accurate
         self.assertEqual(exercises[0]["title"], self.exercise1.title)
 
+    def test_group_progress(self):
+        self.ex_logs.streak_progress = 100
+        self.ex_logs.attempts = 10
+        self.ex_logs.save()
+        other_student = self.create_student(username="other_student")
+
+        progress = PlaylistProgress.group_progress([self.student.id, other_student.id])
+
+        self.assertEqual([playlist.id for playlist in progress[self.student.id]], [self.topic1.id])
+        self.assertEqual(progress[self.student.id][0].n_pl_exercises, 1)
+        self.assertEqual(progress[self.student.id][0].ex_pct_mastered, 100)
+        self.assertEqual(progress[self.student.id][0].ex_status, "complete")
+        self.assertEqual(progress[other_student.id], [])
+
     @patch('kalite.coachreports.models.get_content_parents')
     def test_playlist_progress_language(self, mocked_get_content_parents):
         """
@@ -260,36 +299,67 @@ class LearnerLogAPITests(FacilityMixins,
     def test_learner_log_topic_filters(self):
 
         self.client.login(username='admin', password='admin')
-        api_resp_1 = json.loads(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)).content)
-        api_resp_2 = json.loads(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))).content)
+        api_resp_1 = streamed_json(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)))
+        api_resp_2 = streamed_json(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))))
         assert len(api_resp_2["contents"]) < len(api_resp_1["contents"])
 
     def test_learner_log_topic_filters_contents_length(self):
 
         self.client.login(username='admin', password='admin')
-        api_resp_2 = json.loads(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))).content)
+        api_resp_2 = streamed_json(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))))
         assert len(api_resp_2["contents"]) == 1
 
     def test_learner_log_topic_filters_contents_id(self):
 
         self.client.login(username='admin', password='admin')
-        api_resp_2 = json.loads(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))).content)
+        api_resp_2 = streamed_json(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))))
         assert api_resp_2["contents"][0]["id"] == self.exercise1.id
 
     def test_learner_log_contents(self):
 
         self.client.login(username='admin', password='admin')
-        api_resp_1 = json.loads(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)).content)
+        api_resp_1 = streamed_json(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)))
         assert len(api_resp_1["contents"]) == 2
 
     def test_learner_log_logs(self):
 
         self.client.login(username='admin', password='admin')
-        api_resp_1 = json.loads(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)).content)
+        api_resp_1 = streamed_json(self.client.get("%s?facility_id=%s" % (self.reverse("learner_logs"), self.facility.id)))
         assert len(api_resp_1["logs"]) == 2
 
     def test_learner_log_log_contents(self):
 
         self.client.login(username='admin', password='admin')
-        api_resp_2 = json.loads(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))).content)
+        api_resp_2 = streamed_json(self.client.get("%s?facility_id=%s&topic_ids=%s" % (self.reverse("learner_logs"), self.facility.id, json.dumps([self.topic1.id]))))
         assert api_resp_2["logs"][0]["exercise_id"] == self.exercise1.id
+
+    def test_learner_log_pagination(self):
+        for idx in range(4):
+            self.create_student(username="student%d" % idx, facility=self.facility)
+
+        self.client.login(username='admin', password='admin')
+        url = "%s?facility_id=%s&limit=2" % (self.reverse("learner_logs"), self.facility.id)
+        api_resp = streamed_json(self.client.get(url))
+        learner_ids = [learner["pk"] for learner in api_resp["learners"]]
+        pages = [api_resp["page"]]
+        while api_resp["next_cursor"]:
+            api_resp = streamed_json(self.client.get("%s&cursor=%s" % (url, api_resp["next_cursor"])))
+            learner_ids.extend(learner["pk"] for learner in api_resp["learners"])
+            pages.append(api_resp["page"])
+
+        self.assertEqual(pages, [1, 2, 3])
+        self.assertEqual(api_resp["pages"], 3)
+        self.assertEqual(len(learner_ids), 5)
+        self.assertEqual(len(set(learner_ids)), 5)
+
+    def test_learner_log_fields(self):
+
+        self.client.login(username='admin', password='admin')
+        api_resp = streamed_json(self.client.get("%s?facility_id=%s&fields=points" % (self.reverse("learner_logs"), self.facility.id)))
+        self.assertEqual(sorted(api_resp["logs"][0].keys()), ["exercise_id", "latest_activity_timestamp", "points", "user"])
+
+    def test_learner_log_invalid_cursor(self):
+
+        self.client.login(username='admin', password='admin')
+        resp = self.client.get("%s?facility_id=%s&cursor=nonsense" % (self.reverse("learner_logs"), self.facility.id))
+        self.assertEqual(resp.status_code, 400)
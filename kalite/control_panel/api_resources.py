@@ -1,13 +1,17 @@
 from annoying.functions import get_object_or_None
+from collections import defaultdict
 from datetime import datetime
+from itertools import islice
 
-from django.db.models import Max, Min
-from django.http import HttpResponse
+from django.db.models import Count, Max, Min
+from django.http import HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.text import compress_sequence
 from django.utils.translation import ugettext as _
 
-from tastypie import fields
-from tastypie.exceptions import BadRequest
-from tastypie.resources import ModelResource
+from tastypie import fields, http
+from tastypie.exceptions import BadRequest, ImmediateHttpResponse
+from tastypie.resources import ModelResource, convert_post_to_put
 
 from securesync.models import Zone, Device, SyncSession
 
@@ -27,6 +31,13 @@ ID_NONE = "None"
 ALL_KEY = ""
 UNGROUPED_KEY = "ungrouped"
 
+PART1_CONTEXT_TYPES = ["playlist", "exercise"]
+PART2_CONTEXT_TYPES = ["exercise_fixedblock", "playlist_fixedblock"]
+
+# Number of objects dehydrated and written out at a time when streaming a CSV export.
+# Also bounds the number of ids in the queries for the extra data of each chunk.
+EXPORT_CHUNK_SIZE = 200
+
 
 class FacilityResource(ModelResource):
 
@@ -93,6 +104,15 @@ class FacilityGroupResource(ModelResource):
         return super(FacilityGroupResource, self).authorized_read_list(group_list, bundle)
 
 
+def _chunks(items, size=EXPORT_CHUNK_SIZE):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            break
+        yield chunk
+
+
 class ParentFacilityUserResource(ModelResource):
     """A class with helper methods for getting facility users for data export requests"""
 
@@ -137,10 +157,74 @@ class ParentFacilityUserResource(ModelResource):
         response = super(ParentFacilityUserResource, self).create_response(request, data, response_class=response_class, **response_kwargs)
         # add a suggested download filename if we're replying with a CSV file
         if response["Content-Type"].startswith("text/csv"):
-            params = ["%s-%s" % (k,str(v)[0:8]) for (k,v) in request.GET.items() if v and k not in ["format", "limit"]]
-            response["Content-Disposition"] = "filename=%s__%s__exported_at-%s.csv" % (request.path.strip("/").split("/")[-1], "__".join(params), datetime.now().strftime("%Y%m%d_%H%M%S"))
+            response["Content-Disposition"] = "filename=%s" % self._csv_filename(request)
         return response
 
+    def _csv_filename(self, request):
+        params = ["%s-%s" % (k,str(v)[0:8]) for (k,v) in request.GET.items() if v and k not in ["format", "limit", "gzip"]]
+        return "%s__%s__exported_at-%s.csv" % (request.path.strip("/").split("/")[-1], "__".join(params), datetime.now().strftime("%Y%m%d_%H%M%S"))
+
+    def dispatch(self, request_type, request, **kwargs):
+        """
+        Same as ModelResource.dispatch, except that it lets the StreamingHttpResponses of CSV exports
+        (see get_list) through, where tastypie would replace anything but an HttpResponse with a 204.
+        """
+        allowed_methods = getattr(self._meta, "%s_allowed_methods" % request_type, None)
+
+        if 'HTTP_X_HTTP_METHOD_OVERRIDE' in request.META:
+            request.method = request.META['HTTP_X_HTTP_METHOD_OVERRIDE']
+
+        request_method = self.method_check(request, allowed=allowed_methods)
+        method = getattr(self, "%s_%s" % (request_method, request_type), None)
+
+        if method is None:
+            raise ImmediateHttpResponse(response=http.HttpNotImplemented())
+
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        request = convert_post_to_put(request)
+        response = method(request, **kwargs)
+
+        self.log_throttled_access(request)
+
+        if not isinstance(response, HttpResponseBase):
+            return http.HttpNoContent()
+
+        return response
+
+    def get_list(self, request, **kwargs):
+        """
+        CSV exports are streamed to the response EXPORT_CHUNK_SIZE objects at a time, instead of being
+        built in memory, and gzipped when the gzip parameter is set. Other formats are served as usual.
+        """
+        if self.determine_format(request) != "text/csv":
+            return super(ParentFacilityUserResource, self).get_list(request, **kwargs)
+
+        base_bundle = self.build_bundle(request=request)
+        objects = self.obj_get_list(bundle=base_bundle, **self.remove_api_resource_names(kwargs))
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+
+        content = self._meta.serializer.to_csv_stream(self._serialized_chunks(request, sorted_objects))
+        filename = self._csv_filename(request)
+        if request.GET.get("gzip"):
+            response = StreamingHttpResponse(compress_sequence(content), content_type="application/gzip")
+            filename += ".gz"
+        else:
+            response = StreamingHttpResponse(content, content_type="text/csv")
+        response["Content-Disposition"] = "filename=%s" % filename
+        return response
+
+    def _serialized_chunks(self, request, objects):
+        """
+        Dehydrate the objects and pass them through alter_list_data_to_serialize a chunk at a time,
+        yielding each chunk as a list of simple dictionaries.
+        """
+        for chunk in _chunks(objects.iterator() if hasattr(objects, "iterator") else objects):
+            bundles = [self.full_dehydrate(self.build_bundle(obj=obj, request=request), for_list=True) for obj in chunk]
+            data = self.alter_list_data_to_serialize(request, {self._meta.collection_name: bundles})
+            yield self._meta.serializer.to_simple(data, {})[self._meta.collection_name]
+
 
 class FacilityUserResource(ParentFacilityUserResource):
 
@@ -187,14 +271,28 @@ class TestLogResource(ParentFacilityUserResource):
 
     def obj_get_list(self, bundle, **kwargs):
         self._facility_users = self._get_facility_users(bundle)
-        test_logs = TestLog.objects.filter(user__id__in=self._facility_users.keys())
+        test_logs = TestLog.objects.filter(user__id__in=self._facility_users.keys()).select_related("user")
         # if not test_logs:
         #     raise NotFound("No test logs found.")
         return super(TestLogResource, self).authorized_read_list(test_logs, bundle)
 
     def alter_list_data_to_serialize(self, request, to_be_serialized):
         """Add username, user ID, facility name, and facility ID to responses"""
-        for bundle in to_be_serialized["objects"]:
+        bundles = to_be_serialized["objects"]
+        # Get the first and last attempt at every test in this list with one query per chunk
+        attempt_times = {}
+        for chunk in _chunks(bundles):
+            rows = AttemptLog.objects \
+                .filter(
+                    user__in=set(bundle.data["user"].data["id"] for bundle in chunk),
+                    context_id__in=set(bundle.data["test"] for bundle in chunk),
+                    context_type="test") \
+                .values("user", "context_id") \
+                .annotate(Min("timestamp"), Max("timestamp")) \
+                .order_by()
+            attempt_times.update(((row["user"], row["context_id"]), row) for row in rows)
+
+        for bundle in bundles:
             user_id = bundle.data["user"].data["id"]
             user = self._facility_users.get(user_id)
             bundle.data["username"] = user.username
@@ -202,9 +300,9 @@ class TestLogResource(ParentFacilityUserResource):
             bundle.data["facility_name"] = user.facility.name
             bundle.data["facility_id"] = user.facility.id
             bundle.data["is_teacher"] = user.is_teacher
-            attempt_logs = AttemptLog.objects.filter(user=user, context_id=bundle.data["test"], context_type="test")
-            bundle.data["timestamp_first"] = attempt_logs.count() and attempt_logs.aggregate(Min('timestamp'))['timestamp__min'] or None
-            bundle.data["timestamp_last"] = attempt_logs.count() and attempt_logs.aggregate(Max('timestamp'))['timestamp__max'] or None
+            times = attempt_times.get((user_id, bundle.data["test"]), {})
+            bundle.data["timestamp_first"] = times.get("timestamp__min")
+            bundle.data["timestamp_last"] = times.get("timestamp__max")
             bundle.data.pop("user")
 
         return to_be_serialized
@@ -227,7 +325,7 @@ class AttemptLogResource(ParentFacilityUserResource):
 
     def obj_get_list(self, bundle, **kwargs):
         self._facility_users = self._get_facility_users(bundle)
-        attempt_logs = AttemptLog.objects.filter(user__id__in=self._facility_users.keys())
+        attempt_logs = AttemptLog.objects.filter(user__id__in=self._facility_users.keys()).select_related("user")
         # if not attempt_logs:
         #     raise NotFound("No attempt logs found.")
         return super(AttemptLogResource, self).authorized_read_list(attempt_logs, bundle)
@@ -264,14 +362,54 @@ class ExerciseLogResource(ParentFacilityUserResource):
 
     def obj_get_list(self, bundle, **kwargs):
         self._facility_users = self._get_facility_users(bundle)
-        exercise_logs = ExerciseLog.objects.filter(user__id__in=self._facility_users.keys())
+        exercise_logs = ExerciseLog.objects.filter(user__id__in=self._facility_users.keys()).select_related("user")
         # if not exercise_logs:
         #     raise NotFound("No exercise logs found.")
         return super(ExerciseLogResource, self).authorized_read_list(exercise_logs, bundle)
 
+    def _get_attempt_stats(self, bundles):
+        """
+        Count the attempts made at the exercises of these exercise logs, with one query per chunk of logs.
+        Attempts in the "playlist" and "exercise" contexts are part 1 of an exercise,
+        attempts in the fixed block contexts are part 2.
+        :return: a dictionary from (user id, exercise id) to the stats for that exercise log.
+        """
+        stats = defaultdict(lambda: {
+            "timestamp_first": None,
+            "timestamp_last": None,
+            "part1_answered": 0,
+            "part1_correct": 0,
+            "part2_attempted": 0,
+            "part2_correct": 0,
+        })
+        rows = (row for chunk in _chunks(bundles) for row in AttemptLog.objects
+            .filter(
+                user__in=set(bundle.data["user"].data["id"] for bundle in chunk),
+                exercise_id__in=set(bundle.data["exercise_id"] for bundle in chunk),
+                context_type__in=PART1_CONTEXT_TYPES + PART2_CONTEXT_TYPES)
+            .values("user", "exercise_id", "context_type", "correct")
+            .annotate(Count("id"), Min("timestamp"), Max("timestamp"))
+            .order_by())
+        for row in rows:
+            log_stats = stats[(row["user"], row["exercise_id"])]
+            if row["context_type"] in PART1_CONTEXT_TYPES:
+                log_stats["part1_answered"] += row["id__count"]
+                log_stats["part1_correct"] += row["id__count"] if row["correct"] else 0
+                if log_stats["timestamp_first"] is None or row["timestamp__min"] < log_stats["timestamp_first"]:
+                    log_stats["timestamp_first"] = row["timestamp__min"]
+                if log_stats["timestamp_last"] is None or row["timestamp__max"] > log_stats["timestamp_last"]:
+                    log_stats["timestamp_last"] = row["timestamp__max"]
+            else:
+                log_stats["part2_attempted"] += row["id__count"]
+                log_stats["part2_correct"] += row["id__count"] if row["correct"] else 0
+        return stats
+
     def alter_list_data_to_serialize(self, request, to_be_serialized):
         """Add username, user ID, facility name, and facility ID to responses"""
-        for bundle in to_be_serialized["objects"]:
+        bundles = to_be_serialized["objects"]
+        attempt_stats = self._get_attempt_stats(bundles)
+
+        for bundle in bundles:
             user_id = bundle.data["user"].data["id"]
             user = self._facility_users.get(user_id)
             bundle.data["username"] = user.username
@@ -279,13 +417,13 @@ class ExerciseLogResource(ParentFacilityUserResource):
             bundle.data["facility_name"] = user.facility.name
             bundle.data["facility_id"] = user.facility.id
             bundle.data["is_teacher"] = user.is_teacher
-            attempt_logs = AttemptLog.objects.filter(user=user, exercise_id=bundle.data["exercise_id"], context_type__in=["playlist", "exercise"])
-            bundle.data["timestamp_first"] = attempt_logs.count() and attempt_logs.aggregate(Min('timestamp'))['timestamp__min'] or None
-            bundle.data["timestamp_last"] = attempt_logs.count() and attempt_logs.aggregate(Max('timestamp'))['timestamp__max'] or None
-            bundle.data["part1_answered"] = AttemptLog.objects.filter(user=user, exercise_id=bundle.data["exercise_id"], context_type__in=["playlist", "exercise"]).count()
-            bundle.data["part1_correct"] = AttemptLog.objects.filter(user=user, exercise_id=bundle.data["exercise_id"], correct=True, context_type__in=["playlist", "exercise"]).count()
-            bundle.data["part2_attempted"] = AttemptLog.objects.filter(user=user, exercise_id=bundle.data["exercise_id"], context_type__in=["exercise_fixedblock", "playlist_fixedblock"]).count()
-            bundle.data["part2_correct"] = AttemptLog.objects.filter(user=user, exercise_id=bundle.data["exercise_id"], correct=True, context_type__in=["exercise_fixedblock", "playlist_fixedblock"]).count()
+            stats = attempt_stats[(user_id, bundle.data["exercise_id"])]
+            bundle.data["timestamp_first"] = stats["timestamp_first"]
+            bundle.data["timestamp_last"] = stats["timestamp_last"]
+            bundle.data["part1_answered"] = stats["part1_answered"]
+            bundle.data["part1_correct"] = stats["part1_correct"]
+            bundle.data["part2_attempted"] = stats["part2_attempted"]
+            bundle.data["part2_correct"] = stats["part2_correct"]
             bundle.data.pop("user")
 
         return to_be_serialized
@@ -313,11 +451,20 @@ class DeviceLogResource(ParentFacilityUserResource):
 
     def alter_list_data_to_serialize(self, request, to_be_serialized):
         """Add number of syncs and last sync to response"""
-        for bundle in to_be_serialized["objects"]:
-            all_sessions = SyncSession.objects.filter(client_device__id=bundle.data.get("id"))
-            last_sync = "Never" if not all_sessions else all_sessions.order_by("-timestamp")[0].timestamp
-            bundle.data["last_sync"] = last_sync
-            bundle.data["total_sync_sessions"] = len(all_sessions)
+        bundles = to_be_serialized["objects"]
+        sessions = {}
+        for chunk in _chunks(bundles):
+            rows = SyncSession.objects \
+                .filter(client_device__in=[bundle.data.get("id") for bundle in chunk]) \
+                .values("client_device") \
+                .annotate(Count("client_nonce"), Max("timestamp")) \
+                .order_by()
+            sessions.update((row["client_device"], row) for row in rows)
+
+        for bundle in bundles:
+            device_sessions = sessions.get(bundle.data.get("id"))
+            bundle.data["last_sync"] = device_sessions["timestamp__max"] if device_sessions else "Never"
+            bundle.data["total_sync_sessions"] = device_sessions["client_nonce__count"] if device_sessions else 0
 
         return to_be_serialized
 
@@ -338,7 +485,7 @@ class ContentRatingExportResource(ParentFacilityUserResource):
 
     def obj_get_list(self, bundle, **kwargs):
         self._facility_users = self._get_facility_users(bundle)
-        content_ratings = ContentRating.objects.filter(user__id__in=self._facility_users.keys())
+        content_ratings = ContentRating.objects.filter(user__id__in=self._facility_users.keys()).select_related("user")
         return super(ContentRatingExportResource, self).authorized_read_list(content_ratings, bundle)
 
 
@@ -3,6 +3,11 @@ import StringIO
 from tastypie.serializers import Serializer 
 
 
+def _encode(value):
+    # The csv module can't write unicode
+    return value.encode("utf-8") if isinstance(value, unicode) else value
+
+
 class CSVSerializer(Serializer):
     formats = ['json', 'csv']
     content_types = {
@@ -13,23 +18,31 @@ class CSVSerializer(Serializer):
     def to_csv(self, data, options=None):
         options = options or {}
         data = self.to_simple(data, options)
+        return "".join(self.to_csv_stream([data.get("objects") or []]))
+
+    def to_csv_stream(self, chunks):
+        """
+        Write out CSV for each chunk of simplified objects as it comes, rather than
+        building the whole file in memory. The header is taken from the first object.
+        :param chunks: An iterable of lists of dictionaries.
+        :return: A generator of CSV text, one piece per chunk.
+        """
         raw_data = StringIO.StringIO()
-
-        objects = data.get("objects")
-        if not objects:
+        writer = csv.writer(raw_data)
+        header = None
+
+        for objects in chunks:
+            for item in objects:
+                if header is None:
+                    header = item.keys()
+                    writer.writerow(map(_encode, header))
+                writer.writerow([_encode(item.get(key)) for key in header])
+            if raw_data.tell():
+                yield raw_data.getvalue()
+                raw_data.seek(0)
+                raw_data.truncate()
+
+        if header is None:
             empty_file = [""]
-            writer = csv.writer(raw_data, empty_file)
             writer.writerow(empty_file)
-            raw_data.seek(0)
-            return raw_data.read()  
-
-
-        header = objects[0].keys()
-        writer = csv.writer(raw_data, header)
-        writer.writerow(header)
-
-        for item in objects:
-            writer.writerow(item.values())
-
-        raw_data.seek(0)
-        return raw_data.read()
+            yield raw_data.getvalue()
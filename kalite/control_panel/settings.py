@@ -1,3 +1,7 @@
 ########################
 # Django dependencies
 ########################
+from django.conf import settings
+
+# For how many seconds the facility management pages reuse the usage statistics they've counted
+USAGE_DATA_CACHE_SECONDS = getattr(settings, "USAGE_DATA_CACHE_SECONDS", 60)
@@ -1,10 +1,17 @@
+import csv
+import datetime
+import gzip
 import json
+from cStringIO import StringIO
 
 from django.conf import settings
 from django.test.utils import override_settings
 
 from selenium.common.exceptions import NoSuchElementException
 
+from kalite.control_panel.views import _get_cached_user_usage_data, _get_user_usage_data
+from kalite.facility.models import FacilityGroup, FacilityUser
+from kalite.main.models import AttemptLog, VideoLog
 from kalite.testing.base import KALiteBrowserTestCase, KALiteClientTestCase, KALiteTestCase
 
 from kalite.testing.mixins.browser_mixins import BrowserActionMixins
@@ -20,6 +27,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 logging = settings.LOG
 
 
+def csv_content(response):
+    """CSV exports are streamed, so read the whole response."""
+    return "".join(response.streaming_content)
+
+
 class DeviceRegistrationTests(FacilityMixins,
                        StudentProgressMixin,
                        BrowserActionMixins,
@@ -469,12 +481,12 @@ class CSVExportAPITests(CSVExportTestSetup, KALiteClientTestCase):
     def test_facility_user_csv_endpoint(self):
         # Test filtering by facility
         self.client.login(username='admin', password='admin')
-        facility_filtered_resp = self.client.get(self.api_facility_user_csv_url + "?facility_id=" + self.facility.id + "&format=csv").content
+        facility_filtered_resp = csv_content(self.client.get(self.api_facility_user_csv_url + "?facility_id=" + self.facility.id + "&format=csv"))
         rows = filter(None, facility_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 4, "API response incorrect")
 
         # Test filtering by group
-        group_filtered_resp = self.client.get(self.api_facility_user_csv_url + "?group_id=" + self.group.id + "&format=csv").content
+        group_filtered_resp = csv_content(self.client.get(self.api_facility_user_csv_url + "?group_id=" + self.group.id + "&format=csv"))
         rows = filter(None, group_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 2, "API response incorrect")
         self.client.logout()
@@ -483,26 +495,58 @@ class CSVExportAPITests(CSVExportTestSetup, KALiteClientTestCase):
     def test_test_log_csv_endpoint(self):
         # Test filtering by facility
         self.client.login(username='admin', password='admin')
-        facility_filtered_resp = self.client.get(self.api_test_log_csv_url + "?facility_id=" + self.facility.id + "&format=csv").content
+        facility_filtered_resp = csv_content(self.client.get(self.api_test_log_csv_url + "?facility_id=" + self.facility.id + "&format=csv"))
         rows = filter(None, facility_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 3, "API response incorrect")
 
         # Test filtering by group
-        group_filtered_resp = self.client.get(self.api_test_log_csv_url + "?group_id=" + self.group.id + "&format=csv").content
+        group_filtered_resp = csv_content(self.client.get(self.api_test_log_csv_url + "?group_id=" + self.group.id + "&format=csv"))
         rows = filter(None, group_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 2, "API response incorrect")
         self.client.logout()
 
 
+    def test_exercise_log_csv_attempt_counts(self):
+        self.client.login(username='admin', password='admin')
+        resp = self.client.get(self.api_exercise_log_csv_url + "?group_id=" + self.group.id + "&format=csv")
+        rows = list(csv.DictReader(StringIO(csv_content(resp))))
+        self.assertEqual(len(rows), 1, "API response incorrect")
+        self.assertEqual(rows[0]["username"], "stu1")
+        # The attempt log created in setUp has no context type, so is in neither part.
+        self.assertEqual(rows[0]["part1_answered"], "0")
+        self.assertEqual(rows[0]["part2_attempted"], "0")
+
+        self.create_attempt_log(user=self.stu1)
+        AttemptLog.objects.filter(user=self.stu1).update(context_type="exercise", correct=True)
+        AttemptLog.objects.create(user=self.stu1, exercise_id=self.exercise_log_1.exercise_id, context_type="exercise_fixedblock", timestamp=datetime.datetime.now())
+        resp = self.client.get(self.api_exercise_log_csv_url + "?group_id=" + self.group.id + "&format=csv")
+        rows = list(csv.DictReader(StringIO(csv_content(resp))))
+        self.assertEqual(rows[0]["part1_answered"], "2")
+        self.assertEqual(rows[0]["part1_correct"], "2")
+        self.assertEqual(rows[0]["part2_attempted"], "1")
+        self.assertEqual(rows[0]["part2_correct"], "0")
+        self.assertTrue(rows[0]["timestamp_first"])
+        self.client.logout()
+
+    def test_csv_export_gzip(self):
+        self.client.login(username='admin', password='admin')
+        url = self.api_attempt_log_csv_url + "?facility_id=" + self.facility.id + "&format=csv"
+        plain = csv_content(self.client.get(url))
+        resp = self.client.get(url + "&gzip=true")
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        self.assertTrue(resp["Content-Disposition"].endswith(".csv.gz"))
+        self.assertEqual(gzip.GzipFile(fileobj=StringIO(csv_content(resp))).read(), plain)
+        self.client.logout()
+
     def test_device_log_csv_endpoint(self):
         # Test filtering by facility
         self.client.login(username='admin', password='admin')
-        facility_filtered_resp = self.client.get(self.api_exercise_log_csv_url + "?facility_id=" + self.facility.id + "&format=csv").content
+        facility_filtered_resp = csv_content(self.client.get(self.api_exercise_log_csv_url + "?facility_id=" + self.facility.id + "&format=csv"))
         rows = filter(None, facility_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 3, "API response incorrect")
 
         # Test filtering by group
-        group_filtered_resp = self.client.get(self.api_exercise_log_csv_url + "?group_id=" + self.group.id + "&format=csv").content
+        group_filtered_resp = csv_content(self.client.get(self.api_exercise_log_csv_url + "?group_id=" + self.group.id + "&format=csv"))
         rows = filter(None, group_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 2, "API response incorrect")
         self.client.logout()
@@ -511,12 +555,12 @@ class CSVExportAPITests(CSVExportTestSetup, KALiteClientTestCase):
     def test_attempt_log_csv_endpoint(self):
         # Test filtering by facility
         self.client.login(username='admin', password='admin')
-        facility_filtered_resp = self.client.get(self.api_attempt_log_csv_url + "?facility_id=" + self.facility.id + "&format=csv").content
+        facility_filtered_resp = csv_content(self.client.get(self.api_attempt_log_csv_url + "?facility_id=" + self.facility.id + "&format=csv"))
         rows = filter(None, facility_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 3, "API response incorrect")
 
         # Test filtering by group
-        group_filtered_resp = self.client.get(self.api_attempt_log_csv_url + "?group_id=" + self.group.id + "&format=csv").content
+        group_filtered_resp = csv_content(self.client.get(self.api_attempt_log_csv_url + "?group_id=" + self.group.id + "&format=csv"))
         rows = filter(None, group_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 2, "API response incorrect")
         self.client.logout()
@@ -525,6 +569,45 @@ class CSVExportAPITests(CSVExportTestSetup, KALiteClientTestCase):
     def test_device_log_csv_endpoint(self):
         # Test filtering by zone
         self.client.login(username='admin', password='admin')
-        zone_filtered_resp = self.client.get(self.api_device_log_csv_url + "?zone_id=" + self.zone.id + "&format=csv").content
+        zone_filtered_resp = csv_content(self.client.get(self.api_device_log_csv_url + "?zone_id=" + self.zone.id + "&format=csv"))
         rows = filter(None, zone_filtered_resp.split("\n"))
         self.assertEqual(len(rows), 2, "API response incorrect")
+
+
+class UserUsageDataTests(CSVExportTestSetup):
+
+    def test_user_and_group_totals(self):
+        self.create_exercise_log(user=self.stu1, exercise_id="addition_1", streak_progress=100, complete=True)
+        self.create_exercise_log(user=self.stu1, exercise_id="addition_2", streak_progress=50)
+        VideoLog.objects.create(user=self.stu1, video_id="basic_addition", youtube_id="xxxxxxxxxx", total_seconds_watched=30)
+        VideoLog.objects.create(user=self.stu2, video_id="basic_addition", youtube_id="xxxxxxxxxx", total_seconds_watched=0)
+
+        (user_data, group_data) = _get_user_usage_data(
+            FacilityUser.objects.filter(facility=self.facility, is_teacher=False),
+            FacilityGroup.objects.filter(facility=self.facility))
+
+        stu1 = user_data[self.stu1.pk]
+        self.assertEqual(stu1["total_exercises"], 3)
+        self.assertEqual(stu1["exercises_completed"], 1)
+        self.assertEqual(stu1["exercises_mastered"], ["addition_1"])
+        self.assertAlmostEqual(stu1["pct_mastery"], 50.)
+        self.assertEqual(stu1["total_videos"], 1)
+        self.assertEqual(user_data[self.stu2.pk]["total_videos"], 0)
+
+        self.assertEqual(group_data[self.group.pk]["total_users"], 1)
+        self.assertEqual(group_data[self.group.pk]["total_exercises_completed"], 1)
+        self.assertEqual(group_data[None]["total_users"], 1)
+        self.assertEqual(group_data[None]["total_exercises"], 1)
+
+    def test_cached_usage_data(self):
+        (user_data, group_data) = _get_cached_user_usage_data(self.facility, "students")
+        self.create_exercise_log(user=self.stu1, exercise_id="addition_1")
+        self.assertEqual(_get_cached_user_usage_data(self.facility, "students")[0], user_data,
+                         "Usage data should be reused within its time bucket")
+
+        # Moving users around invalidates the cache
+        self.stu2.group = self.group
+        self.stu2.save()
+        (user_data, group_data) = _get_cached_user_usage_data(self.facility, "students")
+        self.assertEqual(user_data[self.stu1.pk]["total_exercises"], 2)
+        self.assertEqual(group_data[self.group.pk]["total_users"], 2)
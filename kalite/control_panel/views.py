@@ -4,6 +4,7 @@ import datetime
 import dateutil
 import re
 import os
+import time
 from annoying.decorators import render_to
 from annoying.functions import get_object_or_None
 from fle_utils.collections_local_copy import OrderedDict
@@ -13,11 +14,13 @@ from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
 from django.http import Http404, HttpResponseRedirect, HttpResponseNotFound, HttpResponseForbidden
-from django.db.models import Max
+from django.db.models import Count, Max, Sum
+from django.db.models.signals import post_delete, post_save
 from django.db.models.query_utils import Q
 from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext as _
 
+from . import settings as control_panel_settings
 from .forms import ZoneForm, UploadFileForm, DateRangeForm
 from fle_utils.chronograph.models import Job
 from fle_utils.django_utils.paginate import paginate_data
@@ -303,12 +306,8 @@ def facility_management_csv(request, facility, group_id=None, zone_id=None, freq
     # Basic data
     context = control_panel_context(request, zone_id=zone_id, facility_id=facility.id)
     group = group_id and get_object_or_None(FacilityGroup, id=group_id)
-    groups = FacilityGroup.objects.filter(facility=context["facility"]).order_by("name")
-    # coaches = get_users_from_group(user_type="coaches", group_id=group_id, facility=facility)
-    students = get_users_from_group(user_type="students", group_id=group_id, facility=facility)
-
-    (student_data, group_data) = _get_user_usage_data(students, groups, group_id=group_id, period_start=period_start, period_end=period_end)
-    # (coach_data, coach_group_data) = _get_user_usage_data(coaches, period_start=period_start, period_end=period_end)
+    (student_data, group_data) = _get_cached_user_usage_data(facility, "students", group_id=group_id, period_start=period_start, period_end=period_end)
+    # (coach_data, coach_group_data) = _get_cached_user_usage_data(facility, "coaches", period_start=period_start, period_end=period_end)
 
     context.update({
         "students": student_data,  # raw data
@@ -341,12 +340,9 @@ def facility_management(request, ds, facility, group_id=None, zone_id=None, per_
 
     # Basic data
     group = group_id and get_object_or_None(FacilityGroup, id=group_id)
-    groups = FacilityGroup.objects.filter(facility=context["facility"]).order_by("name")
-    coaches = get_users_from_group(user_type="coaches", group_id=group_id, facility=facility)
-    students = get_users_from_group(user_type="students", group_id=group_id, facility=facility)
-
-    (student_data, group_data) = _get_user_usage_data(students, groups, group_id=group_id)
-    (coach_data, coach_group_data) = _get_user_usage_data(coaches)
+    # The page doesn't show which exercises and videos each user has done, only how many
+    (student_data, group_data) = _get_cached_user_usage_data(facility, "students", group_id=group_id, include_content_ids=False)
+    (coach_data, coach_group_data) = _get_cached_user_usage_data(facility, "coaches", include_content_ids=False)
 
     coach_pages, coach_urls = paginate_data(request, coach_data.values(), data_type="coaches", page=coach_page, per_page=coach_per_page)
     student_pages, student_urls = paginate_data(request, student_data.values(), data_type="students", page=student_page, per_page=student_per_page)
@@ -439,9 +435,11 @@ def _get_date_range(frequency, period_start, period_end):
     return (period_start, period_end)
 
 
-def _get_user_usage_data(users, groups=None, period_start=None, period_end=None, group_id=None):
+def _get_user_usage_data(users, groups=None, period_start=None, period_end=None, group_id=None, include_content_ids=True):
     """
     Returns facility user data, within the given date range.
+    Totals are counted by the database, with one grouped query per kind of log.
+    :param include_content_ids: whether to list the exercises mastered and videos watched by each user.
     """
 
     groups = groups or set([user.group for user in users])
@@ -484,10 +482,6 @@ def _get_user_usage_data(users, groups=None, period_start=None, period_end=None,
         login_q1 = Q(start_datetime__gte=period_start) & Q(start_datetime__lte=period_end) & \
             Q(end_datetime__gte=period_start) & Q(end_datetime__lte=period_end)
         login_logs = login_logs.filter(login_q1)
-    # Force results in a single query
-    exercise_logs = list(exercise_logs.values("exercise_id", "user__pk", "streak_progress", "complete"))
-    video_logs = list(video_logs.values("video_id", "user__pk"))
-    login_logs = list(login_logs.values("activity_type", "total_seconds", "user__pk", "count"))
 
     for user in users:
         user_data[user.pk] = OrderedDict()
@@ -509,24 +503,35 @@ def _get_user_usage_data(users, groups=None, period_start=None, period_end=None,
         user_data[user.pk]["total_videos"] = 0
         user_data[user.pk]["videos_watched"] = []
 
-
-    for elog in exercise_logs:
-        user_data[elog["user__pk"]]["pct_mastery"] += elog["streak_progress"]
-        user_data[elog["user__pk"]]["total_exercises"] += 1
-        if elog["complete"]:
-            user_data[elog["user__pk"]]["exercises_completed"] += 1
-            user_data[elog["user__pk"]]["exercises_mastered"].append(elog["exercise_id"])
-
-    for vlog in video_logs:
-        user_data[vlog["user__pk"]]["total_videos"] += 1
-        user_data[vlog["user__pk"]]["videos_watched"].append(vlog["video_id"])
-
-    for llog in login_logs:
-        if llog["activity_type"] == UserLog.get_activity_int("coachreport"):
-            user_data[llog["user__pk"]]["total_report_views"] += 1
-        elif llog["activity_type"] == UserLog.get_activity_int("login"):
-            user_data[llog["user__pk"]]["total_hours"] += (llog["total_seconds"]) / 3600.
-            user_data[llog["user__pk"]]["total_logins"] += llog["count"]
+    exercise_stats = exercise_logs \
+        .values("user", "complete") \
+        .annotate(Count("id"), Sum("streak_progress")) \
+        .order_by()
+    for row in exercise_stats:
+        user_data[row["user"]]["pct_mastery"] += row["streak_progress__sum"] or 0
+        user_data[row["user"]]["total_exercises"] += row["id__count"]
+        if row["complete"]:
+            user_data[row["user"]]["exercises_completed"] += row["id__count"]
+
+    for row in video_logs.values("user").annotate(Count("id")).order_by():
+        user_data[row["user"]]["total_videos"] += row["id__count"]
+
+    login_stats = login_logs \
+        .values("user", "activity_type") \
+        .annotate(Count("id"), Sum("total_seconds"), Sum("count")) \
+        .order_by()
+    for row in login_stats:
+        if row["activity_type"] == UserLog.get_activity_int("coachreport"):
+            user_data[row["user"]]["total_report_views"] += row["id__count"]
+        elif row["activity_type"] == UserLog.get_activity_int("login"):
+            user_data[row["user"]]["total_hours"] += (row["total_seconds__sum"] or 0) / 3600.
+            user_data[row["user"]]["total_logins"] += row["count__sum"] or 0
+
+    if include_content_ids:
+        for user_pk, exercise_id in exercise_logs.filter(complete=True).values_list("user", "exercise_id"):
+            user_data[user_pk]["exercises_mastered"].append(exercise_id)
+        for user_pk, video_id in video_logs.values_list("user", "video_id"):
+            user_data[user_pk]["videos_watched"].append(video_id)
 
     for group in list(groups) + [None] * (group_id == None or group_id == UNGROUPED):  # None for ungrouped, if no group_id passed.
         group_pk = getattr(group, "pk", None)
@@ -558,9 +563,11 @@ def _get_user_usage_data(users, groups=None, period_start=None, period_end=None,
         group_data[group_pk]["total_videos"] += user_data[user.pk]["total_videos"]
         group_data[group_pk]["total_exercises"] += user_data[user.pk]["total_exercises"]
         group_data[group_pk]["total_exercises_completed"] += user_data[user.pk]["exercises_completed"]
+        # Summed here, and averaged over the users of the group below
+        group_data[group_pk]["pct_mastery"] += user_data[user.pk]["pct_mastery"]
 
-        total_mastery_so_far = (group_data[group_pk]["pct_mastery"] * (group_data[group_pk]["total_users"] - 1) + user_data[user.pk]["pct_mastery"])
-        group_data[group_pk]["pct_mastery"] = total_mastery_so_far / group_data[group_pk]["total_users"]
+    for group in group_data.values():
+        group["pct_mastery"] = float(group["pct_mastery"]) / (group["total_users"] or 1)
 
     if len(group_data) == 1 and None in group_data:
         if not group_data[None]["total_users"]:
@@ -569,6 +576,47 @@ def _get_user_usage_data(users, groups=None, period_start=None, period_end=None,
     return (user_data, group_data)
 
 
+# Usage data computed for the facility management pages, keyed by the arguments it was computed for
+# and the time bucket it was computed in (see control_panel.settings.USAGE_DATA_CACHE_SECONDS).
+# Only the current bucket is kept. Changes to users and groups drop the whole cache straight away.
+USAGE_DATA_CACHE = {}
+
+def flag_usage_data_cache(**kwargs):
+    USAGE_DATA_CACHE.clear()
+
+for sender in [FacilityUser, FacilityGroup]:
+    post_save.connect(flag_usage_data_cache, sender=sender)
+    post_delete.connect(flag_usage_data_cache, sender=sender)
+
+
+def _get_cached_user_usage_data(facility, user_type, group_id=None, period_start=None, period_end=None, include_content_ids=True):
+    """
+    Same as _get_user_usage_data for the students or coaches of a facility (see get_users_from_group),
+    but reuses the result for up to USAGE_DATA_CACHE_SECONDS, so that paging through the facility
+    management page or re-exporting a CSV doesn't count every log again.
+    """
+    bucket = int(time.time() // control_panel_settings.USAGE_DATA_CACHE_SECONDS) if control_panel_settings.USAGE_DATA_CACHE_SECONDS else None
+    key = (facility.id, user_type, group_id, str(period_start), str(period_end), include_content_ids)
+
+    cached = USAGE_DATA_CACHE.get(key)
+    if bucket is not None and cached and cached[0] == bucket:
+        return cached[1]
+
+    users = get_users_from_group(user_type=user_type, group_id=group_id, facility=facility)
+    if user_type == "coaches":
+        data = _get_user_usage_data(users, period_start=period_start, period_end=period_end, include_content_ids=include_content_ids)
+    else:
+        groups = FacilityGroup.objects.filter(facility=facility).order_by("name")
+        data = _get_user_usage_data(users, groups, group_id=group_id, period_start=period_start, period_end=period_end, include_content_ids=include_content_ids)
+
+    if bucket is not None:
+        # Drop anything computed in an earlier bucket, so that the cache doesn't grow without bounds.
+        for stale_key in [k for (k, (b, _data)) in USAGE_DATA_CACHE.items() if b != bucket]:
+            USAGE_DATA_CACHE.pop(stale_key, None)
+        USAGE_DATA_CACHE[key] = (bucket, data)
+    return data
+
+
 def check_meta_data(facility):
     '''Checks whether any metadata is missing for the specified facility.
 
@@ -17,6 +17,7 @@ from kalite.i18n.base import lcode_to_django_lang, get_po_filepath, get_locale_p
     download_content_pack, update_jsi18n_file, get_subtitle_file_path as get_subtitle_path, \
     extract_content_db
 from kalite.topic_tools import settings as topic_settings
+from kalite.topic_tools.connections import content_databases
 from kalite.updates.management.utils import UpdatesStaticCommand
 from peewee import SqliteDatabase
 from kalite.topic_tools.content_models import Item, AssessmentItem
@@ -119,6 +120,7 @@ class Command(UpdatesStaticCommand):
             )
         if os.path.exists(content_db_path):
             if options.get("force", False):
+                content_databases.invalidate(path=content_db_path)
                 os.unlink(content_db_path)
             else:
                 raise CommandError(
@@ -163,6 +165,8 @@ class Command(UpdatesStaticCommand):
         self.next_stage(_("Moving content files to the right place."))
         extract_catalog_files(zf, lang)
         update_jsi18n_file(lang)
+        # Drop any open connections to the old database before overwriting it
+        content_databases.invalidate(channel=topic_settings.CHANNEL, language=lang)
         extract_content_db(zf, lang, is_template=self.is_template)
         extract_subtitles(zf, lang)
         extract_content_pack_metadata(zf, lang)  # always extract to the en lang
@@ -428,6 +428,10 @@ class Command(BaseCommand):
                 "syncdb", interactive=False, verbosity=options.get("verbosity"))
             call_command(
                 "migrate", merge=True, verbosity=options.get("verbosity"))
+            call_command(
+                "rebuild_exercise_transitions", verbosity=options.get("verbosity"))
+            call_command(
+                "rebuild_coach_summaries", verbosity=options.get("verbosity"))
         Settings.set("database_version", VERSION)
 
         # Copy all content item db templates
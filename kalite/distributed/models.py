@@ -0,0 +1,2 @@
+# Configures connections to the main database, see sqlite.py
+from . import sqlite  # noqa
@@ -0,0 +1,212 @@
+"""
+Tuning of the main (Django) SQLite database.
+
+CherryPy serves requests from CHERRYPY_THREAD_COUNT threads, and the job scheduler and
+management commands write to the same database file. With SQLite's default rollback journal,
+every write locks out all readers, so e.g. coach reports stall while students are doing
+exercises. Each new connection is therefore configured with DEFAULT_DB_SQLITE_PRAGMAS, which
+switch the database to write-ahead logging (WAL), where readers and a writer don't block each
+other.
+
+In WAL mode, commits are appended to a separate -wal file, which is copied back into the
+database by a "checkpoint". SQLite does this from whichever connection happens to commit once
+the WAL file is large enough; on top of that, a background thread checkpoints every
+DEFAULT_DB_CHECKPOINT_INTERVAL seconds, so that request threads rarely have to.
+
+SQLite still allows only one writer at a time, and writers that find the database locked
+poll for it with increasing sleeps. When DEFAULT_DB_SINGLE_WRITER is set, writes of learner
+logs (see kalite.main.models) instead wait their turn in an in-process queue, and are done
+one after the other. Transactions that contain such writes take their turn for as long
+as they last.
+
+The receiver below is connected when this app's models are loaded; as the journal mode is
+stored in the database file, connections made before that still use WAL.
+"""
+import atexit
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.dispatch import receiver
+logging = settings.LOG
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def is_file_database(name):
+    return bool(name) and name != ":memory:" and not name.startswith("file::memory:")
+
+
+@receiver(connection_created, sender=DatabaseWrapper)
+def configure_connection(sender, connection, **kwargs):
+    """
+    Apply DEFAULT_DB_SQLITE_PRAGMAS to each new connection to the default database,
+    and make sure it's being checkpointed.
+    """
+    if connection.alias != "default":
+        return
+    name = connection.settings_dict["NAME"]
+    if not is_file_database(name):
+        # Test databases live in memory, where WAL doesn't apply
+        return
+
+    cursor = connection.connection.cursor()
+    try:
+        for pragma, value in getattr(settings, "DEFAULT_DB_SQLITE_PRAGMAS", []):
+            cursor.execute("PRAGMA %s=%s" % (pragma, value))
+        journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        cursor.close()
+
+    interval = getattr(settings, "DEFAULT_DB_CHECKPOINT_INTERVAL", 0)
+    if journal_mode.lower() == "wal" and interval:
+        start_checkpointer(name, interval)
+
+
+class Checkpointer(threading.Thread):
+    """
+    Background thread which regularly copies the contents of the WAL file back into the database.
+    """
+
+    def __init__(self, path, interval):
+        super(Checkpointer, self).__init__(name="sqlite-checkpointer")
+        self.daemon = True
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def checkpoint(self):
+        """
+        Checkpoint as much of the WAL file as possible without waiting for readers or writers.
+        :return: (busy, pages in the WAL file, pages checkpointed)
+        """
+        conn = sqlite3.connect(self.path, timeout=1)
+        try:
+            return conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        finally:
+            conn.close()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            if not os.path.exists(self.path):
+                continue
+            try:
+                busy, wal_pages, checkpointed = self.checkpoint()
+                if wal_pages > checkpointed:
+                    logging.debug("Checkpointed %d of %d pages of %s" % (checkpointed, wal_pages, self.path))
+            except Exception as e:
+                logging.warn("Error checkpointing %s: %s" % (self.path, e))
+
+
+def start_checkpointer(path, interval):
+    """
+    Start the checkpointer thread for this process, unless it's already running.
+    """
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer and _checkpointer.is_alive() and _checkpointer.path == path:
+            return _checkpointer
+        if _checkpointer:
+            _checkpointer.stop()
+        _checkpointer = Checkpointer(path, interval)
+        _checkpointer.start()
+        return _checkpointer
+
+
+@atexit.register
+def stop_checkpointer():
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer:
+            _checkpointer.stop()
+            _checkpointer.join(1)
+            _checkpointer = None
+
+
+class WriteQueue(object):
+    """
+    Lets threads take turns writing to the database, in the order in which they asked.
+    A thread that already has its turn can write again without waiting (e.g. a log save
+    that updates a summary).
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._next_ticket = 0
+        self._now_serving = 0
+        self._owner = None
+        self._depth = 0
+
+    @property
+    def waiting(self):
+        """Number of threads waiting for their turn, or having it."""
+        with self._condition:
+            return self._next_ticket - self._now_serving
+
+    @contextmanager
+    def turn(self):
+        me = threading.current_thread()
+        with self._condition:
+            if self._owner is me:
+                self._depth += 1
+            else:
+                ticket = self._next_ticket
+                self._next_ticket += 1
+                while ticket != self._now_serving:
+                    self._condition.wait()
+                self._owner = me
+                self._depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._depth -= 1
+                if not self._depth:
+                    self._owner = None
+                    self._now_serving += 1
+                    self._condition.notify_all()
+
+
+write_queue = WriteQueue()
+
+
+@contextmanager
+def single_writer():
+    """
+    Wait for this thread's turn to write, if DEFAULT_DB_SINGLE_WRITER is set.
+
+    Writes in a transaction keep SQLite's write lock until the transaction ends, so a transaction
+    that makes queued writes (e.g. the sync import) must take its turn before it begins:
+        with single_writer(), transaction.commit_on_success():
+    Otherwise, another thread could take the turn between two of its writes and wait for the lock,
+    while the transaction waits for its next turn.
+    """
+    if getattr(settings, "DEFAULT_DB_SINGLE_WRITER", False):
+        with write_queue.turn():
+            yield
+    else:
+        yield
+
+
+def serialized_write(func):
+    """
+    Decorator for functions that write to the database (e.g. Model.save), see single_writer.
+    Goes outside transaction decorators:
+        @serialized_write
+        @transaction.commit_on_success
+        def soft_delete(self):
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with single_writer():
+            return func(*args, **kwargs)
+    return wrapper
@@ -1,3 +1,4 @@
 from cli_tests import *
+from sqlite_tests import *
 from url_tests import *
 from browser_tests import *
@@ -0,0 +1,100 @@
+"""
+Tests for the tuning of the main SQLite database
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from kalite.distributed import sqlite
+from kalite.distributed.sqlite import WriteQueue, single_writer
+
+
+class ConnectionPragmaTestCase(TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "data.sqlite")
+
+    def tearDown(self):
+        sqlite.stop_checkpointer()
+        shutil.rmtree(self.tempdir)
+
+    def connect(self):
+        wrapper = DatabaseWrapper({
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": self.path,
+            "OPTIONS": {"timeout": 60},
+            "USER": "", "PASSWORD": "", "HOST": "", "PORT": "",
+            "TIME_ZONE": None,
+        }, alias="default")
+        self.addCleanup(wrapper.close)
+        return wrapper.cursor()
+
+    def test_pragmas_applied_to_new_connections(self):
+        cursor = self.connect()
+        self.assertEqual(cursor.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(cursor.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        self.assertEqual(cursor.execute("PRAGMA cache_size").fetchone()[0], -16000)
+
+    @override_settings(DEFAULT_DB_CHECKPOINT_INTERVAL=60)
+    def test_checkpointer_started_once(self):
+        self.connect()
+        checkpointer = sqlite._checkpointer
+        self.assertTrue(checkpointer.is_alive())
+        self.connect()
+        self.assertIs(sqlite._checkpointer, checkpointer)
+
+        cursor = self.connect()
+        cursor.execute("CREATE TABLE t (x INTEGER)")
+        cursor.execute("INSERT INTO t VALUES (1)")
+        busy, wal_pages, checkpointed = checkpointer.checkpoint()
+        self.assertEqual(busy, 0)
+        self.assertEqual(wal_pages, checkpointed)
+
+
+class WriteQueueTestCase(TestCase):
+
+    def test_writers_take_turns_in_order(self):
+        queue = WriteQueue()
+        order = []
+        threads = []
+
+        with queue.turn():
+            for i in range(3):
+                thread = threading.Thread(target=self.write, args=(queue, order, i))
+                thread.start()
+                threads.append(thread)
+                # Wait for the thread to join the queue before starting the next one
+                while queue.waiting < i + 2:
+                    time.sleep(0.001)
+            # Taking another turn from the same thread doesn't wait for the others
+            with queue.turn():
+                order.append("reentrant")
+            order.append("first")
+
+        for thread in threads:
+            thread.join()
+        self.assertEqual(order, ["reentrant", "first", 0, 1, 2])
+        self.assertEqual(queue.waiting, 0)
+
+    def write(self, queue, order, i):
+        with queue.turn():
+            order.append(i)
+
+    @override_settings(DEFAULT_DB_SINGLE_WRITER=False)
+    def test_single_writer_disabled(self):
+        with sqlite.write_queue.turn():
+            thread = threading.Thread(target=self.write_unqueued)
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive(), "Writes shouldn't be queued when DEFAULT_DB_SINGLE_WRITER is off")
+
+    def write_unqueued(self):
+        with single_writer():
+            pass
@@ -0,0 +1,243 @@
+"""
+Server-side session store, used as the SESSION_ENGINE.
+
+Sessions used to be kept in signed cookies, which carried the pickled FacilityUser of the
+logged-in learner, along with everything else in the session, back and forth on every request.
+Instead, the cookie now only holds the session key, and sessions are kept in a separate SQLite
+database (SESSION_DATABASE_PATH), so that saving a session on every request doesn't compete
+with learner logs for the lock on the main database. When there are more than
+SESSION_STORE_MAX_ENTRIES sessions, the least recently used ones are dropped.
+
+Of the FacilityUser, only the id is stored; it is turned back into a FacilityUser by a
+per-process identity cache, which forgets users as soon as they are saved or deleted.
+"""
+from __future__ import absolute_import
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase, CreateError
+from django.core.exceptions import SuspiciousOperation
+from django.db.models.signals import post_save, post_delete
+logging = settings.LOG
+
+from .models import FacilityUser
+
+# Session key under which the logged-in FacilityUser is kept
+FACILITY_USER_KEY = "facility_user"
+FACILITY_USER_ID_KEY = "_facility_user_id"
+
+
+class FacilityUserCache(object):
+    """Thread-safe LRU cache of FacilityUsers, by id."""
+
+    def __init__(self, size):
+        self.size = size
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, user_id):
+        """
+        Return a copy of the user with this id, loading it if it isn't cached,
+        or None if there is no such user.
+        """
+        with self._lock:
+            user = self._users.pop(user_id, None)
+            if user:
+                self._users[user_id] = user
+                return self._copy(user)
+            generation = self._generation
+
+        try:
+            user = FacilityUser.objects.get(id=user_id)
+        except FacilityUser.DoesNotExist:
+            return None
+        with self._lock:
+            # Don't cache the user if it was changed while being loaded
+            if self._generation == generation:
+                self._users[user_id] = user
+                while len(self._users) > self.size:
+                    self._users.popitem(last=False)
+        return self._copy(user)
+
+    def invalidate(self, user_id=None):
+        """Drop a user, or all users."""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    @staticmethod
+    def _copy(user):
+        # Each request gets its own instance, as it used to when unpickling it from the session
+        copy = FacilityUser(**dict((f.attname, getattr(user, f.attname)) for f in user._meta.fields))
+        copy._state.adding = False
+        copy._state.db = user._state.db
+        return copy
+
+
+facility_users = FacilityUserCache(getattr(settings, "FACILITY_USER_CACHE_SIZE", 500))
+
+def invalidate_facility_user(sender, **kwargs):
+    facility_users.invalidate(kwargs["instance"].id)
+post_save.connect(invalidate_facility_user, sender=FacilityUser)
+post_delete.connect(invalidate_facility_user, sender=FacilityUser)
+
+
+class SessionDatabase(object):
+    """
+    SQLite database of sessions, with one connection per thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # In WAL mode, synchronous=NORMAL doesn't wait for the disk on each commit; a power
+            # loss can lose the last sessions, which is harmless, but doesn't corrupt the file
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session ("
+                "session_key TEXT PRIMARY KEY, session_data TEXT NOT NULL, "
+                "expire_date REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS session_last_access ON session (last_access)")
+            self._local.connection = conn
+        return conn
+
+    def load(self, session_key):
+        row = self.connection.execute(
+            "SELECT session_data FROM session WHERE session_key = ? AND expire_date > ?",
+            (session_key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def exists(self, session_key):
+        return self.connection.execute("SELECT 1 FROM session WHERE session_key = ?", (session_key,)).fetchone() is not None
+
+    def save(self, session_key, session_data, expire_date, must_create=False):
+        statement = "INSERT INTO" if must_create else "INSERT OR REPLACE INTO"
+        try:
+            self.connection.execute(
+                statement + " session (session_key, session_data, expire_date, last_access) VALUES (?, ?, ?, ?)",
+                (session_key, session_data, expire_date, time.time()),
+            )
+        except sqlite3.IntegrityError:
+            raise CreateError
+
+    def delete(self, session_key):
+        self.connection.execute("DELETE FROM session WHERE session_key = ?", (session_key,))
+
+    def evict(self, max_entries):
+        """Drop the least recently used sessions, beyond the first max_entries."""
+        self.connection.execute(
+            "DELETE FROM session WHERE session_key IN "
+            "(SELECT session_key FROM session ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+
+    def clear_expired(self):
+        self.connection.execute("DELETE FROM session WHERE expire_date < ?", (time.time(),))
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_session_database():
+    path = settings.SESSION_DATABASE_PATH
+    with _databases_lock:
+        if path not in _databases:
+            _databases[path] = SessionDatabase(path)
+        return _databases[path]
+
+
+class SessionStore(SessionBase):
+    """
+    Implements the SQLite session store.
+    """
+
+    def __init__(self, session_key=None):
+        super(SessionStore, self).__init__(session_key)
+        self.db = get_session_database()
+
+    def load(self):
+        session_data = self.db.load(self.session_key) if self.session_key else None
+        if session_data is not None:
+            try:
+                return self.decode(session_data)
+            except SuspiciousOperation:
+                pass
+        self.create()
+        return {}
+
+    def exists(self, session_key):
+        return self.db.exists(session_key)
+
+    def create(self):
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                # Save immediately to ensure we have a unique entry in the database.
+                self.save(must_create=True)
+            except CreateError:
+                # Key wasn't unique. Try again.
+                continue
+            self.modified = True
+            self._session_cache = {}
+            return
+
+    def save(self, must_create=False):
+        new_session = must_create or self.session_key is None
+        self.db.save(
+            self._get_or_create_session_key(),
+            self.encode(self._get_session(no_load=must_create)),
+            time.mktime(self.get_expiry_date().timetuple()),
+            must_create=must_create,
+        )
+        if new_session:
+            # New sessions are what makes the store grow, so this is where to trim it
+            self.db.evict(getattr(settings, "SESSION_STORE_MAX_ENTRIES", 5000))
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self.db.delete(session_key)
+
+    def encode(self, session_dict):
+        user = session_dict.get(FACILITY_USER_KEY)
+        if isinstance(user, FacilityUser) and user.id:
+            session_dict = dict(session_dict)
+            del session_dict[FACILITY_USER_KEY]
+            session_dict[FACILITY_USER_ID_KEY] = user.id
+        return super(SessionStore, self).encode(session_dict)
+
+    def decode(self, session_data):
+        session_dict = super(SessionStore, self).decode(session_data)
+        user_id = session_dict.pop(FACILITY_USER_ID_KEY, None)
+        if user_id:
+            user = facility_users.get(user_id)
+            if user:
+                session_dict[FACILITY_USER_KEY] = user
+            else:
+                # The user was deleted, so it's no longer logged in
+                logging.debug("Facility user %s of session no longer exists" % user_id)
+        return session_dict
+
+    @classmethod
+    def clear_expired(cls):
+        get_session_database().clear_expired()
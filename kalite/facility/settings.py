@@ -22,6 +22,9 @@ PASSWORD_CONSTRAINTS = {
 }
 
 
+# Number of FacilityUsers of logged-in sessions to keep in memory, see sessions.py
+FACILITY_USER_CACHE_SIZE = 500
+
 DISABLE_SELF_ADMIN = False  #
 
 RESTRICTED_TEACHER_PERMISSIONS = False  # setting this to True will disable creating/editing/deleting facilties/students for teachers
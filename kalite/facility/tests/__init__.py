@@ -5,4 +5,5 @@ from crypto_tests import *
 from deletion_tests import *
 from form_tests import *
 from unicode_tests import *
-from api_resource_tests import *
\ No newline at end of file
+from api_resource_tests import *
+from session_tests import *
@@ -0,0 +1,95 @@
+import base64
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from kalite.facility.models import FacilityUser
+from kalite.facility.sessions import SessionStore, facility_users, get_session_database
+from kalite.testing.base import KALiteClientTestCase, KALiteTestCase
+from kalite.testing.mixins.facility_mixins import FacilityMixins
+
+
+class SessionDatabaseMixin(object):
+
+    def setUp(self):
+        super(SessionDatabaseMixin, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+        self.settings_override = override_settings(SESSION_DATABASE_PATH=os.path.join(self.tempdir, "sessions.sqlite"))
+        self.settings_override.enable()
+        facility_users.invalidate()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.tempdir)
+        super(SessionDatabaseMixin, self).tearDown()
+
+
+class SessionStoreTests(SessionDatabaseMixin, FacilityMixins, KALiteClientTestCase):
+
+    def setUp(self):
+        super(SessionStoreTests, self).setUp()
+        self.password = "abc123"
+        self.student = self.create_student(password=self.password)
+
+    def login(self):
+        return self.client.post(
+            self.reverse("api_dispatch_list", kwargs={"resource_name": "user"}) + "login/",
+            json.dumps({
+                "username": self.student.username,
+                "password": self.password,
+                "facility": self.student.facility.id,
+            }),
+            content_type="application/json",
+        )
+
+    def test_only_session_key_in_cookie(self):
+        self.login()
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.assertLess(len(session_key), 64)
+
+        self.assertEqual(SessionStore(session_key)["facility_user"].id, self.student.id)
+        # Only the id of the user is stored
+        stored = base64.b64decode(get_session_database().load(session_key))
+        self.assertIn(self.student.id, stored)
+        self.assertNotIn("FacilityUser", stored)
+
+    def test_missing_user_is_logged_out(self):
+        session = SessionStore()
+        session["facility_user"] = self.student
+        session.save()
+        FacilityUser.objects.filter(id=self.student.id).update(id="0" * 32)
+        facility_users.invalidate()
+
+        self.assertNotIn("facility_user", SessionStore(session.session_key))
+
+    @override_settings(SESSION_STORE_MAX_ENTRIES=2)
+    def test_least_recently_used_sessions_evicted(self):
+        sessions = []
+        for i in range(3):
+            session = SessionStore()
+            session["i"] = i
+            session.save()
+            sessions.append(session.session_key)
+
+        self.assertFalse(SessionStore().exists(sessions[0]))
+        self.assertTrue(SessionStore().exists(sessions[1]))
+        self.assertTrue(SessionStore().exists(sessions[2]))
+
+
+class FacilityUserCacheTests(SessionDatabaseMixin, FacilityMixins, KALiteTestCase):
+
+    def test_cached_until_saved(self):
+        student = self.create_student()
+        with self.assertNumQueries(1):
+            facility_users.get(student.id)
+            user = facility_users.get(student.id)
+        self.assertEqual(user.username, student.username)
+        self.assertIsNot(user, facility_users.get(student.id))
+
+        student.first_name = "Changed"
+        student.save()
+        self.assertEqual(facility_users.get(student.id).first_name, "Changed")
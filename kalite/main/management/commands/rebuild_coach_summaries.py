@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from kalite.main.models import GroupDaySummary, LearnerContentSummary
+
+
+logging = settings.LOG
+
+
+class Command(BaseCommand):
+    help = "Recompute the learner and group summaries used by coach reports from all exercise, video and content logs."
+
+    def handle(self, *args, **kwargs):
+        summaries = LearnerContentSummary.rebuild()
+        group_summaries = GroupDaySummary.rebuild()
+        logging.info("Summarized {summaries} logs into {group_summaries} group summaries.".format(
+            summaries=summaries, group_summaries=group_summaries))
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from kalite.main.models import ExerciseTransition
+
+
+logging = settings.LOG
+
+
+class Command(BaseCommand):
+    help = "Recount the exercise transitions used for group recommendations from all exercise logs."
+
+    def handle(self, *args, **kwargs):
+        transitions = ExerciseTransition.rebuild()
+        logging.info("Counted {transitions} exercise transitions.".format(transitions=transitions))
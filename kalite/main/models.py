@@ -3,8 +3,13 @@ All models associated with user learning / usage, including:
 * Exercise/Video progress
 * Login stats
 """
+import atexit
 import random
+import threading
+import time
 import uuid
+from collections import Counter
+from itertools import groupby
 from math import ceil
 from datetime import datetime
 from dateutil import relativedelta
@@ -12,15 +17,16 @@ from dateutil import relativedelta
 from django.conf import settings; logging = settings.LOG
 from django.contrib.auth.signals import user_logged_out
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Sum
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Sum
 from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
 
 from fle_utils.django_utils.classes import ExtendedModel
 from fle_utils.general import datediff, isnumeric
+from kalite.distributed.sqlite import serialized_write
 from kalite.topic_tools.content_models import get_video_from_youtube_id
-from kalite.facility.models import FacilityUser
+from kalite.facility.models import Facility, FacilityGroup, FacilityUser
 from kalite.dynamic_assets.utils import load_dynamic_settings
 from securesync.models import DeferredCountSyncedModel, Device
 from kalite.topic_tools.settings import CHANNEL
@@ -59,6 +65,7 @@ class VideoLog(DeferredCountSyncedModel):
             " (completed)" if self.complete else "",
         )
 
+    @serialized_write
     def save(self, *args, **kwargs):
         # To deal with backwards compatibility,
         #   check video_id, whether imported or not.
@@ -73,7 +80,7 @@ class VideoLog(DeferredCountSyncedModel):
             self.full_clean()
 
             try:
-                UserLog.update_user_activity(self.user, activity_type="login", update_datetime=(self.completion_timestamp or datetime.now()), language=self.language)
+                user_activity.update(self.user, activity_type="login", update_datetime=(self.completion_timestamp or datetime.now()), language=self.language)
             except ValidationError as e:
                 logging.error("Failed to update userlog during video: %s" % e)
 
@@ -113,6 +120,7 @@ class ExerciseLog(DeferredCountSyncedModel):
     def __init__(self, *args, **kwargs):
         super(ExerciseLog, self).__init__(*args, **kwargs)
         self._unhashable_fields += ("latest_activity_timestamp",) # since it's being stripped out by minversion, we can't include it in the signature
+        self._initial_completion_timestamp = self.completion_timestamp  # to detect new completions, see record_exercise_transition
 
     class Meta:  # needed to clear out the app_name property from SyncedClass.Meta
         pass
@@ -120,6 +128,7 @@ class ExerciseLog(DeferredCountSyncedModel):
     def __unicode__(self):
         return u"user=%s, exercise_id=%s, points=%d, language=%s%s" % (self.user, self.exercise_id, self.points, self.language, " (completed)" if self.complete else "")
 
+    @serialized_write
     def save(self, *args, **kwargs):
         if not kwargs.get("imported", False):
             self.full_clean()
@@ -135,7 +144,7 @@ class ExerciseLog(DeferredCountSyncedModel):
                 self.attempts_before_completion = self.attempts
 
             try:
-                UserLog.update_user_activity(self.user, activity_type="login", update_datetime=(self.completion_timestamp or datetime.now()), language=self.language)
+                user_activity.update(self.user, activity_type="login", update_datetime=(self.completion_timestamp or datetime.now()), language=self.language)
             except ValidationError as e:
                 logging.error("Failed to update userlog during exercise: %s" % e)
 
@@ -166,6 +175,64 @@ class ExerciseLog(DeferredCountSyncedModel):
         return ExerciseLog.objects.filter(user=user).aggregate(Sum("points")).get("points__sum", 0) or 0
 
 
+class ExerciseTransition(ExtendedModel):  # Not sync'd, derived from ExerciseLogs
+    """How many learners in a group completed one exercise right after another.
+    Maintained as ExerciseLogs are saved (see record_exercise_transition), so that
+    group recommendations are a lookup rather than a scan over every learner's logs.
+    """
+
+    group = models.ForeignKey(FacilityGroup, blank=True, null=True, db_index=True)
+    from_exercise_id = models.CharField(max_length=200, db_index=True)
+    to_exercise_id = models.CharField(max_length=200)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("group", "from_exercise_id", "to_exercise_id")
+
+    def __unicode__(self):
+        return u"group=%s, %s -> %s: %d" % (self.group, self.from_exercise_id, self.to_exercise_id, self.count)
+
+    @classmethod
+    def record_completion(cls, exercise_log):
+        """Count the transition from the exercise the user completed before this one."""
+        previous = ExerciseLog.objects \
+            .filter(user=exercise_log.user, completion_timestamp__lt=exercise_log.completion_timestamp) \
+            .exclude(pk=exercise_log.pk) \
+            .order_by("-completion_timestamp") \
+            .values_list("exercise_id", flat=True)[:1]
+        if previous:
+            transition, _ = cls.objects.get_or_create(
+                group=exercise_log.user.group,
+                from_exercise_id=previous[0],
+                to_exercise_id=exercise_log.exercise_id,
+            )
+            cls.objects.filter(pk=transition.pk).update(count=F("count") + 1)
+
+    @classmethod
+    @transaction.commit_on_success
+    def rebuild(cls):
+        """Recount all transitions from scratch, e.g. when logs have been synced in out of order,
+        or learners have changed groups."""
+        counts = Counter()
+        logs = ExerciseLog.objects \
+            .filter(completion_timestamp__isnull=False) \
+            .order_by("user", "completion_timestamp") \
+            .values_list("user", "user__group", "exercise_id")
+        for _, user_logs in groupby(logs, key=lambda log: log[0]):
+            previous = None
+            for _, group_id, exercise_id in user_logs:
+                if previous:
+                    counts[(group_id, previous, exercise_id)] += 1
+                previous = exercise_id
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create([
+            cls(group_id=group_id, from_exercise_id=from_exercise_id, to_exercise_id=to_exercise_id, count=count)
+            for (group_id, from_exercise_id, to_exercise_id), count in counts.iteritems()
+        ], batch_size=200)
+        return len(counts)
+
+
 class UserLogSummary(DeferredCountSyncedModel):
     """Like UserLogs, but summarized over a longer period of time.
     Also sync'd across devices.  Unique per user, device, activity_type, and time period."""
@@ -330,6 +397,7 @@ class UserLog(ExtendedModel):  # Not sync'd, only summaries are
         else:
             return u"%s (%s): logged in @ %s; last active @ %s" % (self.user.username, self.language, self.start_datetime, self.last_active_datetime)
 
+    @serialized_write
     def save(self, *args, **kwargs):
 
         # Do nothing if the max # of records is zero
@@ -382,6 +450,9 @@ class UserLog(ExtendedModel):  # Not sync'd, only summaries are
             start_datetime = datetime.now()
         activity_type = cls.get_activity_int(activity_type)
 
+        # Buffered updates belong to the activity that's open now
+        user_activity.flush(user=user)
+
         cur_log = cls.get_latest_open_log_or_None(user=user, activity_type=activity_type)
         if cur_log:
             # Seems we're logging in without logging out of the previous.
@@ -448,6 +519,8 @@ class UserLog(ExtendedModel):  # Not sync'd, only summaries are
             end_datetime = datetime.now()
         activity_type = cls.get_activity_int(activity_type)
 
+        user_activity.flush(user=user)
+
         cur_log = cls.get_latest_open_log_or_None(user=user, activity_type=activity_type)
 
         if cur_log:
@@ -466,6 +539,147 @@ class UserLog(ExtendedModel):  # Not sync'd, only summaries are
         return cur_log
 
 
+class UserActivityBuffer(object):
+    """Collects updates to users' open activity logs in memory, so that saving progress doesn't
+    write to UserLog every time (see UserLog.update_user_activity).
+
+    Pending updates are coalesced per user and activity type, and written in a single transaction
+    by a timer thread once they've waited USER_LOG_FLUSH_INTERVAL seconds, and at exit; an update
+    that comes along after that interval writes that user's updates itself. A user's pending
+    updates are also written before their activity begins or ends (e.g. at login and logout), so
+    that UserLog and UserLogSummary see them in order.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._pending = {}  # (user id, activity type) -> [user, update_datetime, language]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.RLock()  # re-entrant, as writing may begin a user's activity
+        self._last_flush = time.time()
+        self._timer = None
+
+    def update(self, user, activity_type="login", update_datetime=None, language=None):
+        """Same as UserLog.update_user_activity, but written later."""
+
+        # Do nothing if the max # of records is zero
+        # (i.e. this functionality is disabled)
+        if not UserLog.is_enabled():
+            return
+
+        if not user:
+            raise ValidationError("A valid user must always be specified.")
+        if not update_datetime:  # must be done outside the function header (else becomes static)
+            update_datetime = datetime.now()
+        activity_type = UserLog.get_activity_int(activity_type)
+
+        self._add((user.pk, activity_type), [user, update_datetime, language])
+
+        if not self.interval or time.time() - self._last_flush >= self.interval:
+            # Only this user's updates are written here, as this may be within the transaction
+            #   of their request; other users' are left to the timer.
+            # If another thread is already writing, leave it to that one.
+            self.flush(user=user, blocking=False)
+
+    def _add(self, key, entry):
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending:
+                pending[1] = max(pending[1], entry[1])
+                pending[2] = entry[2] or pending[2]
+            else:
+                self._pending[key] = entry
+            if self.interval and not self._timer:
+                # Make sure the updates get written, even if no more come along
+                self._timer = threading.Timer(self.interval, self._flush_from_timer)
+                self._timer.name = "user-activity-flush"
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_from_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread has its own database connection
+            connection.close()
+
+    def flush(self, user=None, blocking=True):
+        """Write pending updates, for a single user or for everyone."""
+        if not self._flush_lock.acquire(blocking):
+            return
+        try:
+            with self._lock:
+                if user:
+                    keys = [key for key in self._pending if key[0] == user.pk]
+                    pending = dict((key, self._pending.pop(key)) for key in keys)
+                else:
+                    pending, self._pending = self._pending, {}
+                    self._last_flush = time.time()
+            if pending:
+                self._write(pending)
+        finally:
+            self._flush_lock.release()
+
+    def discard(self):
+        """Forget all pending updates."""
+        with self._lock:
+            self._pending = {}
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    @serialized_write
+    def _write(self, pending):
+        if transaction.is_managed():
+            # This may be called while saving a log, within the transaction that log is saved in;
+            #   commit_on_success would commit that transaction, so the updates become part of it.
+            #   There is no savepoint to roll back to on SQLite, so if writing fails partway, what
+            #   was written stays in the transaction, and retrying the updates would write them twice.
+            try:
+                self._write_logs(pending)
+            except Exception as e:
+                logging.error("Failed to write %d userlog updates: %s" % (len(pending), e))
+            return
+        try:
+            with transaction.commit_on_success():
+                self._write_logs(pending)
+        except Exception as e:
+            # e.g. the database is locked; keep the updates for next time.
+            logging.error("Failed to write %d userlog updates, will retry: %s" % (len(pending), e))
+            for key, entry in pending.iteritems():
+                self._add(key, entry)
+
+    def _write_logs(self, pending):
+        # Look up all open logs at once, rather than one user at a time
+        open_logs = {}
+        logs = UserLog.objects.exclude(end_datetime__gt="1900-01-01") \
+            .filter(user__in=set(user_id for user_id, _ in pending)) \
+            .order_by("last_active_datetime")
+        for log in logs:
+            open_logs[(log.user_id, log.activity_type)] = log
+
+        for key, (user, update_datetime, language) in pending.iteritems():
+            log = open_logs.get(key)
+            try:
+                if not log:
+                    UserLog.update_user_activity(user, activity_type=key[1], update_datetime=update_datetime, language=language)
+                    continue
+                # How could you start after you updated??
+                if log.start_datetime > update_datetime:
+                    raise ValidationError("Update time must always be later than the login time.")
+                log.user = user
+                log.last_active_datetime = max(log.last_active_datetime, update_datetime)
+                log.language = language or log.language
+                log.save()
+            except ValidationError as e:
+                logging.error("Failed to update userlog for %s: %s" % (user.username, e))
+
+
+user_activity = UserActivityBuffer(getattr(settings, "USER_LOG_FLUSH_INTERVAL", 10))
+atexit.register(user_activity.flush)
+
+
 class AttemptLog(DeferredCountSyncedModel):
     """
     Detailed instances of user exercise engagement.
@@ -495,6 +709,10 @@ class AttemptLog(DeferredCountSyncedModel):
             ["user", "exercise_id", "context_type"],
         ]
 
+    @serialized_write
+    def save(self, *args, **kwargs):
+        super(AttemptLog, self).save(*args, **kwargs)
+
 
 class ContentLog(DeferredCountSyncedModel):
 
@@ -528,6 +746,7 @@ class ContentLog(DeferredCountSyncedModel):
     def get_points_for_user(user):
         return ContentLog.objects.filter(user=user).aggregate(Sum("points")).get("points__sum", 0) or 0
 
+    @serialized_write
     def save(self, *args, **kwargs):
         if self.content_id and not self.complete:
             self.progress_timestamp = datetime.now()
@@ -544,6 +763,243 @@ class ContentLog(DeferredCountSyncedModel):
         return uuid.uuid5(namespace, hashtext.encode("utf-8")).hex
 
 
+# For each kind of log summarized for coach reports:
+#   (log model, content id field, progress field, time spent field)
+SUMMARIZED_LOG_TYPES = {
+    "exercise": (ExerciseLog, "exercise_id", "streak_progress", None),
+    "video": (VideoLog, "video_id", None, "total_seconds_watched"),
+    "content": (ContentLog, "content_id", "progress", "time_spent"),
+}
+
+
+class LearnerContentSummary(ExtendedModel):  # Not sync'd, derived from Exercise/Video/ContentLogs
+    """The state of a learner's log for one content item, filed under the day of its latest activity.
+    Maintained as logs are saved (see update_learner_content_summary), so that coach reports
+    don't have to aggregate over the logs themselves.
+    """
+
+    user = models.ForeignKey(FacilityUser, db_index=True)
+    kind = models.CharField(max_length=10)  # one of SUMMARIZED_LOG_TYPES
+    content_id = models.CharField(max_length=200, db_index=True)
+    day = models.DateField(db_index=True)
+    latest_activity_timestamp = models.DateTimeField()
+    complete = models.BooleanField(default=False)
+    struggling = models.BooleanField(default=False)
+    progress = models.FloatField(blank=True, null=True)
+    time_spent = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ("user", "kind", "content_id")
+        index_together = [
+            ["user", "day"],
+        ]
+
+    def __unicode__(self):
+        return u"user=%s, %s %s on %s%s" % (self.user, self.kind, self.content_id, self.day, " (completed)" if self.complete else "")
+
+    @staticmethod
+    def _log_fields(kind):
+        """The fields of a log of the given kind that go into its summary."""
+        _, id_field, progress_field, time_field = SUMMARIZED_LOG_TYPES[kind]
+        fields = ["user", id_field, "latest_activity_timestamp", "complete"]
+        if kind == "exercise":
+            fields.append("struggling")
+        return fields + filter(None, [progress_field, time_field])
+
+    @classmethod
+    def _from_log_values(cls, kind, values):
+        """Summarize a log, given a dict of its _log_fields."""
+        _, id_field, progress_field, time_field = SUMMARIZED_LOG_TYPES[kind]
+        return cls(
+            user_id=values["user"],
+            kind=kind,
+            content_id=values[id_field],
+            day=values["latest_activity_timestamp"].date(),
+            latest_activity_timestamp=values["latest_activity_timestamp"],
+            complete=values["complete"],
+            struggling=values.get("struggling", False),
+            progress=values.get(progress_field),
+            time_spent=values.get(time_field) or 0,
+        )
+
+    # Fields that the group summaries are counted from
+    _group_fields = ("day", "complete", "struggling", "progress", "time_spent")
+
+    @classmethod
+    def update_for_log(cls, kind, log):
+        """Bring the summary of the given log, and the group summaries it counts towards, up to date."""
+        values = dict((field, getattr(log, field)) for field in cls._log_fields(kind)[1:])
+        values["user"] = log.user_id
+        existing = list(cls.objects.filter(user=log.user_id, kind=kind, content_id=values[SUMMARIZED_LOG_TYPES[kind][1]]))
+        days = set(summary.day for summary in existing)
+
+        if log.latest_activity_timestamp:
+            summary = cls._from_log_values(kind, values)
+            group_unchanged = False
+            if existing:
+                summary.id = existing[0].id
+                group_unchanged = all(getattr(summary, field) == getattr(existing[0], field) for field in cls._group_fields)
+                if group_unchanged and summary.latest_activity_timestamp == existing[0].latest_activity_timestamp:
+                    return  # Saved without any change to what is summarized
+            summary.save()
+            if group_unchanged:
+                return
+            days.add(summary.day)
+        elif existing:
+            cls.objects.filter(id__in=[summary.id for summary in existing]).delete()
+        else:
+            return
+
+        GroupDaySummary.refresh(log.user, kind, days)
+
+    @classmethod
+    @transaction.commit_on_success
+    def rebuild(cls):
+        """Summarize all logs from scratch, e.g. after logs have been imported without saving them one by one."""
+        cls.objects.all().delete()
+        count = 0
+        for kind, (LogModel, _, _, _) in SUMMARIZED_LOG_TYPES.iteritems():
+            logs = LogModel.objects \
+                .filter(user__isnull=False, latest_activity_timestamp__isnull=False) \
+                .values(*cls._log_fields(kind))
+            summaries = [cls._from_log_values(kind, values) for values in logs]
+            cls.objects.bulk_create(summaries, batch_size=200)
+            count += len(summaries)
+        return count
+
+
+class GroupDaySummary(ExtendedModel):  # Not sync'd, derived from LearnerContentSummaries
+    """Totals over the LearnerContentSummaries of one kind for the learners in a group, for a single day.
+    Learners without a group are summarized per facility, with group set to None.
+    """
+
+    facility = models.ForeignKey(Facility, db_index=True)
+    group = models.ForeignKey(FacilityGroup, blank=True, null=True, db_index=True)
+    day = models.DateField(db_index=True)
+    kind = models.CharField(max_length=10)
+    logs = models.IntegerField(default=0)
+    complete = models.IntegerField(default=0)
+    struggling = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    progress = models.FloatField(default=0)  # Sum over all logs, for averaging
+    time_spent = models.FloatField(default=0)
+
+    def __unicode__(self):
+        return u"group=%s, %s on %s: %d logs" % (self.group, self.kind, self.day, self.logs)
+
+    def add(self, complete, struggling, logs, progress, time_spent):
+        """Count logs that are all complete/struggling or not, along with their summed progress and time spent."""
+        self.logs += logs
+        if complete:
+            self.complete += logs
+        elif struggling:
+            self.struggling += logs
+        else:
+            self.in_progress += logs
+        self.progress += progress or 0
+        self.time_spent += time_spent or 0
+
+    @staticmethod
+    def _summary_totals(summaries, *fields):
+        return summaries \
+            .filter(user__is_teacher=False, user__deleted=False) \
+            .values(*(fields + ("complete", "struggling"))) \
+            .annotate(logs=Count("id"), progress_sum=Sum("progress"), time_spent_sum=Sum("time_spent")) \
+            .order_by()
+
+    @classmethod
+    def totals_by_kind(cls, group_summaries):
+        """Add up the given group summaries into one unsaved GroupDaySummary per kind."""
+        totals = {}
+        for total in group_summaries \
+                .values("kind") \
+                .annotate(
+                    logs_sum=Sum("logs"),
+                    complete_sum=Sum("complete"),
+                    struggling_sum=Sum("struggling"),
+                    in_progress_sum=Sum("in_progress"),
+                    progress_sum=Sum("progress"),
+                    time_spent_sum=Sum("time_spent")) \
+                .order_by():
+            totals[total["kind"]] = cls(
+                kind=total["kind"],
+                logs=total["logs_sum"],
+                complete=total["complete_sum"],
+                struggling=total["struggling_sum"],
+                in_progress=total["in_progress_sum"],
+                progress=total["progress_sum"],
+                time_spent=total["time_spent_sum"],
+            )
+        return totals
+
+    @classmethod
+    def totals_by_kind_from_learners(cls, summaries):
+        """Like totals_by_kind, but adding up LearnerContentSummaries, e.g. for learners picked individually."""
+        totals = {}
+        for total in cls._summary_totals(summaries, "kind"):
+            summary = totals.setdefault(total["kind"], cls(kind=total["kind"]))
+            summary.add(total["complete"], total["struggling"], total["logs"], total["progress_sum"], total["time_spent_sum"])
+        return totals
+
+    @classmethod
+    def refresh(cls, user, kind, days):
+        """Recount the given days of the summaries of the user's group."""
+        for day in days:
+            summary = cls(facility_id=user.facility_id, group_id=user.group_id, day=day, kind=kind)
+            summaries = LearnerContentSummary.objects.filter(user__facility=user.facility_id, user__group=user.group_id, kind=kind, day=day)
+            for totals in cls._summary_totals(summaries):
+                summary.add(totals["complete"], totals["struggling"], totals["logs"], totals["progress_sum"], totals["time_spent_sum"])
+
+            # No transaction of its own: this runs as logs are saved, within whatever transaction
+            #   the log is saved in (and commit_on_success would commit that transaction).
+            cls.objects.filter(facility=user.facility_id, group=user.group_id, day=day, kind=kind).delete()
+            if summary.logs:
+                summary.save()
+
+    @classmethod
+    @transaction.commit_on_success
+    def rebuild(cls):
+        """Recount all group summaries from the learner summaries, e.g. when learners have changed groups."""
+        summaries = {}
+        fields = ("user__facility", "user__group", "day", "kind")
+        for totals in cls._summary_totals(LearnerContentSummary.objects.all(), *fields):
+            key = tuple(totals[field] for field in fields)
+            if key not in summaries:
+                summaries[key] = cls(facility_id=key[0], group_id=key[1], day=key[2], kind=key[3])
+            summaries[key].add(totals["complete"], totals["struggling"], totals["logs"], totals["progress_sum"], totals["time_spent_sum"])
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(summaries.values(), batch_size=200)
+        return len(summaries)
+
+
+@receiver(post_save, sender=ExerciseLog)
+def record_exercise_transition(sender, **kwargs):
+    """
+    Count a transition whenever an exercise gets completed.
+    """
+    instance = kwargs["instance"]
+    if kwargs.get("raw") or not instance.user_id:
+        return
+    if instance.completion_timestamp and (kwargs["created"] or instance.completion_timestamp != instance._initial_completion_timestamp):
+        ExerciseTransition.record_completion(instance)
+    instance._initial_completion_timestamp = instance.completion_timestamp
+
+
+@receiver(post_save, sender=ExerciseLog)
+@receiver(post_save, sender=VideoLog)
+@receiver(post_save, sender=ContentLog)
+def update_learner_content_summary(sender, **kwargs):
+    """
+    Keep the coach report summaries up to date with every saved log.
+    """
+    instance = kwargs["instance"]
+    if kwargs.get("raw") or not instance.user_id:
+        return
+    kind = next(kind for kind, (LogModel, _, _, _) in SUMMARIZED_LOG_TYPES.iteritems() if LogModel == sender)
+    LearnerContentSummary.update_for_log(kind, instance)
+
+
 # issue #5157
 @receiver(pre_save, sender=UserLog)
 def add_to_summary(sender, **kwargs):
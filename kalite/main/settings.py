@@ -6,3 +6,7 @@
 #   NOTE: None means no limit (infinite)
 USER_LOG_MAX_RECORDS_PER_USER = 1
 USER_LOG_SUMMARY_FREQUENCY = (1, "day")
+
+# How often, in seconds, learners' activity is written to their UserLog (see UserActivityBuffer).
+#   0 writes every update straight away.
+USER_LOG_FLUSH_INTERVAL = 10
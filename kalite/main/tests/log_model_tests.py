@@ -1,8 +1,19 @@
+import datetime
+import threading
+
+from django.db import DatabaseError, transaction
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
 from django.utils import unittest
+from mock import patch
 
-from ..models import VideoLog, ExerciseLog
-from kalite.facility.models import Facility, FacilityUser
+from ..models import VideoLog, ExerciseLog, ExerciseTransition, LearnerContentSummary, GroupDaySummary, \
+    UserLog, UserLogSummary, user_activity
+from kalite.distributed import sqlite
+from kalite.facility.models import Facility, FacilityGroup, FacilityUser
 from kalite.testing.base import KALiteTestCase
+from kalite.testing.mixins.securesync_mixins import CreateDeviceMixin
+from securesync.engine.utils import serialize, save_serialized_models
 
 
 class TestExerciseLogs(KALiteTestCase):
@@ -137,3 +148,300 @@ class TestVideoLogs(KALiteTestCase):
         # make sure the VideoLog has been properly merged
         self.assertEqual(videolog.points, max(self.ORIGINAL_POINTS, self.NEW_POINTS), "The VideoLog's points were not properly merged.")
         self.assertEqual(videolog.total_seconds_watched, max(self.ORIGINAL_ATTEMPTS, self.NEW_SECONDS_WATCHED), "The VideoLog's total seconds watched have already changed.")
+
+
+class TestExerciseTransitions(KALiteTestCase):
+
+    def setUp(self):
+        super(TestExerciseTransitions, self).setUp()
+        self.facility = Facility(name="Test Facility")
+        self.facility.save()
+        self.group = FacilityGroup(name="Test Group", facility=self.facility)
+        self.group.save()
+        self.users = []
+        for idx in range(2):
+            user = FacilityUser(username="testuser%d" % idx, facility=self.facility, group=self.group)
+            user.set_password("dumber")
+            user.save()
+            self.users.append(user)
+
+    def complete(self, user, exercise_id):
+        exerciselog = ExerciseLog(exercise_id=exercise_id, user=user)
+        exerciselog.save()
+        exerciselog.streak_progress = 100
+        exerciselog.save()
+        return exerciselog
+
+    def transitions(self):
+        return sorted(ExerciseTransition.objects.filter(group=self.group).values_list("from_exercise_id", "to_exercise_id", "count"))
+
+    def test_completions_are_counted(self):
+        for user in self.users:
+            self.complete(user, "a")
+            self.complete(user, "b")
+        self.complete(self.users[0], "c")
+
+        # Saving an already completed log again doesn't count it twice
+        ExerciseLog.objects.get(user=self.users[0], exercise_id="c").save()
+
+        self.assertEqual(self.transitions(), [("a", "b", 2), ("b", "c", 1)])
+
+    def test_rebuild(self):
+        for exercise_id in ["a", "b", "c"]:
+            self.complete(self.users[0], exercise_id)
+        expected = self.transitions()
+        ExerciseTransition.objects.all().delete()
+        self.assertEqual(ExerciseTransition.rebuild(), 2)
+        self.assertEqual(self.transitions(), expected)
+
+
+class TestCoachSummaries(KALiteTestCase):
+
+    def setUp(self):
+        super(TestCoachSummaries, self).setUp()
+        self.facility = Facility(name="Test Facility")
+        self.facility.save()
+        self.group = FacilityGroup(name="Test Group", facility=self.facility)
+        self.group.save()
+        self.users = []
+        for idx in range(2):
+            user = FacilityUser(username="testuser%d" % idx, facility=self.facility, group=self.group)
+            user.set_password("dumber")
+            user.save()
+            self.users.append(user)
+        self.today = datetime.datetime.now()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+
+    def log_exercise(self, user, exercise_id, streak_progress, timestamp):
+        exerciselog = ExerciseLog.objects.get_or_create(exercise_id=exercise_id, user=user)[0]
+        exerciselog.streak_progress = streak_progress
+        exerciselog.latest_activity_timestamp = timestamp
+        exerciselog.save()
+        return exerciselog
+
+    def group_summaries(self):
+        return sorted(GroupDaySummary.objects.filter(group=self.group, kind="exercise").values_list(
+            "day", "logs", "complete", "struggling", "in_progress", "progress"))
+
+    def test_logs_are_summarized(self):
+        self.log_exercise(self.users[0], "a", 100, self.yesterday)
+        self.log_exercise(self.users[1], "a", 50, self.yesterday)
+        self.log_exercise(self.users[0], "b", 20, self.today)
+
+        summary = LearnerContentSummary.objects.get(user=self.users[0], kind="exercise", content_id="a")
+        self.assertTrue(summary.complete)
+        self.assertEqual(summary.day, self.yesterday.date())
+        self.assertEqual(self.group_summaries(), [
+            (self.yesterday.date(), 2, 1, 0, 1, 150),
+            (self.today.date(), 1, 0, 0, 1, 20),
+        ])
+
+        # Further activity moves the log to the day it happened on
+        self.log_exercise(self.users[1], "a", 60, self.today)
+        self.assertEqual(self.group_summaries(), [
+            (self.yesterday.date(), 1, 1, 0, 0, 100),
+            (self.today.date(), 2, 0, 0, 2, 80),
+        ])
+
+    def test_logs_without_activity_are_not_summarized(self):
+        ExerciseLog(exercise_id="a", user=self.users[0]).save()
+        self.assertEqual(LearnerContentSummary.objects.count(), 0)
+        self.assertEqual(GroupDaySummary.objects.count(), 0)
+
+    def test_unchanged_logs_are_not_recounted(self):
+        exerciselog = self.log_exercise(self.users[0], "a", 100, self.yesterday)
+        with self.assertNumQueries(1):  # only the summary is looked up
+            LearnerContentSummary.update_for_log("exercise", exerciselog)
+
+    def test_rebuild(self):
+        self.log_exercise(self.users[0], "a", 100, self.yesterday)
+        self.log_exercise(self.users[1], "b", 30, self.today)
+        expected = self.group_summaries()
+        LearnerContentSummary.objects.all().delete()
+        GroupDaySummary.objects.all().delete()
+        self.assertEqual(LearnerContentSummary.rebuild(), 2)
+        self.assertEqual(GroupDaySummary.rebuild(), 2)
+        self.assertEqual(self.group_summaries(), expected)
+
+
+class TestLogTransactions(CreateDeviceMixin, TransactionTestCase):
+    """Saving a log must not commit the transaction it is saved in."""
+
+    def setUp(self):
+        super(TestLogTransactions, self).setUp()
+        self.setup_fake_device()
+        user_activity.discard()
+        self.facility = Facility(name="Test Facility")
+        self.facility.save()
+        self.user = FacilityUser(username="testuser", facility=self.facility)
+        self.user.set_password("dumber")
+        self.user.save()
+
+    def tearDown(self):
+        user_activity.discard()
+        super(TestLogTransactions, self).tearDown()
+
+    def test_log_is_rolled_back(self):
+        @transaction.commit_on_success
+        def save_and_fail():
+            VideoLog(video_id="a", youtube_id="a", user=self.user, total_seconds_watched=10,
+                     latest_activity_timestamp=datetime.datetime.now()).save()
+            raise ValueError()
+
+        self.assertRaises(ValueError, save_and_fail)
+        self.assertEqual(VideoLog.objects.count(), 0)
+        self.assertEqual(LearnerContentSummary.objects.count(), 0)
+        self.assertEqual(GroupDaySummary.objects.count(), 0)
+
+    @override_settings(DEFAULT_DB_SINGLE_WRITER=True)
+    def test_soft_delete_keeps_write_turn_until_commit(self):
+        VideoLog(video_id="a", youtube_id="a", user=self.user, total_seconds_watched=10,
+                 latest_activity_timestamp=datetime.datetime.now()).save()
+        owners = []
+        commit = transaction.commit
+
+        def record_owner_and_commit(*args, **kwargs):
+            owners.append(sqlite.write_queue._owner)
+            return commit(*args, **kwargs)
+
+        with patch("django.db.transaction.commit", record_owner_and_commit):
+            self.user.soft_delete()
+        # The log's soft_delete commits too, as commit_on_success doesn't nest
+        self.assertTrue(owners)
+        self.assertEqual(set(owners), set([threading.current_thread()]))
+        self.assertEqual(sqlite.write_queue.waiting, 0)
+
+    def test_user_activity_is_rolled_back(self):
+        UserLog.begin_user_activity(self.user, start_datetime=datetime.datetime(2015, 3, 1, 10, 0))
+
+        @transaction.commit_on_success
+        def update_and_fail():
+            user_activity.update(self.user, update_datetime=datetime.datetime(2015, 3, 1, 10, 5))
+            user_activity.flush()
+            raise ValueError()
+
+        self.assertRaises(ValueError, update_and_fail)
+        self.assertEqual(UserLog.objects.get(user=self.user).last_active_datetime, datetime.datetime(2015, 3, 1, 10, 0))
+
+    def test_failed_user_activity_is_rolled_back_and_retried(self):
+        UserLog.begin_user_activity(self.user, start_datetime=datetime.datetime(2015, 3, 1, 10, 0))
+        # Keep the update pending, rather than written by update() itself
+        with patch.object(user_activity, "interval", 3600):
+            user_activity.update(self.user, update_datetime=datetime.datetime(2015, 3, 1, 10, 5))
+        write_logs = user_activity._write_logs
+
+        def write_logs_and_fail(pending):
+            write_logs(pending)
+            raise DatabaseError("database is locked")
+
+        with patch.object(user_activity, "_write_logs", write_logs_and_fail):
+            user_activity.flush()
+        self.assertEqual(UserLog.objects.get(user=self.user).last_active_datetime, datetime.datetime(2015, 3, 1, 10, 0))
+
+        user_activity.flush()
+        self.assertEqual(UserLog.objects.get(user=self.user).last_active_datetime, datetime.datetime(2015, 3, 1, 10, 5))
+
+
+class TestImportExerciseLogs(KALiteTestCase):
+
+    def setUp(self):
+        super(TestImportExerciseLogs, self).setUp()
+        self.facility = Facility(name="Test Facility")
+        self.facility.save()
+        self.user = FacilityUser(username="testuser", facility=self.facility)
+        self.user.set_password("dumber")
+        self.user.save()
+        self.exerciselogs = []
+        for exercise_id in ["a", "b", "c"]:
+            exerciselog = ExerciseLog(exercise_id=exercise_id, user=self.user, points=10)
+            exerciselog.save()
+            self.exerciselogs.append(exerciselog)
+
+    def test_import_batch(self):
+        data = serialize(self.exerciselogs)
+        # Change the points of the last log after it was signed, so that it no longer verifies
+        data = data[:data.rindex('"points": 10')] + '"points": 99' + data[data.rindex('"points": 10') + len('"points": 10'):]
+
+        result = save_serialized_models(data)
+
+        self.assertEqual(result["saved_model_count"], 2)
+        self.assertEqual(result["unsaved_model_count"], 1)
+        self.assertEqual(ExerciseLog.objects.get(exercise_id="c").points, 10)
+
+
+
+class TestUserActivityBuffer(KALiteTestCase):
+
+    EARLY = datetime.datetime(2015, 3, 1, 10, 0)
+    LATER = datetime.datetime(2015, 3, 1, 10, 5)
+
+    def setUp(self):
+        super(TestUserActivityBuffer, self).setUp()
+        self.facility = Facility(name="Test Facility")
+        self.facility.save()
+        self.user = FacilityUser(username="testuser", facility=self.facility)
+        self.user.set_password("dumber")
+        self.user.save()
+        UserLog.begin_user_activity(self.user, start_datetime=self.EARLY)
+        self.original_interval = user_activity.interval
+        user_activity.interval = 3600
+
+    def tearDown(self):
+        user_activity.discard()
+        user_activity.interval = self.original_interval
+        super(TestUserActivityBuffer, self).tearDown()
+
+    def save_exercise_log(self, exercise_id, completion_timestamp):
+        # The completion time is what UserLog is updated with
+        ExerciseLog(exercise_id=exercise_id, user=self.user, completion_timestamp=completion_timestamp).save()
+
+    def test_updates_are_coalesced(self):
+        self.save_exercise_log("number_line", self.LATER)
+        self.save_exercise_log("addition_1", self.EARLY)
+        self.assertEqual(UserLog.objects.get(user=self.user).last_active_datetime, self.EARLY)
+
+        with self.assertNumQueries(3):  # open logs, and saving the one log
+            user_activity.flush()
+        self.assertEqual(UserLog.objects.get(user=self.user).last_active_datetime, self.LATER)
+
+    def test_updates_are_written_by_timer(self):
+        self.save_exercise_log("number_line", self.LATER)
+        timer = user_activity._timer
+        self.assertIsNotNone(timer)
+        # Run the timer's flush here, as the test database isn't shared with other threads
+        timer.cancel()
+        with patch("kalite.main.models.connection"):
+            timer.function()
+        self.assertEqual(UserLog.objects.get(user=self.user).last_active_datetime, self.LATER)
+        self.assertIsNone(user_activity._timer)
+
+    def test_update_writes_only_own_updates(self):
+        other = FacilityUser(username="otheruser", facility=self.facility)
+        other.set_password("dumber")
+        other.save()
+        UserLog.begin_user_activity(other, start_datetime=self.EARLY)
+        user_activity.update(other, update_datetime=self.LATER)
+
+        user_activity._last_flush = 0
+        self.save_exercise_log("number_line", self.LATER)
+        self.assertEqual(UserLog.objects.get(user=self.user).last_active_datetime, self.LATER)
+        self.assertEqual(UserLog.objects.get(user=other).last_active_datetime, self.EARLY)
+
+        user_activity.flush()
+        self.assertEqual(UserLog.objects.get(user=other).last_active_datetime, self.LATER)
+
+    def test_failed_update_in_transaction_is_not_retried(self):
+        # Tests run in a transaction, so whatever was written before the failure stays written
+        self.save_exercise_log("number_line", self.LATER)
+        with patch.object(user_activity, "_write_logs", side_effect=DatabaseError("database is locked")):
+            user_activity.flush()
+        self.assertEqual(user_activity._pending, {})
+
+    def test_updates_are_written_before_activity_ends(self):
+        self.save_exercise_log("number_line", self.LATER)
+        UserLog.end_user_activity(self.user, end_datetime=self.LATER)
+
+        userlog = UserLog.objects.get(user=self.user)
+        self.assertEqual(userlog.last_active_datetime, self.LATER)
+        self.assertEqual(userlog.total_seconds, 300)
+        self.assertEqual(UserLogSummary.objects.get(user=self.user).total_seconds, 300)
@@ -149,81 +149,78 @@ class Job(models.Model):
         Runs this ``Job``.  If ``save`` is ``True`` the dates (``last_run`` and ``next_run``)
         are updated.  If ``save`` is ``False`` the job simply gets run and nothing changes.
 
-        A ``Log`` will be created if there is any output from either stdout or stderr.
+        A ``Log`` is created when the job starts, and its output from stdout and stderr is
+        written to it as the job runs. Returns the ``Log``.
         """
+        from .output import LogStream
+
         run_date = datetime.now()
+        scheduled_run = self.next_run
         self.is_running = True
         self.save()
 
-        stdout_str, stderr_str = "", ""
+        log = Log.objects.create(job=self, run_date=run_date)
+        stdout = LogStream(log, "stdout")
+        stderr = LogStream(log, "stderr")
 
         try:
             if self.shell_command:
-                stdout_str, stderr_str = self.run_shell_command()
+                self.run_shell_command(stdout, stderr)
             else:
-                stdout_str, stderr_str = self.run_management_command()
+                self.run_management_command(stdout, stderr)
         finally:
             # since jobs can be long running, reload the object to pick up
             # any updates to the object since the job started
             self = self.__class__.objects.get(id=self.id)
             # If stderr was written the job is not successful
-            self.last_run_successful = not bool(stderr_str)
+            self.last_run_successful = not bool(stderr.getvalue())
             self.is_running = False
             self.save()
 
         if save:
             self.last_run = run_date
-            self.next_run = self.rrule.after(run_date)
+            # Unless the job was forced to run again while it was running (see force_job)
+            if self.next_run == scheduled_run:
+                self.next_run = self.rrule.after(run_date)
             self.save()
 
-        end_date = datetime.now()
-
-        # Create a log entry no matter what to see the last time the Job ran:
-        log = Log.objects.create(
-            job = self,
-            run_date = run_date,
-            end_date = end_date,
-            stdout = stdout_str,
-            stderr = stderr_str,
-            success = self.last_run_successful,
-        )
+        log.job = self
+        log.stdout = stdout.getvalue()
+        log.stderr = stderr.getvalue()
+        log.end_date = datetime.now()
+        log.success = self.last_run_successful
+        log.save()
+        return log
 
-    def run_management_command(self):
+    def run_management_command(self, stdout=None, stderr=None):
         """
-        Runs a management command job
+        Runs a management command job, writing its output to the given file-like objects.
+        Returns the stdout and stderr of the command.
         """
         from django.core.management import call_command
+        from .output import redirect_output
 
         args, options = self.get_args()
-        stdout = StringIO()
-        stderr = StringIO()
-
-        # Redirect output so that we can log it if there is any
-        ostdout = sys.stdout
-        ostderr = sys.stderr
-        sys.stdout = stdout
-        sys.stderr = stderr
-        stdout_str, stderr_str, exception_str = "", "", ""
-
-        try:
-            call_command(self.command, *args, **options)
-        except Exception, e:
-            exception_str = self._get_exception_string(e, sys.exc_info())
-            self.last_run_successful = False
-
-        sys.stdout = ostdout
-        sys.stderr = ostderr
+        stdout = stdout or StringIO()
+        stderr = stderr or StringIO()
 
-        stdout_str = stdout.getvalue()
-        stderr_str = stderr.getvalue()
+        # Only the output of this thread is redirected, other jobs may be running alongside
+        with redirect_output(stdout, stderr):
+            try:
+                call_command(self.command, *args, **options)
+            except Exception, e:
+                stderr.write(self._get_exception_string(e, sys.exc_info()))
+                self.last_run_successful = False
 
-        return stdout_str, stderr_str + exception_str
+        return stdout.getvalue(), stderr.getvalue()
 
-    def run_shell_command(self):
+    def run_shell_command(self, stdout=None, stderr=None):
         """
-        Returns the stdout and stderr of a command being run.
+        Runs a shell command job, writing its output to the given file-like objects once it
+        has finished. Returns the stdout and stderr of the command.
         """
-        stdout_str, stderr_str = "", ""
+        stdout = stdout or StringIO()
+        stderr = stderr or StringIO()
         command = self.shell_command + ' ' + (self.args or '')
         if self.run_in_shell:
             command = _escape_shell_command(command)
@@ -236,14 +233,16 @@ class Job(models.Model):
                                     stderr = subprocess.PIPE)
 
             stdout_str, stderr_str = proc.communicate()
+            stdout.write(stdout_str)
+            stderr.write(stderr_str)
             if proc.returncode:
-                stderr_str += "\n\n*** Process ended with return code %d\n\n" % proc.returncode
+                stderr.write("\n\n*** Process ended with return code %d\n\n" % proc.returncode)
             self.last_run_successful = not proc.returncode
         except Exception, e:
-            stderr_str += self._get_exception_string(e, sys.exc_info())
+            stderr.write(self._get_exception_string(e, sys.exc_info()))
             self.last_run_successful = False
 
-        return stdout_str, stderr_str
+        return stdout.getvalue(), stderr.getvalue()
 
     def _get_exception_string(self, e, exc_info):
         t = loader.get_template('chronograph/error_message.txt')
@@ -0,0 +1,96 @@
+"""
+Capturing the output of jobs.
+
+Several jobs may run at once in the same process (see scheduler.py), so instead of swapping
+sys.stdout and sys.stderr for the duration of a job, they are replaced for good by proxies that
+send each thread's output wherever that thread's job wants it, and everything else to the
+original streams.
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# How often, in seconds, the output of a running job is written to its Log
+LOG_FLUSH_INTERVAL = 5
+
+
+class LogStream(object):
+    """
+    File-like object that collects output into a field of a Log, saving it every
+    LOG_FLUSH_INTERVAL seconds so that the output of a running job can be followed.
+    """
+
+    def __init__(self, log, field, flush_interval=LOG_FLUSH_INTERVAL):
+        self.log = log
+        self.field = field
+        self.flush_interval = flush_interval
+        self._chunks = []
+        self._last_flush = time.time()
+        self._dirty = False
+
+    def write(self, s):
+        self._chunks.append(s)
+        self._dirty = True
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._dirty:
+            return
+        self._last_flush = time.time()
+        self._dirty = False
+        self.log.__class__.objects.filter(pk=self.log.pk).update(**{self.field: self.getvalue()})
+
+    def getvalue(self):
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+
+class ThreadLocalStream(object):
+    """
+    Stand-in for sys.stdout or sys.stderr that writes to the stream registered by the
+    current thread, if any, or else to the stream it replaced.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    @property
+    def current(self):
+        return getattr(self.local, "stream", None) or self.default
+
+    def write(self, s):
+        self.current.write(s)
+
+    def flush(self):
+        self.current.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+
+def _thread_local_stream(name):
+    stream = getattr(sys, name)
+    if not isinstance(stream, ThreadLocalStream):
+        stream = ThreadLocalStream(stream)
+        setattr(sys, name, stream)
+    return stream
+
+
+@contextmanager
+def redirect_output(stdout, stderr):
+    """
+    Send anything the current thread writes to sys.stdout and sys.stderr to these streams instead.
+    """
+    proxies = [(_thread_local_stream("stdout"), stdout), (_thread_local_stream("stderr"), stderr)]
+    previous = [getattr(proxy.local, "stream", None) for proxy, stream in proxies]
+    for proxy, stream in proxies:
+        proxy.local.stream = stream
+    try:
+        yield
+    finally:
+        for (proxy, stream), previous_stream in zip(proxies, previous):
+            proxy.local.stream = previous_stream
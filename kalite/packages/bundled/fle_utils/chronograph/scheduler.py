@@ -0,0 +1,184 @@
+"""
+In-process job scheduler, run by the cronserver_blocking command.
+
+Rather than checking for due jobs every CRONSERVER_FREQUENCY seconds, the scheduler keeps the
+enabled jobs in a priority queue ordered by their next run time, and sleeps until the earliest
+of them is due. force_job (see utils.py) wakes it up as soon as a job is scheduled, so that
+jobs started from the web interface run straight away.
+
+Due jobs are run in worker threads, at most CRONSERVER_WORKERS at a time. The scheduler still
+wakes up at least every CRONSERVER_FREQUENCY seconds, to pick up jobs scheduled by other
+processes.
+"""
+import heapq
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+logging = settings.LOG
+
+from .models import Job
+
+_running_scheduler = None
+
+
+def get_running_scheduler():
+    """
+    Returns the scheduler running in this process, if any.
+    """
+    return _running_scheduler
+
+
+class JobMetrics(object):
+    """
+    Runtime statistics for a single job, since the scheduler was started.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+        self.total_duration = 0.0
+        self.running_since = None
+
+    @property
+    def average_duration(self):
+        return self.total_duration / self.runs if self.runs else None
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_duration": self.last_duration,
+            "average_duration": self.average_duration,
+            "running_since": self.running_since,
+        }
+
+
+class Scheduler(object):
+
+    def __init__(self, workers=None, max_wait=None):
+        """
+        :param workers: Maximum number of jobs to run at the same time.
+        :param max_wait: Maximum number of seconds to wait before checking the database for changes.
+        """
+        self.workers = workers or getattr(settings, "CRONSERVER_WORKERS", 3)
+        self.max_wait = max_wait or getattr(settings, "CRONSERVER_FREQUENCY", 600)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = {}
+        self._metrics = {}
+        self._stopping = False
+
+    def wake(self):
+        """
+        Check for due jobs now, rather than at the next scheduled time.
+        """
+        self._wakeup.set()
+
+    def stop(self):
+        """
+        Stop scheduling jobs. Jobs that are already running are left to finish.
+        """
+        self._stopping = True
+        self.wake()
+
+    @property
+    def running_jobs(self):
+        with self._lock:
+            return self._threads.keys()
+
+    @property
+    def metrics(self):
+        """
+        Runtime statistics of each job that has been run, by job id.
+        """
+        with self._lock:
+            return dict((job_id, metrics.as_dict()) for job_id, metrics in self._metrics.items())
+
+    def _queue(self):
+        """
+        Priority queue of (next run, job id) of the enabled jobs that are not already running.
+        """
+        running = self.running_jobs
+        jobs = Job.objects.filter(disabled=False, is_running=False, next_run__isnull=False).exclude(id__in=running)
+        queue = list(jobs.values_list("next_run", "id"))
+        heapq.heapify(queue)
+        return queue
+
+    def run_due(self):
+        """
+        Start the jobs that are due, as far as there are free workers.
+        :return: Number of seconds until the scheduler should next check for due jobs.
+        """
+        queue = self._queue()
+        now = datetime.now()
+        while queue and queue[0][0] <= now and len(self.running_jobs) < self.workers:
+            next_run, job_id = heapq.heappop(queue)
+            self._start(job_id)
+
+        if not queue or queue[0][0] <= now:
+            # Either nothing is scheduled, or all workers are busy and we'll be woken
+            # up when one of them is done.
+            return self.max_wait
+        delta = queue[0][0] - now
+        return min(self.max_wait, delta.days * 86400 + delta.seconds + delta.microseconds / 1e6)
+
+    def _start(self, job_id):
+        thread = threading.Thread(target=self._run_job, args=(job_id,), name="chronograph-job-%d" % job_id)
+        with self._lock:
+            self._threads[job_id] = thread
+        thread.start()
+
+    def _run_job(self, job_id):
+        start = time.time()
+        success = False
+        try:
+            job = Job.objects.get(id=job_id)
+            with self._lock:
+                metrics = self._metrics.setdefault(job_id, JobMetrics(job.name))
+                metrics.running_since = datetime.now()
+            logging.info("Running job \"%s\"" % job.name)
+            success = job.run().success
+        except Exception as e:
+            logging.exception("Error running job %d: %s" % (job_id, e))
+        finally:
+            duration = time.time() - start
+            with self._lock:
+                metrics = self._metrics.setdefault(job_id, JobMetrics(None))
+                metrics.runs += 1
+                metrics.failures += not success
+                metrics.last_duration = duration
+                metrics.total_duration += duration
+                metrics.running_since = None
+                del self._threads[job_id]
+            # Each worker has its own database connection
+            connection.close()
+            self.wake()
+
+    def run(self):
+        """
+        Run jobs as they become due, until stop() is called.
+        Then wait for the jobs that are running to finish.
+        """
+        global _running_scheduler
+        _running_scheduler = self
+        try:
+            while not self._stopping:
+                self._wakeup.clear()
+                try:
+                    timeout = self.run_due()
+                except Exception as e:
+                    logging.exception("Error scheduling jobs: %s" % e)
+                    timeout = self.max_wait
+                self._wakeup.wait(timeout)
+        finally:
+            _running_scheduler = None
+            with self._lock:
+                threads = self._threads.values()
+            for thread in threads:
+                thread.join()
@@ -3,3 +3,5 @@
 ########################
 
 CRONSERVER_FREQUENCY = 600  # 10 mins (in seconds)
+
+CRONSERVER_WORKERS = 3  # maximum number of jobs run at the same time
@@ -1,13 +1,14 @@
 from datetime import datetime
 
 from .models import Job
+from .scheduler import get_running_scheduler
 from fle_utils.django_utils.command import call_command_async
 
 
 def force_job(command, name="", frequency="YEARLY", stop=False, **kwargs):
     """
     Mark a job as to run immediately (or to stop).
-    By default, call cron directly, to resolve.
+    Wakes up the job scheduler if it's running in this process, otherwise calls cron directly, to resolve.
     """
 
     jobs = Job.objects.filter(command=command)
@@ -34,6 +35,11 @@ def force_job(command, name="", frequency="YEARLY", stop=False, **kwargs):
     # Set as variable so that we could pass as param later, if we want to!
     launch_job = not stop and not job.is_running
     if launch_job:  # don't run the same job twice
+        scheduler = get_running_scheduler()
+        if scheduler:
+            scheduler.wake()
+            return
+
         # Just start cron directly, so that the process starts immediately.
         # Note that if you're calling force_job frequently, then
         # you probably want to avoid doing this on every call.
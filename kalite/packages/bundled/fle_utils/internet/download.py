@@ -3,10 +3,14 @@ import requests
 import socket
 import sys
 import tempfile
+import time
 from requests.utils import default_user_agent
 
 socket.setdefaulttimeout(20)
 
+# Downloads are streamed to disk this many bytes at a time
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 
 class DownloadCancelled(Exception):
 
@@ -47,7 +51,29 @@ def _nullhook(*args, **kwargs):
     pass
 
 
-def download_file(url, dst=None, callback=None):
+def get_total_size(response):
+    """
+    Size in bytes of the whole file at the url of a download_file response, or None if unknown.
+    For partial responses this comes from the Content-Range header, as Content-Length is only
+    the size of the part that was sent.
+    """
+    content_range = response.headers.get("content-range")
+    if response.status_code in (206, 416) and content_range and "/" in content_range:
+        total_size = content_range.rsplit("/", 1)[1]
+        return int(total_size) if total_size.isdigit() else None
+    if "content-length" in response.headers:
+        return int(response.headers["content-length"])
+    return None
+
+
+def download_file(url, dst=None, callback=None, resume=False, chunk_size=DOWNLOAD_CHUNK_SIZE, max_bytes_per_second=None):
+    """
+    Stream the file at url to dst, calling callback with the fraction downloaded so far.
+    Nothing is written if the server replies with an error.
+    :param resume: If dst already has data in it, ask the server for the rest of the file only
+        (with a Range request) and append it. If the server sends the whole file instead, dst is overwritten.
+    :param max_bytes_per_second: If set, pause between chunks to keep the download under this rate.
+    """
     if sys.stdout.isatty():
         callback = callback or _reporthook
     else:
@@ -57,25 +83,38 @@ def download_file(url, dst=None, callback=None):
     # Assuming the KA Lite version is included in user agent because of an
     # intention to create stats on learningequality.org
     from kalite.version import user_agent
-    response = requests.get(
-        url,
-        allow_redirects=True,
-        stream=True,
-        headers={"user-agent": user_agent()}
-    )
+    headers = {"user-agent": user_agent()}
+
+    offset = os.path.getsize(dst) if resume and os.path.isfile(dst) else 0
+    if offset:
+        headers["range"] = "bytes=%d-" % offset
+    response = requests.get(url, allow_redirects=True, stream=True, headers=headers)
+
+    if offset and response.status_code == 416:
+        if get_total_size(response) == offset:
+            # We already have the whole file
+            callback(1.0)
+            return response
+        # Whatever we have doesn't match the file on the server, so start over.
+        response = requests.get(url, allow_redirects=True, stream=True, headers={"user-agent": user_agent()})
+    if response.status_code >= 400:
+        return response
+    if response.status_code != 206:
+        offset = 0
+
     # If a destination is set, then we'll write a file and send back updates
     if dst:
-        chunk_size = 1024
-        with open(dst, 'wb') as fd:
-            for chunk_number, chunk in enumerate(response.iter_content(chunk_size)):
+        total_size = get_total_size(response)
+        bytes_fetched = offset
+        start_time = time.time()
+        with open(dst, 'ab' if offset else 'wb') as fd:
+            for chunk in response.iter_content(chunk_size):
                 fd.write(chunk)
-                bytes_fetched = chunk_number * chunk_size
-                if 'content-length' not in response.headers:
-                    fraction = 0.0
-                elif int(response.headers['content-length']) == 0:
-                    fraction = 0.0
-                else:
-                    total_size = float(response.headers['content-length'])
-                    fraction = min(float(bytes_fetched) / total_size, 1.0)
-                callback(fraction)
+                bytes_fetched += len(chunk)
+                callback(min(float(bytes_fetched) / total_size, 1.0) if total_size else 0.0)
+
+                if max_bytes_per_second:
+                    time_ahead = float(bytes_fetched - offset) / max_bytes_per_second - (time.time() - start_time)
+                    if time_ahead > 0:
+                        time.sleep(time_ahead)
     return response
@@ -2,6 +2,7 @@ import logging
 import os
 import platform
 import sys
+import threading
 """
 Alters the process CPU and IO priority
 
@@ -88,6 +89,12 @@ def _set_linux_mac_priority(priority, logging=logging):
 
 def _set_priority(priority, logging=logging):
 
+    # Priorities are per process, so a task run in a thread of some other process
+    # (e.g. a job run by the scheduler of the web server process) would slow that whole process down.
+    if not isinstance(threading.current_thread(), threading._MainThread):
+        logging.debug("Will not set priority, not running in the main thread")
+        return False
+
     if SYS_PLATFORM == "Windows":
         return _set_windows_priority(priority, logging=logging)
     elif SYS_PLATFORM in ("Linux", "Mac"):
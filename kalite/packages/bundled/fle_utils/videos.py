@@ -4,13 +4,20 @@ import glob
 import logging
 import os
 import socket
+import time
 
 from general import ensure_dir
-from internet.download import callback_percent_proxy, download_file, URLNotFound, DownloadCancelled
+from internet.download import callback_percent_proxy, download_file, get_total_size, URLNotFound, DownloadCancelled
 
 OUTSIDE_DOWNLOAD_BASE_URL = "http://s3.amazonaws.com/KA-youtube-converted/"  # needed for redirects
 OUTSIDE_DOWNLOAD_URL = OUTSIDE_DOWNLOAD_BASE_URL + "%s/%s"  # needed for default behavior, below
 
+# Videos are downloaded to a file with this suffix, and only renamed once complete
+PARTIAL_SUFFIX = ".part"
+
+# How many times a dropped video download is resumed before giving up
+DOWNLOAD_RETRIES = 3
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,33 +32,63 @@ def get_outside_video_urls(youtube_id, download_url=OUTSIDE_DOWNLOAD_URL, format
     return (url, thumb_url)
 
 
-def download_video(youtube_id, download_path="../content/", download_url=OUTSIDE_DOWNLOAD_URL, format="mp4", callback=None):
-    """Downloads the video file to disk (note: this does NOT invalidate any of the cached html files in KA Lite)"""
+def _download_with_retries(url, filepath, callback, retries, max_bytes_per_second):
+    """
+    Download url to filepath, resuming from wherever the previous attempt got to
+    if the connection drops, up to retries times.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return download_file(url, filepath, callback, resume=True, max_bytes_per_second=max_bytes_per_second)
+        except (socket.timeout, IOError) as e:
+            if attempt == retries:
+                raise
+            logger.info("Download of {url} interrupted ({error}), resuming.".format(url=url, error=e))
+            time.sleep(min(2 ** attempt, 30))
+
+
+def download_video(youtube_id, download_path="../content/", download_url=OUTSIDE_DOWNLOAD_URL, format="mp4", callback=None, retries=DOWNLOAD_RETRIES, max_bytes_per_second=None):
+    """Downloads the video file to disk (note: this does NOT invalidate any of the cached html files in KA Lite)
+
+    The video is written to a PARTIAL_SUFFIX file until complete. If the download fails on a network
+    error, that file is kept, and the next call for the same video resumes from where it stopped.
+    """
 
     ensure_dir(download_path)
 
     url, thumb_url = get_outside_video_urls(youtube_id, download_url=download_url, format=format)
     video_filename = "%(id)s.%(format)s" % {"id": youtube_id, "format": format}
     filepath = os.path.join(download_path, video_filename)
+    partial_filepath = filepath + PARTIAL_SUFFIX
 
     thumb_filename = "%(id)s.png" % {"id": youtube_id}
     thumb_filepath = os.path.join(download_path, thumb_filename)
 
+    video_complete = False
     try:
-        response = download_file(url, filepath, callback_percent_proxy(callback, end_percent=95))
+        response = _download_with_retries(url, partial_filepath, callback_percent_proxy(callback, end_percent=95), retries, max_bytes_per_second)
+        total_size = get_total_size(response)
         if (
-                not os.path.isfile(filepath) or
-                "content-length" not in response.headers or
-                not os.path.getsize(filepath) == int(response.headers['content-length'])):
+                not os.path.isfile(partial_filepath) or
+                total_size is None or
+                not os.path.getsize(partial_filepath) == total_size):
             raise URLNotFound("Video was not found, tried: {}".format(url))
+        video_complete = True
 
-        response = download_file(thumb_url, thumb_filepath, callback_percent_proxy(callback, start_percent=95, end_percent=100))
+        response = _download_with_retries(thumb_url, thumb_filepath, callback_percent_proxy(callback, start_percent=95, end_percent=100), retries, max_bytes_per_second)
+        total_size = get_total_size(response)
         if (
                 not os.path.isfile(thumb_filepath) or
-                "content-length" not in response.headers or
-                not os.path.getsize(thumb_filepath) == int(response.headers['content-length'])):
+                total_size is None or
+                not os.path.getsize(thumb_filepath) == total_size):
             raise URLNotFound("Thumbnail was not found, tried: {}".format(thumb_url))
 
+        # Only now that we have everything, put the video in place.
+        if os.path.exists(filepath):
+            # os.rename doesn't replace existing files on Windows
+            os.remove(filepath)
+        os.rename(partial_filepath, filepath)
+
     except DownloadCancelled:
         delete_downloaded_files(youtube_id, download_path)
         raise
@@ -59,18 +96,21 @@ def download_video(youtube_id, download_path="../content/", download_url=OUTSIDE
     except (socket.timeout, IOError) as e:
         logging.exception(e)
         logging.info("Timeout -- Network UnReachable")
-        delete_downloaded_files(youtube_id, download_path)
+        delete_downloaded_files(youtube_id, download_path, keep_partial=True)
         raise
 
     except Exception as e:
         logging.exception(e)
-        delete_downloaded_files(youtube_id, download_path)
+        # Don't throw away a video we have all of, because of its thumbnail
+        delete_downloaded_files(youtube_id, download_path, keep_partial=video_complete)
         raise
 
 
-def delete_downloaded_files(youtube_id, download_path):
+def delete_downloaded_files(youtube_id, download_path, keep_partial=False):
     files_deleted = 0
     for filepath in glob.glob(os.path.join(download_path, youtube_id + ".*")):
+        if keep_partial and filepath.endswith(PARTIAL_SUFFIX):
+            continue
         try:
             os.remove(filepath)
             files_deleted += 1
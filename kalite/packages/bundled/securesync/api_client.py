@@ -8,6 +8,8 @@ import uuid
 
 from django.conf import settings
 
+from .engine.transfer import MIN_COMPRESSED_SIZE, compress
+
 logging = settings.LOG
 
 
@@ -26,15 +28,25 @@ class BaseClient(object):
             return self.url + "/securesync/api/" + path
 
     def post(self, path, payload={}, *args, **kwargs):
+        """
+        Post the payload as JSON. With compress=True, the body is gzipped
+        (only do this if the server supports it).
+        """
 
         from kalite.version import user_agent
 
+        data = json.dumps(payload)
+        headers = {"user-agent": user_agent()}
+        if kwargs.get("compress") and len(data) >= MIN_COMPRESSED_SIZE:
+            data = compress(data)
+            headers["Content-Encoding"] = "gzip"
+
         if self.verbose:
-            print "CLIENT: post %s" % path
+            print "CLIENT: post %s (%d bytes)" % (path, len(data))
         return requests.post(
             self.path_to_url(path),
-            data=json.dumps(payload),
-            headers={"user-agent": user_agent()}
+            data=data,
+            headers=headers,
         )
 
     def get(self, path, payload={}, *args, **kwargs):
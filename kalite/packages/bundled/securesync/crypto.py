@@ -5,7 +5,9 @@ import base64
 import hashlib
 import re
 import sys
+import threading
 import rsa as PYRSA
+from collections import OrderedDict
 
 from django.conf import settings
 
@@ -14,6 +16,10 @@ from fle_utils.crypto import *
 
 _own_key = None
 
+# Parsed public keys of other devices, keyed by public key string and ordered from least to most recently used
+_public_keys = OrderedDict()
+_public_keys_lock = threading.Lock()
+
 def load_keys():
     global _own_key
 
@@ -46,3 +52,18 @@ def get_own_key():
     if not _own_key:
         load_keys()
     return _own_key
+
+def get_public_key(public_key_string):
+    """
+    Return a Key for the public key string, parsing it only if it isn't among the
+    PUBLIC_KEY_CACHE_SIZE most recently used keys of this process.
+    """
+    with _public_keys_lock:
+        key = _public_keys.pop(public_key_string, None)
+        if key is None:
+            key = Key(public_key_string=public_key_string)
+        _public_keys[public_key_string] = key
+        while len(_public_keys) > getattr(settings, "PUBLIC_KEY_CACHE_SIZE", 100):
+            _public_keys.popitem(last=False)
+        return key
+
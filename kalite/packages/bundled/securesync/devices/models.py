@@ -216,7 +216,7 @@ class Device(SyncedModel):
                 # get_metadata can fail if the Device instance hasn't been persisted to the db
                 pass
             if not self.key and self.public_key:
-                self.key = crypto.Key(public_key_string=self.public_key)
+                self.key = crypto.get_public_key(self.public_key)
         return self.key
 
     def _hashable_representation(self):
@@ -2,8 +2,10 @@
 """
 import re
 import json
+import time
 
 
+from .transfer import AdaptiveBatchSize
 from .utils import get_serialized_models, save_serialized_models, get_device_counters, deserialize
 from .models import *
 from ..api_client import BaseClient
@@ -17,12 +19,23 @@ class SyncClient(BaseClient):
     the central server.  Over that session, syncing can occur in multiple requests.
 
     Note that in the future, this object may be used to sync
-    between two distributed servers (i.e. peer-to-peer sync)!"""
+    between two distributed servers (i.e. peer-to-peer sync)!
+
+    Newer servers advertise what they support of the sync protocol (see transfer.SYNC_CAPABILITIES)
+    when the session is created; with older servers, we fall back to the original protocol."""
     session = None
+    capabilities = frozenset()
+
+    def __init__(self, *args, **kwargs):
+        super(SyncClient, self).__init__(*args, **kwargs)
+        # Batch sizes are learned over the whole sync, as it's the same connection
+        self.upload_batch = AdaptiveBatchSize()
+        self.download_batch = AdaptiveBatchSize()
 
     def post(self, path, payload={}, *args, **kwargs):
         if self.session and self.session.client_nonce:
             payload["client_nonce"] = self.session.client_nonce
+        kwargs.setdefault("compress", "compressed_upload" in self.capabilities)
         return super(SyncClient, self).post(path, payload, *args, **kwargs)
 
     def get(self, path, payload={}, *args, **kwargs):
@@ -68,6 +81,7 @@ class SyncClient(BaseClient):
             raise Exception("The server is not trusted, don't make a session with THAT.")
         self.session.verified = True
         self.session.timestamp = session.timestamp
+        self.capabilities = frozenset(data.get("capabilities", []))
 
         self.session.ip = self.parsed_url.netloc
 
@@ -141,6 +155,7 @@ class SyncClient(BaseClient):
             "client_nonce": self.session.client_nonce
         })
         self.session = None
+        self.capabilities = frozenset()
         return "success"
 
     def get_server_device_counters(self):
@@ -260,7 +275,18 @@ class SyncClient(BaseClient):
             if self.verbose:
                 print "CLIENT: sync_models, downloading"
 
-            response = json.loads(self.post("models/download", {"device_counters": counters_to_download}).content)
+            payload = {"device_counters": counters_to_download}
+            if "batch_size" in self.capabilities:
+                payload.update({"limit": self.download_batch.limit, "max_bytes": self.download_batch.bytes})
+            start = time.time()
+            try:
+                content = self.post("models/download", payload).content
+                response = json.loads(content)
+            except Exception:
+                self.download_batch.failed()
+                raise
+            self.download_batch.succeeded(len(content), time.time() - start, response.get("count", 0))
+
             # As usual, we're deserializing from the central server, so we assume that what we're getting
             #   is "smartly" dumbed down for us.  We don't need to specify the src_version, as it's
             #   pre-cleanaed for us.
@@ -272,6 +298,21 @@ class SyncClient(BaseClient):
             download_results["error"] = e
             self.session.errors += 1
 
+        upload_results = self.upload_models(counters_to_upload)
+
+        self.session.save()
+
+        return {"download_results": download_results, "upload_results": upload_results}
+
+    def upload_models(self, device_counters):
+        """
+        Upload the models above the given counter positions.
+
+        If the server acknowledges the counters it got to (see transfer.SYNC_CAPABILITIES), keep
+        uploading batches from those counters on, until there's nothing left or a batch fails;
+        the next call then picks up from the last acknowledged batch. Otherwise, upload one batch.
+        """
+
         # Upload (but prepare for errors--both thrown and unthrown!)
         upload_results = {
             "saved_model_count" : 0,
@@ -279,22 +320,44 @@ class SyncClient(BaseClient):
         }
 
         try:
+            while device_counters:
+
+                if self.verbose:
+                    print "CLIENT: sync_models, uploading"
+
+                # By not specifying a dest_version, we're sending everything.
+                #   Again, this is OK because we're sending to the central server.
+                serialized = get_serialized_models(dict(device_counters), limit=self.upload_batch.limit, max_bytes=self.upload_batch.bytes, include_count=True, verbose=self.verbose)
+                if not serialized["count"]:
+                    break
+
+                start = time.time()
+                try:
+                    response = self.post("models/upload", {"models": serialized["models"], "device_counters": device_counters})
+                    result = json.loads(response.content)
+                except Exception:
+                    self.upload_batch.failed()
+                    raise
+                self.upload_batch.succeeded(len(serialized["models"]), time.time() - start, serialized["count"])
+
+                upload_results["saved_model_count"] += result.get("saved_model_count", 0)
+                upload_results["unsaved_model_count"] += result.get("unsaved_model_count", 0)
+                for key in ("error", "exceptions"):
+                    if key in result:
+                        upload_results[key] = result[key]
+                self.session.models_uploaded += result.get("saved_model_count", 0)
+                self.display_and_count_errors(result, context_name="uploading models")
+
+                # Continue from where the server got to, as long as it's getting anywhere
+                acknowledged = dict((device_id, counter) for device_id, counter in result.get("device_counters", {}).iteritems() if device_id in device_counters)
+                if "error" in result or not any(counter > device_counters[device_id] for device_id, counter in acknowledged.iteritems()):
+                    break
+                device_counters = dict(device_counters)
+                device_counters.update(acknowledged)
 
-            if self.verbose:
-                print "CLIENT: sync_models, uploading"
-
-            # By not specifying a dest_version, we're sending everything.
-            #   Again, this is OK because we're sending to the central server.
-            response = self.post("models/upload", {"models": get_serialized_models(counters_to_upload, verbose=self.verbose)})
-
-            upload_results.update(json.loads(response.content))
-            self.session.models_uploaded += upload_results["saved_model_count"]
-            self.display_and_count_errors(upload_results, context_name="uploading models")
         except Exception as e:
             print "Exception uploading models (in api_client): %s, %s, %s" % (e.__class__.__name__, e.message, e.args)
             upload_results["error"] = e
             self.session.errors += 1
 
-        self.session.save()
-
-        return {"download_results": download_results, "upload_results": upload_results}
+        return upload_results
@@ -1,9 +1,11 @@
 import re
 
+from django.conf import settings
 from django.utils import simplejson
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.gzip import gzip_page
 
+from .transfer import SYNC_CAPABILITIES, PayloadTooLarge, get_request_body
 from .utils import get_serialized_models, save_serialized_models, get_device_counters, serialize
 from .models import *
 from ..devices.models import *  # inter-dependence
@@ -16,8 +18,14 @@ from kalite.shared.decorators.auth import require_admin
 def require_sync_session(handler):
     @api_handle_error_with_json
     def require_sync_session_wrapper_fn(request):
-        if request.body:
-            data = simplejson.loads(request.body)
+        try:
+            body = get_request_body(request)
+        except PayloadTooLarge as e:
+            return JsonResponseMessageError(unicode(e), status=413)
+        except Exception as e:
+            return JsonResponseMessageError("Could not decode request body: %s" % e, status=400)
+        if body:
+            data = simplejson.loads(body)
         else:
             data = request.GET
         try:
@@ -87,6 +95,7 @@ def create_session(request):
     return JsonResponse({
         "session": serialize([session], dest_version=session.client_version, ensure_ascii=False, sign=False, increment_counters=False ),
         "signature": session.sign(),
+        "capabilities": SYNC_CAPABILITIES,
     })
 
 
@@ -162,6 +171,10 @@ def model_upload(data, session):
         print "Exception uploading models (in api_views): %s, %s, %s" % (e.__class__.__name__, e.message, e.args)
         result = { "error": e.message, "saved_model_count": 0 }
 
+    # Acknowledge how far we got for each of the uploading devices, so the client can continue from there
+    devices = list(Device.all_objects.by_zone(session.client_device.get_zone()).filter(pk__in=data.get("device_counters", {}).keys()).distinct())
+    result["device_counters"] = get_device_counters(devices=devices) if devices else {}
+
     session.models_uploaded += result["saved_model_count"]
     session.errors += result.has_key("error")
     return JsonResponse(result)
@@ -178,7 +191,10 @@ def model_download(data, session):
         return JsonResponseMessageError("Must provide device counters.", data={"count": 0}, status=400)
     try:
         # Return the objects serialized to the version of the other device.
-        result = get_serialized_models(data["device_counters"], zone=session.client_device.get_zone(), include_count=True, dest_version=session.client_version)
+        # The client may ask for smaller batches than we'd send, e.g. over a slow connection
+        limit = min(int(data.get("limit") or settings.SYNCING_MAX_RECORDS_PER_REQUEST), settings.SYNCING_MAX_RECORDS_PER_REQUEST)
+        max_bytes = min(int(data.get("max_bytes") or settings.SYNCING_MAX_BYTES_PER_REQUEST), settings.SYNCING_MAX_BYTES_PER_REQUEST)
+        result = get_serialized_models(data["device_counters"], zone=session.client_device.get_zone(), include_count=True, dest_version=session.client_version, limit=limit, max_bytes=max_bytes)
     except Exception as e:
         print "Exception downloading models (in api_views): %s, %s, %s" % (e.__class__.__name__, e.message, e.args)
         result = { "error": e.message, "count": 0 }
@@ -12,16 +12,21 @@ from django.db import models, transaction
 from django.db.models import Q
 from django.db.models.base import ModelBase
 from django.db.models.query import QuerySet
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, post_syncdb
 from django.dispatch import receiver
 from django.utils.text import compress_string
 from django.utils.translation import ugettext_lazy as _
 
-from .utils import add_syncing_models
+from .utils import add_syncing_models, ensure_counter_indexes
 from .. import ID_MAX_LENGTH, IP_MAX_LENGTH
 from fle_utils.config.models import Settings
 from fle_utils.django_utils.debugging import validate_via_booleans
 from fle_utils.django_utils.classes import ExtendedModel
+from kalite.distributed.sqlite import serialized_write
+
+
+# The fields each SyncedModel class includes in its signature by default, see SyncedModel._hashable_fields
+_default_hashable_fields = {}
 
 
 def _get_own_device():
@@ -201,6 +206,7 @@ class SyncedModel(ExtendedModel):
         abstract = True
         app_label = "securesync"
 
+    @serialized_write
     @transaction.commit_on_success
     def soft_delete(self):
         self.deleted = True  # mark self as deleted
@@ -280,6 +286,13 @@ class SyncedModel(ExtendedModel):
 
         # by this point, we know that we're ok with accepting this model from the device that it says signed it
         # now, we just need to check whether or not it is actually signed by that model's private key
+        return self.verify_signature()
+
+    def verify_signature(self):
+        """
+        Check that the model was signed with the private key of the device in signed_by,
+        without checking whether we accept models from that device (see validate).
+        """
         try:
             return self.signed_by.get_key().verify(self._hashable_representation(), self.signature)
         except:
@@ -288,6 +301,16 @@ class SyncedModel(ExtendedModel):
     @classmethod
     def _hashable_fields(cls, fields=None):
 
+        # the default list of fields only depends on the class, so compute it once
+        if not fields:
+            if cls not in _default_hashable_fields:
+                _default_hashable_fields[cls] = cls._compute_hashable_fields()
+            return _default_hashable_fields[cls]
+        return cls._compute_hashable_fields(fields)
+
+    @classmethod
+    def _compute_hashable_fields(cls, fields=None):
+
         # if no fields were specified, build a list of all the model's field names
         if not fields:
             fields = [field.name for field in cls._meta.fields if field.name not in cls._unhashable_fields and not hasattr(field, "minversion")]
@@ -334,7 +357,7 @@ class SyncedModel(ExtendedModel):
 
         return "&".join(chunks)
 
-    def save(self, imported=False, increment_counters=True, sign=True, *args, **kwargs):
+    def save(self, imported=False, increment_counters=True, sign=True, batched=False, *args, **kwargs):
         """
         Some of the heavy lifting happens here.  There are two saving scenarios:
         (a) We are saving an imported model.
@@ -342,12 +365,15 @@ class SyncedModel(ExtendedModel):
         (b) We are saving our own model
             In this case, we need to mark the model with appropriate fields, so that
             it can be sync'd (self.counter), and that it will verify (self.signature)
+
+        batched is for imported models that are saved as part of a batch (see save_serialized_models),
+        which has already verified them, and records the counter position of each device once per batch.
         """
         if imported:
             # imported models are signed by other devices; make sure they check out
             if not self.signed_by_id:
                 raise ValidationError("Imported models must be signed.")
-            if not self.verify():
+            if not batched and not self.verify():
                 raise ValidationError("Could not verify the imported model.")  #Imported model's signature did not match.")
 
             # call the base Django Model save to write to the DB
@@ -355,7 +381,7 @@ class SyncedModel(ExtendedModel):
 
             # For imported models, we want to keep track of the counter position we're at for that device.
             #   so, if it's ahead of what we had, set it!
-            if increment_counters:
+            if increment_counters and not batched:
                 self.signed_by.set_counter_position(self.counter, soft_set=True)
 
 
@@ -511,3 +537,13 @@ class ImportPurgatory(ExtendedModel):
     def save(self, *args, **kwargs):
         self.counter = self.counter or _get_own_device().get_counter_position()
         super(ImportPurgatory, self).save(*args, **kwargs)
+
+
+# get_models looks up models by the device that signed them and their counter,
+#   so (re)create the indexes for that whenever tables may have been created.
+post_syncdb.connect(ensure_counter_indexes)
+try:
+    from south.signals import post_migrate
+    post_migrate.connect(ensure_counter_indexes)
+except ImportError:
+    pass
@@ -0,0 +1,104 @@
+"""
+Helpers for moving models between devices over slow and unreliable connections:
+* compression of request bodies (responses are compressed by the gzip_page views)
+* sizing of batches of models, in records and in (uncompressed JSON) bytes,
+  adapted to the throughput and error rate measured while syncing.
+"""
+import zlib
+
+from django.conf import settings
+
+# Features of the sync protocol supported by this device, advertised when creating a session
+#   compressed_upload: request bodies may be gzip- or deflate-compressed
+#   batch_size: models/download accepts "limit" and "max_bytes"
+#   upload_ack: models/upload returns the counters acknowledged for the uploading devices,
+#     from which the next batch continues
+SYNC_CAPABILITIES = ["compressed_upload", "batch_size", "upload_ack"]
+
+# Don't bother compressing bodies smaller than this
+MIN_COMPRESSED_SIZE = 1024
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+def compress(data, level=6):
+    """Compress a string in gzip format."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def decompress(data, encoding, max_size=None):
+    """
+    Decompress a request body sent with Content-Encoding gzip or deflate.
+    Raises PayloadTooLarge rather than inflating more than max_size bytes.
+    """
+    if encoding == "gzip":
+        wbits = 16 + zlib.MAX_WBITS
+    elif encoding == "deflate":
+        # Some clients send raw deflate streams, without the zlib header
+        wbits = zlib.MAX_WBITS if data[:1] == "\x78" else -zlib.MAX_WBITS
+    else:
+        raise ValueError("Unsupported content encoding: %s" % encoding)
+
+    max_size = max_size or settings.SYNCING_MAX_DECOMPRESSED_BYTES
+    decompressor = zlib.decompressobj(wbits)
+    result = decompressor.decompress(data, max_size)
+    if decompressor.unconsumed_tail:
+        raise PayloadTooLarge("Request body is larger than %d bytes when decompressed." % max_size)
+    return result + decompressor.flush()
+
+
+def get_request_body(request):
+    """The body of a request, decompressed if need be."""
+    encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+    if encoding in ("", "identity"):
+        return request.body
+    return decompress(request.body, encoding)
+
+
+class AdaptiveBatchSize(object):
+    """
+    Number of records, and of bytes of serialized models, to send in each request.
+
+    The byte budget aims at requests that take about SYNCING_TARGET_SECONDS_PER_REQUEST at the
+    throughput measured so far, less the recent error rate, so that on a slow or flaky
+    connection each request is small enough to get through (and little is lost when it doesn't).
+    After each failed request, both sizes are halved.
+    """
+
+    # Weight of the latest measurement in the moving averages
+    SMOOTHING = 0.3
+
+    def __init__(self, max_records=None, min_bytes=None, max_bytes=None, target_seconds=None):
+        self.max_records = max_records or settings.SYNCING_MAX_RECORDS_PER_REQUEST
+        self.min_bytes = min_bytes or settings.SYNCING_MIN_BYTES_PER_REQUEST
+        self.max_bytes = max_bytes or settings.SYNCING_MAX_BYTES_PER_REQUEST
+        self.target_seconds = target_seconds or settings.SYNCING_TARGET_SECONDS_PER_REQUEST
+
+        self.limit = self.max_records
+        # Start small, and grow as we learn how fast the connection is
+        self.bytes = min(self.max_bytes, 4 * self.min_bytes)
+        self.throughput = None  # bytes per second
+        self.error_rate = 0.0
+
+    def _average(self, average, value):
+        return value if average is None else (1 - self.SMOOTHING) * average + self.SMOOTHING * value
+
+    def succeeded(self, nbytes, seconds, count):
+        """Record a request that sent count records, in nbytes bytes, in this many seconds."""
+        self.throughput = self._average(self.throughput, nbytes / max(seconds, 0.001))
+        self.error_rate = self._average(self.error_rate, 0.0)
+
+        target = self.throughput * self.target_seconds * (1 - self.error_rate)
+        # Grow at most twofold per request, as a single fast request may be a fluke
+        self.bytes = int(max(self.min_bytes, min(self.max_bytes, target, 2 * self.bytes)))
+        if count >= self.limit:
+            self.limit = min(self.max_records, 2 * self.limit)
+
+    def failed(self):
+        """Record a request that failed."""
+        self.error_rate = self._average(self.error_rate, 1.0)
+        self.bytes = max(self.min_bytes, self.bytes // 2)
+        self.limit = max(1, self.limit // 2)
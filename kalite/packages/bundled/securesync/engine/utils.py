@@ -7,15 +7,23 @@ from annoying.functions import get_object_or_None
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction
 from django.db.models import Q
 from django.db.models.fields.related import ForeignKey
 
 from .. import VERSION
 from fle_utils.django_utils import serializers
+from kalite.distributed.sqlite import single_writer
 
 
 _syncing_models = []  # all models we want to sync
 
+# Length of a serialized signature and counter, for models that don't have them yet
+ESTIMATED_SIGNATURE_SIZE = 400
+
+# Number of ids to look up per query (SQLite allows at most 999 parameters)
+MAX_QUERY_PARAMETERS = 500
+
 
 def add_syncing_models(models, dependency_check=False):
     """When sync is run, these models will be sync'd"""
@@ -54,25 +62,95 @@ def get_device_counters(**kwargs):
     """Get device counters, filtered by zone"""
     assert ("zone" in kwargs) + ("devices" in kwargs) == 1, "Must specify zone or devices, and not both."
 
-    from ..devices.models import Device
+    from ..devices.models import Device, DeviceMetadata
     devices = kwargs.get("devices") or Device.all_objects.by_zone(kwargs["zone"])  # include deleted objects
+    device_ids = set(device.id for device in devices)
 
-    device_counters = {}
-    for device in list(devices):
-        if device.id not in device_counters:  # why is this needed?
-            device_counters[device.id] = device.get_counter_position()
+    # Counter positions of all devices at once; devices without metadata haven't counted anything yet
+    device_counters = dict((device_id, 0) for device_id in device_ids)
+    metadata = DeviceMetadata.objects.filter(device__in=device_ids).values_list("device", "counter_position", "is_own_device")
+    for device_id, counter_position, is_own_device in metadata:
+        device_counters[device_id] = counter_position
 
-            # The local device may have items that haven't incremented the device counter,
-            #   but instead have deferred until sync time.  Include those!
-            if device.is_own_device():
-                cnt = 0
-                for Model in _syncing_models:
-                    cnt += Model.all_objects.filter(Q(counter__isnull=True) | Q(signature__isnull=True)).count()  # include deleted records
-                device_counters[device.id] += cnt
+        # The local device may have items that haven't incremented the device counter,
+        #   but instead have deferred until sync time.  Include those!
+        if is_own_device:
+            device_counters[device_id] += count_unsigned_models()
 
     return device_counters
 
 
+def _signed_after_query(limit, zone_fallback=False):
+    """
+    SQL for the (model class index, counter, pk) of up to limit models of each syncing model class
+    signed by some device above some counter, lowest counters first.
+    Parameters: the device id and counter (and the fallback zone id), repeated for each syncing model class.
+    """
+    quote_name = connection.ops.quote_name
+    conditions = "%s = %%s AND %s > %%s" % (quote_name("signed_by_id"), quote_name("counter"))
+    if zone_fallback:
+        conditions += " AND %s = %%s" % quote_name("zone_fallback_id")
+
+    subqueries = []
+    for index, Model in enumerate(_syncing_models):
+        subqueries.append("SELECT %d, q%d.* FROM (SELECT %s, %s FROM %s WHERE %s ORDER BY %s LIMIT %d) q%d" % (
+            index, index,
+            quote_name("counter"), quote_name(Model._meta.pk.column), quote_name(Model._meta.db_table),
+            conditions, quote_name("counter"), limit, index,
+        ))
+    return " UNION ALL ".join(subqueries)
+
+
+def count_unsigned_models():
+    """
+    Number of models (including deleted ones) that haven't been counted or signed yet,
+    counted in a single query over all syncing models.
+    """
+    subqueries = []
+    params = []
+    for Model in _syncing_models:
+        sql, model_params = _unsigned(Model.all_objects).values_list("pk").query.sql_with_params()
+        subqueries.append("SELECT COUNT(*) AS n FROM (%s) q" % sql)
+        params += model_params
+    if not subqueries:
+        return 0
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT SUM(n) FROM (%s) q" % " UNION ALL ".join(subqueries), params)
+    return cursor.fetchone()[0]
+
+
+def _unsigned(queryset):
+    """Models that haven't been counted or signed yet (using the partial index of ensure_counter_indexes)."""
+    return queryset.filter(Q(counter__isnull=True) | Q(signature__isnull=True))
+
+
+def ensure_counter_indexes(**kwargs):
+    """
+    Create the indexes that get_models relies on, for each syncing model:
+    on (signed_by, counter), to find the models a device signed above some counter, in order,
+    and on the models that haven't been counted or signed yet.
+
+    These are created here rather than in each app's migrations, as SyncedModel is used across apps.
+    Connected to post_syncdb and post_migrate, and safe to call repeatedly.
+    """
+    quote_name = connection.ops.quote_name
+    cursor = connection.cursor()
+    tables = set(connection.introspection.table_names(cursor))
+    for Model in _syncing_models:
+        table = Model._meta.db_table
+        if table not in tables:
+            continue
+        cursor.execute("CREATE INDEX IF NOT EXISTS %s ON %s (%s, %s)" % (
+            quote_name("%s_signed_by_id_counter" % table), quote_name(table), quote_name("signed_by_id"), quote_name("counter"),
+        ))
+        # Must match the WHERE clause generated by _unsigned exactly, for the database to use it
+        cursor.execute("CREATE INDEX IF NOT EXISTS %s ON %s (%s) WHERE (%s.%s IS NULL OR %s.%s IS NULL)" % (
+            quote_name("%s_unsigned" % table), quote_name(table), quote_name(Model._meta.pk.column),
+            quote_name(table), quote_name("counter"), quote_name(table), quote_name("signature"),
+        ))
+
+
 def get_models(device_counters=None, limit=None, zone=None, dest_version=None, **kwargs):
     """Serialize models for some intended version (dest_version)
     Default is our own version--i.e. include all known fields.
@@ -96,97 +174,90 @@ def get_models(device_counters=None, limit=None, zone=None, dest_version=None, *
     if device_counters is None:
         device_counters = dict((device.id, 0) for device in Device.all_objects.by_zone(zone))  # include deleted devices
 
-    # remove all requested devices that either don't exist or aren't in the correct zone
-    for device_id in device_counters.keys():
-        device = get_object_or_None(Device.all_objects, pk=device_id)
-        if not device or not (device.in_zone(zone) or device.is_trusted()):
-            del device_counters[device_id]
+    # remove all requested devices that either don't exist or aren't in the correct zone (or trusted),
+    #   in a single query
+    valid_device_ids = set(Device.all_objects.by_zone(zone).filter(pk__in=device_counters.keys()).values_list("pk", flat=True))
+    device_counters = dict((device_id, counter) for device_id, counter in device_counters.items() if device_id in valid_device_ids)
+    # for trusted (central) devices that aren't in the zone, only include models with the correct fallback zone
+    in_zone = set(Device.all_objects.filter(pk__in=valid_device_ids, devicezone__zone=zone, devicezone__revoked=False).values_list("pk", flat=True))
 
-    models = []
     remaining = limit
-
-    # loop through all the model classes marked as syncable
-    #  (note: NEVER BREAK OUT OF THIS LOOP!  We need to ensure that
-    #    all models below the counter position selected are sent NOW,
-    #    otherwise they will be forgotten FOREVER)
-    for Model in _syncing_models:
-
-        # loop through each of the devices of interest
-        #   Do devices first, because each device is independent.
-        #   Models within a device are highly dependent (on explicit dependencies,
-        #   as well as counter position)
-        for device_id, counter in device_counters.items():
-            # We need to track the min counter position (send things above this value)
-            #   and the max (we're sending up to this value, so make sure nothing
-            #   below it is left behind)
-            counter_min = counter + 1
-            counter_max = 0
-
-            device = Device.all_objects.get(pk=device_id)
-
-            queryset = Model.all_objects.filter(Q(signed_by=device) | Q(signed_by__isnull=True) | Q(counter__isnull=True))
-
-            # for trusted (central) device, only include models with the correct fallback zone
-            if not device.in_zone(zone):
-                assert device.is_trusted(), "Should never include devices not ACTUALLY in the zone, except trusted devices."
-                queryset = queryset.filter(zone_fallback=zone)
-
-            # Now select relevant items that have been updated since the last sync event
-            queryset = queryset.filter(Q(counter__gte=counter_min) | Q(counter__isnull=True))
-            if not queryset:
-                continue
-
-            # Make sure you send anything that HAS to be sent (i.e. send anything that is BELOW
-            #   the max counter position that we do plan to send.  If we find things that we
-            #   unexpectedly need to send, make sure to add room for them.
-
-            if remaining is None: # this means limit was None, so we just sync everything
-                new_models = queryset
-            else:
-                if counter_max is None:
-                    # If we're sending something with counter=None, then this will set
-                    #   the devicecounter above anything downstream, so these downstream items
-                    #   must be sent NOW
-                    remaining += max(0, (queryset.filter(counter__isnull=False).count() - remaining))
-                else:
-                    # If we're sending something with counter=10, then anything with a lower
-                    #   counter must be sent along with it.  So, squeeze it in
-                    remaining += max(0, (queryset.filter(counter__lt=counter_max).count() - remaining))
-
-                # Grab up to (remaining) model instances, then decrease the remaining to the total limit remaining
-                new_models = queryset[:remaining]
-
-            if not new_models:
-                continue
-
-            if counter_max is not None:
-                # None is the most severe, so only check if we're not already sending things with None
-                counters = [m.counter for m in new_models]
-                if None in counters:
-                    counter_max = None
-                else:
-                    counter_max = max(counter_max, max(counters))
-
-            models += new_models
-            if remaining is not None:
-                remaining -= len(new_models)
-
-        # Must loop through all models (due to potential dependencies), but
-        if remaining is not None and remaining <= 0:
+    selected = {}  # index of the model class in _syncing_models => ids of the models to send
+
+    # For each device, find the models it signed above its counter position, lowest counters first,
+    #   across all model classes.  Anything below the highest counter we send must be sent NOW,
+    #   as the other side will ask for models above that counter next time, and anything left
+    #   behind would be forgotten FOREVER.
+    #   This takes one query per device, each part of which is answered from the
+    #   (signed_by, counter) index; see ensure_counter_indexes.
+    #   The query is the same for each device, so it's only built once.
+    sql = _signed_after_query(limit)
+    sql_with_zone_fallback = _signed_after_query(limit, zone_fallback=True)
+    cursor = connection.cursor()
+    for device_id, counter in sorted(device_counters.items()):
+        if remaining <= 0:
+            break
+        if device_id in in_zone:
+            cursor.execute(sql, [device_id, counter] * len(_syncing_models))
+        else:
+            cursor.execute(sql_with_zone_fallback, [device_id, counter, zone.id] * len(_syncing_models))
+        candidates = sorted((model_counter, index, pk) for index, model_counter, pk in cursor.fetchall())[:remaining]
+        for model_counter, index, pk in candidates:
+            selected.setdefault(index, []).append(pk)
+        remaining -= len(candidates)
+
+    # Then models that haven't been counted or signed yet (whichever device they're for).
+    #   These get counted above everything else when serialized, so they go last.
+    for index, Model in enumerate(_syncing_models):
+        if remaining <= 0 or not device_counters:
             break
+        queryset = _unsigned(Model.all_objects)
+        if not in_zone:
+            queryset = queryset.filter(zone_fallback=zone)
+        pks = list(queryset.values_list("pk", flat=True)[:remaining])
+        selected.setdefault(index, []).extend(pks)
+        remaining -= len(pks)
+
+    # Finally, fetch the models, in the order of _syncing_models (because of dependencies between them)
+    models = []
+    for index, Model in enumerate(_syncing_models):
+        pks = selected.get(index)
+        if not pks:
+            continue
+        objects = {}
+        for start in range(0, len(pks), MAX_QUERY_PARAMETERS):
+            objects.update(Model.all_objects.in_bulk(pks[start:start + MAX_QUERY_PARAMETERS]))
+        models += [objects[pk] for pk in pks if pk in objects]
 
     return models
 
 
 def get_serialized_models(*args, **kwargs):
+    """Serialize the models returned by get_models.
+    If max_bytes is given, fewer models are returned when needed to keep the serialized models
+    within about that many bytes (but at least as many as needed to not leave any behind, see get_models).
+    """
     from ..devices.models import Device
 
+    max_bytes = kwargs.pop("max_bytes", None)
     models = get_models(*args, **kwargs)
 
     dest_version = kwargs.get("dest_version") or Device.get_own_device().get_version()
     include_count = kwargs.get("include_count", False)
     verbose = kwargs.get("verbose", False)
 
+    # too big? try again with fewer models, scaled to the size of those we have.
+    #   This has to be decided before serializing for real, as that assigns counters to the models.
+    while max_bytes and len(models) > 1:
+        size = estimate_serialized_size(models, dest_version=dest_version)
+        if size <= max_bytes:
+            break
+        kwargs["limit"] = max(1, min(len(models) / 2, len(models) * max_bytes / size))
+        fewer_models = get_models(*args, **kwargs)
+        if len(fewer_models) >= len(models):
+            break
+        models = fewer_models
+
     # serialize the models we found
     serialized_models = serialize(models, ensure_ascii=False, dest_version=dest_version)
 
@@ -200,7 +271,66 @@ def get_serialized_models(*args, **kwargs):
         return serialized_models
 
 
-#@transaction.commit_on_success
+class _ImportBatch(object):
+    """
+    Shared state for importing a batch of models (see save_serialized_models), so that the work
+    that depends only on the signing device is done once per device rather than once per model:
+    * models signed by the same device share one Device instance, so its key is parsed once
+    * whether we accept models from a device at all (SyncedModel.validate) is checked once
+    * the counter position of each device is set once, at the highest counter in the batch
+    """
+
+    def __init__(self, increment_counters=True):
+        self.increment_counters = increment_counters
+        self.devices = {}
+        self.valid_devices = {}
+        self.counters = {}
+
+    def share_signing_device(self, model):
+        from ..devices.models import Device
+
+        device_id = model.signed_by_id
+        if not device_id:
+            return
+        if not self.devices.get(device_id):
+            # Don't remember devices that aren't there (yet): a device can sign itself,
+            #   and be saved further on in the same batch.
+            self.devices[device_id] = get_object_or_None(Device, id=device_id)
+        if self.devices[device_id]:
+            model.signed_by = self.devices[device_id]
+
+    def save(self, model):
+        from .models import SyncedModel
+
+        # Models that customize how they are verified (e.g. devices and zones) are saved one by one.
+        if model.__class__.verify.im_func is not SyncedModel.verify.im_func or model.__class__.validate.im_func is not SyncedModel.validate.im_func:
+            model.save(imported=True, increment_counters=self.increment_counters)
+            return
+
+        if not model.signed_by_id:
+            raise ValidationError("Imported models must be signed.")
+        if model.signed_by_id not in self.valid_devices:
+            self.valid_devices[model.signed_by_id] = model.validate()
+        if not self.valid_devices[model.signed_by_id] or not model.verify_signature():
+            raise ValidationError("Could not verify the imported model.")
+
+        model.save(imported=True, batched=True)
+        if self.increment_counters:
+            self.track_counter(model)
+
+    def track_counter(self, model):
+        if model.counter is not None and model.counter > self.counters.get(model.signed_by_id, -1):
+            self.counters[model.signed_by_id] = model.counter
+
+    def set_counter_positions(self):
+        from ..devices.models import Device
+
+        for device_id, counter in self.counters.iteritems():
+            device = self.devices.get(device_id) or get_object_or_None(Device, id=device_id)
+            if device:
+                device.set_counter_position(counter, soft_set=True)
+
+
 def save_serialized_models(data, increment_counters=True, src_version=None, verbose=False):
     """Unserializes models (from a device of version=src_version) in data and saves them to the django database.
     If src_version is None, all unrecognized fields are (silently) stripped off.
@@ -233,52 +363,58 @@ def save_serialized_models(data, increment_counters=True, src_version=None, verb
     else:
         models = deserialize(data, src_version=src_version, dest_version=own_device.get_version())
 
-    # try importing each of the models in turn
+    # try importing each of the models in turn, in a single transaction
     unsaved_models = []
     exceptions = ""
     saved_model_count = 0
-    try:
-        for modelwrapper in models:
-            try:
+    batch = _ImportBatch(increment_counters=increment_counters)
+    with single_writer(), transaction.commit_on_success():
+        try:
+            for modelwrapper in models:
+                try:
 
-                # extract the model from the deserialization wrapper
-                model = modelwrapper.object
+                    # extract the model from the deserialization wrapper
+                    model = modelwrapper.object
 
-                # only allow the importing of models that are subclasses of SyncedModel
-                if not hasattr(model, "verify"):
-                    raise ValidationError("Cannot save model: %s does not have a verify method (not a subclass of SyncedModel?)" % model.__class__)
+                    # only allow the importing of models that are subclasses of SyncedModel
+                    if not hasattr(model, "verify"):
+                        raise ValidationError("Cannot save model: %s does not have a verify method (not a subclass of SyncedModel?)" % model.__class__)
 
-                # TODO(jamalex): more robust way to do this? (otherwise, it might barf about the id already existing)
-                model._state.adding = False
+                    # TODO(jamalex): more robust way to do this? (otherwise, it might barf about the id already existing)
+                    model._state.adding = False
 
-                # verify that all fields are valid, and that foreign keys can be resolved
-                model.full_clean(imported=True)
+                    batch.share_signing_device(model)
 
-                # save the imported model (checking that the signature is valid in the process)
-                model.save(imported=True, increment_counters=increment_counters)
+                    # verify that all fields are valid, and that foreign keys can be resolved
+                    model.full_clean(imported=True)
 
-                # keep track of how many models have been successfully saved
-                saved_model_count += 1
+                    # save the imported model (checking that the signature is valid in the process)
+                    batch.save(model)
 
-                if verbose:
-                    print "IMPORTED %s (id: %s, counter: %d, signed_by: %s)" % (model.__class__.__name__, model.id[0:5], model.counter, model.signed_by.id[0:5])
+                    # keep track of how many models have been successfully saved
+                    saved_model_count += 1
 
-            except ValidationError as e: # the model could not be saved
+                    if verbose:
+                        print "IMPORTED %s (id: %s, counter: %d, signed_by: %s)" % (model.__class__.__name__, model.id[0:5], model.counter, model.signed_by.id[0:5])
 
-                # keep a running list of models and exceptions, to be stored in purgatory
-                exceptions += "%s: %s\n" % (model.pk, e)
-                unsaved_models.append(model)
+                except ValidationError as e: # the model could not be saved
 
-                # if the model is at least properly signed, try incrementing the counter for the signing device
-                # (because otherwise we may never ask for additional models)
-                try:
-                    if increment_counters and model.verify():
-                        model.signed_by.set_counter_position(model.counter, soft_set=True)
-                except:
-                    pass
+                    # keep a running list of models and exceptions, to be stored in purgatory
+                    exceptions += "%s: %s\n" % (model.pk, e)
+                    unsaved_models.append(model)
+
+                    # if the model is at least properly signed, try incrementing the counter for the signing device
+                    # (because otherwise we may never ask for additional models)
+                    try:
+                        if increment_counters and model.verify():
+                            batch.track_counter(model)
+                    except:
+                        pass
 
-    except Exception as e:
-        exceptions += unicode(e)
+        except Exception as e:
+            exceptions += unicode(e)
+
+        batch.set_counter_positions()
 
     # deal with any models that didn't validate properly; throw them into purgatory so we can try again later
     if unsaved_models:
@@ -333,6 +469,14 @@ def serialize(models, sign=True, increment_counters=True, dest_version=VERSION,
     return serializers.serialize("versioned-json", models, dest_version=dest_version, *args, **kwargs)
 
 
+def estimate_serialized_size(models, dest_version=VERSION):
+    """
+    Approximate length of serialize(models), without signing the models or assigning them counters.
+    """
+    unsigned_count = sum(1 for model in models if not model.signature)
+    return len(serializers.serialize("versioned-json", models, dest_version=dest_version, ensure_ascii=False)) + unsigned_count * ESTIMATED_SIGNATURE_SIZE
+
+
 def deserialize(data, src_version=VERSION, dest_version=VERSION, *args, **kwargs):
     """
     Similar to serialize, except for deserialization.
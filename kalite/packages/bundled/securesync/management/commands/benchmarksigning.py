@@ -0,0 +1,69 @@
+"""
+"""
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from ...devices.models import Device
+from ...engine.utils import _syncing_models
+
+
+def _rate(count, seconds):
+    return count / max(seconds, 1e-9)
+
+
+class Command(BaseCommand):
+    args = "[model class name ...]"
+    help = "Measure how many models of each synced class this device can sign and verify per second."
+
+    option_list = BaseCommand.option_list + (
+        make_option("-n", "--count",
+                    action="store",
+                    dest="count",
+                    type="int",
+                    default=100,
+                    help="Number of models of each class to measure (default: 100)"),
+    )
+
+    def stdout_writeln(self, str):  self.stdout.write("%s\n"%str)
+
+    def handle(self, *args, **options):
+        own_device = Device.get_own_device()
+        key = own_device.get_key()
+
+        self.stdout_writeln("%-24s %8s %14s %14s %14s" % ("Model", "Count", "Serialize/s", "Sign/s", "Verify/s"))
+        for Model in _syncing_models:
+            if args and Model.__name__ not in args:
+                continue
+
+            # Models are signed and verified in memory only, and never saved.
+            models = list(Model.objects.all()[:options["count"]])
+            if not models:
+                self.stdout_writeln("%-24s %8d %14s %14s %14s" % (Model.__name__, 0, "-", "-", "-"))
+                continue
+
+            start = time.time()
+            representations = [model._hashable_representation() for model in models]
+            serialize_time = time.time() - start
+
+            start = time.time()
+            signatures = [key.sign(representation) for representation in representations]
+            sign_time = time.time() - start
+
+            for model, signature in zip(models, signatures):
+                model.signed_by = own_device
+                model.signature = signature
+            start = time.time()
+            verified = sum(1 for model in models if model.verify_signature())
+            verify_time = time.time() - start
+
+            self.stdout_writeln("%-24s %8d %14.1f %14.1f %14.1f" % (
+                Model.__name__,
+                len(models),
+                _rate(len(models), serialize_time),
+                _rate(len(models), sign_time),
+                _rate(len(models), verify_time),
+            ))
+            if verified != len(models):
+                self.stderr.write("%s: %d of %d signatures did not verify!\n" % (Model.__name__, len(models) - verified, len(models)))
@@ -0,0 +1,150 @@
+"""
+"""
+import os
+import tempfile
+import time
+import uuid
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+
+from ...devices.models import Device, DeviceMetadata, DeviceZone
+from ...engine.models import SyncedLog
+from ...engine.utils import _syncing_models, ensure_counter_indexes, get_device_counters, get_models
+
+
+class Command(BaseCommand):
+    help = "Measure how fast the models to sync are selected, in a synthetic zone (in a throwaway database)."
+
+    option_list = BaseCommand.option_list + (
+        make_option("-d", "--devices",
+                    action="store",
+                    dest="devices",
+                    type="int",
+                    default=100,
+                    help="Number of devices in the zone (default: 100)"),
+        make_option("-n", "--logs",
+                    action="store",
+                    dest="logs",
+                    type="int",
+                    default=1000000,
+                    help="Number of logs, spread over the devices (default: 1000000)"),
+        make_option("-l", "--limit",
+                    action="store",
+                    dest="limit",
+                    type="int",
+                    default=None,
+                    help="Number of models to select per request (default: SYNCING_MAX_RECORDS_PER_REQUEST)"),
+        make_option("--without-indexes",
+                    action="store_true",
+                    dest="without_indexes",
+                    default=False,
+                    help="Drop the (signed_by, counter) indexes, for comparison"),
+    )
+
+    def stdout_writeln(self, str):  self.stdout.write("%s\n"%str)
+
+    def handle(self, *args, **options):
+        # Don't touch the real database
+        fd, path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        connection.settings_dict["TEST_NAME"] = path
+        old_name = connection.settings_dict["NAME"]
+        try:
+            from south.management.commands import patch_for_test_db_setup
+            patch_for_test_db_setup()  # migrate, rather than syncdb, the apps that have migrations
+        except ImportError:
+            pass
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        Device.own_device = None
+
+        old_debug = settings.DEBUG
+        settings.DEBUG = True  # to count queries
+        try:
+            self.stdout_writeln("Generating a zone of %d devices, with %d logs..." % (options["devices"], options["logs"]))
+            start = time.time()
+            zone, device_ids = self.generate_zone(options["devices"], options["logs"], without_indexes=options["without_indexes"])
+            self.stdout_writeln("Done in %.1f seconds.\n" % (time.time() - start))
+
+            limit = options["limit"] or settings.SYNCING_MAX_RECORDS_PER_REQUEST
+            device_counters = get_device_counters(zone=zone)
+
+            self.stdout_writeln("%-32s %8s %8s %10s" % ("Query", "Queries", "Models", "Seconds"))
+            self.measure("get_device_counters", lambda: get_device_counters(zone=zone))
+            self.measure("get_models (from scratch)", lambda: get_models(dict((device_id, 0) for device_id in device_counters), limit=limit, zone=zone))
+            # Every device has a few new logs
+            behind = max(1, limit // (2 * len(device_ids)))
+            self.measure("get_models (incremental)", lambda: get_models(dict((device_id, max(0, counter - behind)) for device_id, counter in device_counters.items()), limit=limit, zone=zone))
+            self.measure("get_models (up to date)", lambda: get_models(dict(device_counters), limit=limit, zone=zone))
+        finally:
+            settings.DEBUG = old_debug
+            Device.own_device = None
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def measure(self, name, fn):
+        reset_queries()
+        start = time.time()
+        result = fn()
+        seconds = time.time() - start
+        count = len(result) if isinstance(result, list) else len(result.keys())
+        self.stdout_writeln("%-32s %8d %8d %10.3f" % (name, len(connection.queries), count, seconds))
+        reset_queries()
+
+    @transaction.commit_on_success
+    def generate_zone(self, num_devices, num_logs, without_indexes=False):
+        """
+        Fill the database with a zone of devices, with logs signed by each of them in turn.
+        The models are neither valid nor signed, but that doesn't matter to selecting them.
+        """
+        call_command("generate_zone")
+        own_device = Device.get_own_device()
+        zone = own_device.get_zone()
+
+        # The devices, and their membership of the zone, are signed by our own device
+        device_ids = [uuid.uuid4().hex for i in range(num_devices)]
+        counter = own_device.get_counter_position()
+        Device.objects.bulk_create([
+            Device(id=device_id, name="Device %d" % i, signed_by=own_device, counter=counter + 2 * i + 1, signature="-")
+            for i, device_id in enumerate(device_ids)
+        ])
+        DeviceZone.objects.bulk_create([
+            DeviceZone(id=uuid.uuid4().hex, device_id=device_id, zone=zone, signed_by=own_device, counter=counter + 2 * i + 2, signature="-")
+            for i, device_id in enumerate(device_ids)
+        ])
+        own_device.set_counter_position(counter + 2 * num_devices)
+
+        # Inserting is much faster without the indexes, so create them afterwards
+        self.drop_counter_indexes()
+
+        counters = dict((device_id, 0) for device_id in device_ids)
+        batch = []
+        for i in range(num_logs):
+            device_id = device_ids[i % num_devices]
+            counters[device_id] += 1
+            batch.append(SyncedLog(id=uuid.uuid4().hex, category="benchmark", signed_by_id=device_id, counter=counters[device_id], signature="-"))
+            if len(batch) >= 10000:
+                SyncedLog.objects.bulk_create(batch)
+                batch = []
+        SyncedLog.objects.bulk_create(batch)
+
+        DeviceMetadata.objects.bulk_create([
+            DeviceMetadata(device_id=device_id, counter_position=counter)
+            for device_id, counter in counters.items()
+        ])
+
+        if not without_indexes:
+            ensure_counter_indexes()
+        connection.cursor().execute("ANALYZE")
+        return zone, device_ids
+
+    def drop_counter_indexes(self):
+        cursor = connection.cursor()
+        for Model in _syncing_models:
+            table = Model._meta.db_table
+            for suffix in ("signed_by_id_counter", "unsigned"):
+                cursor.execute("DROP INDEX IF EXISTS %s" % connection.ops.quote_name("%s_%s" % (table, suffix)))
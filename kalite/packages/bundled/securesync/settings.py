@@ -6,9 +6,22 @@ SYNCING_THROTTLE_WAIT_TIME = None  # default: don't throttle syncing
 
 SYNCING_MAX_RECORDS_PER_REQUEST = 100  # 100 records per http request
 
+# Bounds on the size of the serialized models (uncompressed JSON) in each http request.
+#   Within these, the size is adapted to the speed of the connection, aiming for requests
+#   that take SYNCING_TARGET_SECONDS_PER_REQUEST (see engine/transfer.py).
+SYNCING_MIN_BYTES_PER_REQUEST = 16 * 1024
+SYNCING_MAX_BYTES_PER_REQUEST = 1024 * 1024
+SYNCING_TARGET_SECONDS_PER_REQUEST = 15
+
+# Refuse compressed requests that would inflate to more than this
+SYNCING_MAX_DECOMPRESSED_BYTES = 64 * 1024 * 1024
+
 # Here, None === no limit
 SYNC_SESSIONS_MAX_RECORDS = 10
 
 SHOW_DELETED_OBJECTS = False
 
 DEBUG_ALLOW_DELETIONS = False
+
+# How many parsed public keys of other devices to keep in memory, for verifying the models they signed
+PUBLIC_KEY_CACHE_SIZE = 100
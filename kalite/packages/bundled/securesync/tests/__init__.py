@@ -3,3 +3,5 @@ from crypto_tests import *
 from decorators import *
 from trust_tests import *
 from unicode_tests import *
+from transfer_tests import *
+from query_tests import *
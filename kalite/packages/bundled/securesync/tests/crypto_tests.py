@@ -8,14 +8,14 @@ from django.conf import settings
 from django.core.management import call_command
 from django.test import TestCase
 from django.utils import unittest
+from django.test.utils import override_settings
 
 from .base import SecuresyncTestCase
 from .. import crypto
 from ..models import Device
 from fle_utils.django_utils.command import call_command_with_output
 from kalite.facility.models import Facility, FacilityUser, FacilityGroup
-from securesync import crypto
-from securesync.models import Device, Zone, DeviceZone
+from securesync.models import Zone, DeviceZone
 
 
 @unittest.skipIf(not crypto.M2CRYPTO_EXISTS, "Skipping M2Crypto tests as it does not appear to be installed.")
@@ -168,6 +168,32 @@ class TestExistingKeysAndSignatures(unittest.TestCase):
         self.assertFalse(key.verify(self.message_fake, self.signature_base64))
 
 
+class TestPublicKeyCache(unittest.TestCase):
+
+    pub_key = TestExistingKeysAndSignatures.pub_key_with_pkcs8_header
+    other_pub_key = TestExistingKeysAndSignatures.pub_key_with_no_headers
+
+    def test_key_is_parsed_once(self):
+        key = crypto.get_public_key(self.pub_key)
+        self.assertIs(crypto.get_public_key(self.pub_key), key)
+        self.assertTrue(key.verify(TestExistingKeysAndSignatures.message_actual, TestExistingKeysAndSignatures.signature))
+
+    @override_settings(PUBLIC_KEY_CACHE_SIZE=1)
+    def test_least_recently_used_key_is_dropped(self):
+        key = crypto.get_public_key(self.pub_key)
+        crypto.get_public_key(self.other_pub_key)
+        self.assertIsNot(crypto.get_public_key(self.pub_key), key)
+
+
+class TestBenchmarkSigning(SecuresyncTestCase):
+
+    def test_own_device_is_measured(self):
+        Device.get_own_device()
+        out, err, val = call_command_with_output("benchmarksigning", "Device", count=1)
+        self.assertIn("Device", out)
+        self.assertEqual(err, "")
+
+
 class TestSignLargeFile(SecuresyncTestCase):
     """Special code for signing large files.  Test that it works!"""
     def setUp(self):
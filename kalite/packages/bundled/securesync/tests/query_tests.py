@@ -0,0 +1,77 @@
+"""
+Tests for how models to sync are selected by device and counter
+"""
+import uuid
+
+from django.core.management import call_command
+from django.db import connection
+
+from .base import SecuresyncTestCase
+from .decorators import distributed_server_test
+from ..engine.utils import _syncing_models, ensure_counter_indexes, get_device_counters, get_models
+from ..models import Device, DeviceMetadata, Zone
+from kalite.facility.models import Facility
+
+
+class TestGetModels(SecuresyncTestCase):
+
+    def setUp(self):
+        super(TestGetModels, self).setUp()
+        call_command("generate_zone")
+        for i in range(10):
+            Facility(name="Facility %d" % i).save(increment_counters=True, sign=True)
+        self.own_device = Device.get_own_device()
+
+    def get_counters(self, models):
+        return [model.counter for model in models if model.signed_by_id == self.own_device.id]
+
+    def test_counter_indexes(self):
+        ensure_counter_indexes()
+        table = Facility._meta.db_table
+        cursor = connection.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s", [table])
+        self.assertIn("%s_signed_by_id_counter" % table, [row[0] for row in cursor.fetchall()])
+
+    @distributed_server_test
+    def test_lowest_counters_first(self):
+        counters = sorted(
+            counter
+            for Model in _syncing_models
+            for counter in Model.all_objects.filter(signed_by=self.own_device, counter__isnull=False).values_list("counter", flat=True)
+        )
+
+        models = get_models({self.own_device.id: 0}, limit=5)
+        self.assertEqual(sorted(self.get_counters(models)), counters[:5])
+
+        # The next batch continues from the highest counter sent
+        models = get_models({self.own_device.id: counters[4]}, limit=5)
+        self.assertEqual(sorted(self.get_counters(models)), counters[5:10])
+
+    @distributed_server_test
+    def test_uncounted_models_sent_once(self):
+        zone = self.own_device.get_zone()
+        counter = get_device_counters(zone=zone)[self.own_device.id]
+        facility = Facility.objects.all()[0]
+        Facility.all_objects.filter(pk=facility.pk).update(counter=None, signed_by=None, signature=None)
+
+        device_counters = get_device_counters(zone=zone)
+        self.assertEqual(device_counters[self.own_device.id], counter + 1)
+
+        models = get_models(dict((device_id, 0) for device_id in device_counters), limit=1000)
+        self.assertEqual([model.pk for model in models].count(facility.pk), 1)
+        self.assertEqual(len(models), len(set(model.pk for model in models)))
+
+    @distributed_server_test
+    def test_trusted_device_models_in_zone_only(self):
+        trusted_device = Device(id=uuid.uuid4().hex, name="Central", signature="-")
+        other_zone = Zone(id=uuid.uuid4().hex, name="Other zone", signature="-")
+        Device.objects.bulk_create([trusted_device])
+        Zone.objects.bulk_create([other_zone])
+        DeviceMetadata(device=trusted_device, is_trusted=True).save()
+
+        facilities = list(Facility.objects.all()[:2])
+        for counter, (facility, zone) in enumerate(zip(facilities, [self.own_device.get_zone(), other_zone])):
+            Facility.all_objects.filter(pk=facility.pk).update(signed_by=trusted_device, counter=counter + 1, zone_fallback=zone)
+
+        models = get_models({trusted_device.id: 0}, limit=10)
+        self.assertEqual([model.pk for model in models], [facilities[0].pk])
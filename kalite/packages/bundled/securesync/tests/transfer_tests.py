@@ -0,0 +1,121 @@
+"""
+Tests for compression and batch sizing of sync requests
+"""
+import json
+import uuid
+import zlib
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test.client import RequestFactory
+from django.utils import unittest
+
+from .base import SecuresyncTestCase
+from .decorators import distributed_server_test
+from ..engine.transfer import AdaptiveBatchSize, PayloadTooLarge, compress, decompress, get_request_body
+from ..engine.utils import _ImportBatch, get_serialized_models
+from ..models import Device, DeviceMetadata, SyncSession, SyncedLog
+from kalite.facility.models import Facility
+
+
+class TestCompression(unittest.TestCase):
+
+    data = json.dumps({"models": [{"pk": i, "fields": {"name": "Facility %d" % i}} for i in range(100)]})
+
+    def test_gzip(self):
+        compressed = compress(self.data)
+        self.assertLess(len(compressed), len(self.data))
+        self.assertEqual(decompress(compressed, "gzip"), self.data)
+
+    def test_deflate(self):
+        self.assertEqual(decompress(zlib.compress(self.data), "deflate"), self.data)
+        raw = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.assertEqual(decompress(raw.compress(self.data) + raw.flush(), "deflate"), self.data)
+
+    def test_decompressed_size_is_limited(self):
+        self.assertRaises(PayloadTooLarge, decompress, compress(self.data), "gzip", max_size=100)
+
+    def test_request_body(self):
+        factory = RequestFactory()
+        request = factory.post("/", compress(self.data), content_type="application/json", HTTP_CONTENT_ENCODING="gzip")
+        self.assertEqual(get_request_body(request), self.data)
+        request = factory.post("/", self.data, content_type="application/json")
+        self.assertEqual(get_request_body(request), self.data)
+
+
+class TestAdaptiveBatchSize(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = AdaptiveBatchSize(max_records=100, min_bytes=1000, max_bytes=100000, target_seconds=10)
+
+    def test_failures_halve_batch(self):
+        self.batch.failed()
+        self.assertEqual(self.batch.limit, 50)
+        self.assertEqual(self.batch.bytes, 2000)
+        for i in range(5):
+            self.batch.failed()
+        self.assertEqual(self.batch.bytes, 1000)
+
+    def test_fast_connection_grows_batch(self):
+        for i in range(10):
+            self.batch.succeeded(self.batch.bytes, 0.1, 10)
+        self.assertEqual(self.batch.bytes, 100000)
+
+    def test_slow_connection_shrinks_batch(self):
+        # 200 bytes per second, so about 2000 bytes in 10 seconds
+        for i in range(20):
+            self.batch.succeeded(self.batch.bytes, self.batch.bytes / 200.0, 10)
+        self.assertTrue(1500 < self.batch.bytes <= 2000, "Batch of %d bytes is not ~2000" % self.batch.bytes)
+
+
+class TestSyncTransfer(SecuresyncTestCase):
+
+    @distributed_server_test
+    def test_models_fit_in_byte_budget(self):
+        call_command("generate_zone")
+        for i in range(20):
+            Facility(name="Facility %d" % i, description="x" * 500).save()
+
+        all_models = get_serialized_models(limit=100, include_count=True)
+        self.assertGreaterEqual(all_models["count"], 20)
+
+        result = get_serialized_models(limit=100, max_bytes=len(all_models["models"]) / 4, include_count=True)
+        self.assertLess(result["count"], all_models["count"] / 3)
+        self.assertLessEqual(len(result["models"]), len(all_models["models"]) / 4)
+
+    @distributed_server_test
+    def test_compressed_upload_is_acknowledged(self):
+        call_command("generate_zone")
+        own_device = Device.get_own_device()
+        session = SyncSession(client_nonce=uuid.uuid4().hex, client_device=own_device, server_device=own_device, verified=True)
+        session.save()
+        device_counters = {own_device.id: 0}
+
+        body = json.dumps({
+            "client_nonce": session.client_nonce,
+            "models": get_serialized_models(dict(device_counters)),
+            "device_counters": device_counters,
+        })
+        response = self.client.post(reverse("model_upload"), compress(body), content_type="application/json", HTTP_CONTENT_ENCODING="gzip")
+
+        self.assertEqual(response.status_code, 200)
+        result = json.loads(response.content)
+        self.assertEqual(result["device_counters"], {own_device.id: own_device.get_counter_position()})
+
+
+class TestImportBatch(SecuresyncTestCase):
+
+    def test_counter_of_device_saved_in_batch(self):
+        # A new device's own models are looked at before the device itself is saved
+        device_id = uuid.uuid4().hex
+        device = Device(id=device_id, name="New device", signed_by_id=device_id, signature="-")
+        log = SyncedLog(id=uuid.uuid4().hex, signed_by_id=device.id, counter=5)
+        batch = _ImportBatch()
+        batch.share_signing_device(log)
+
+        Device.objects.bulk_create([device])
+        batch.share_signing_device(log)
+        batch.track_counter(log)
+        batch.set_counter_positions()
+
+        self.assertEqual(DeviceMetadata.objects.get(device=device).counter_position, 5)
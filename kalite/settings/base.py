@@ -432,8 +432,11 @@ CACHES = {
 # updates
 KEY_PREFIX = version.VERSION
 
-# Separate session caching from file caching.
-SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+# Keep sessions in their own SQLite database, and only the session key in the cookie.
+SESSION_ENGINE = 'kalite.facility.sessions'
+SESSION_DATABASE_PATH = os.path.join(DEFAULT_DATABASE_DIR, 'sessions.sqlite')
+# Least recently used sessions beyond this number are dropped
+SESSION_STORE_MAX_ENTRIES = 5000
 
 # Expire session cookies after 30 minutes, but extend sessions when there's activity from the user.
 SESSION_COOKIE_AGE = 60 * 30     # 30 minutes
@@ -462,7 +465,33 @@ LOGOUT_URL = "/securesync/api/user/logout/"
 CHERRYPY_THREAD_COUNT = 18
 
 # PRAGMAs to pass to SQLite when we first open the content DBs for reading. Used mostly for optimizations.
-CONTENT_DB_SQLITE_PRAGMAS = []
+# Content DB connections are kept open for the lifetime of each thread, so these are only applied once per thread.
+# Memory-mapping the content DB avoids a read() syscall per page on the (mostly read-only) topic tree.
+CONTENT_DB_SQLITE_PRAGMAS = [
+    ("mmap_size", 128 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+]
+
+# PRAGMAs applied to each new connection to the main database (see kalite.distributed.sqlite).
+# In WAL mode, readers (e.g. coach reports) don't have to wait for writers (e.g. exercise logs),
+# and with synchronous=NORMAL commits don't wait for the disk, at the risk of losing the last
+# transactions (but not corrupting the database) on power loss.
+DEFAULT_DB_SQLITE_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),  # in KiB
+    ("mmap_size", 64 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+    ("journal_size_limit", 32 * 1024 * 1024),
+]
+
+# How often, in seconds, to copy the WAL file back into the main database from a background thread.
+# 0 leaves checkpointing to SQLite alone.
+DEFAULT_DB_CHECKPOINT_INTERVAL = 60
+
+# Make learner log writes from different threads wait their turn in a queue, rather than
+# polling SQLite until the database is no longer locked.
+DEFAULT_DB_SINGLE_WRITER = False
 
 # Hides content rating
 HIDE_CONTENT_RATING = False
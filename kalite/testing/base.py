@@ -19,6 +19,7 @@ from .browser import setup_browser
 from .client import KALiteClient
 from .mixins.securesync_mixins import CreateDeviceMixin
 from peewee import Using
+from kalite.main.models import user_activity
 from kalite.topic_tools.content_models import set_database, Item
 import random
 
@@ -195,12 +196,16 @@ class KALiteTestCase(CreateDeviceMixin, TestCase):
     """The base class for KA Lite test cases."""
 
     def setUp(self):
+        # Activity buffered by earlier tests belongs to users that no longer exist
+        user_activity.discard()
         self.setUpDatabase()
         content_db_init(self)
         setup_content_db(self)
         super(KALiteTestCase, self).setUp()
 
     def tearDown(self):
+        # Nor should it be written to the real database when the tests exit
+        user_activity.discard()
         teardown_content_db(self)
         super(KALiteTestCase, self).tearDown()
 
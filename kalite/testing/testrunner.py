@@ -3,6 +3,7 @@ Test support harness to make setup.py test work.
 """
 import os
 import shutil
+import tempfile
 
 from django.conf import settings
 logging = settings.LOG
@@ -10,6 +11,7 @@ from django.core.exceptions import ImproperlyConfigured
 from django.db.models import get_app
 from django.core.management import call_command
 from django.test.simple import DjangoTestSuiteRunner, reorder_suite
+from django.test.utils import override_settings
 from django.utils import unittest
 
 from fle_utils.general import ensure_dir
@@ -158,6 +160,18 @@ class KALiteTestRunner(DjangoTestSuiteRunner):
 
         super(KALiteTestRunner, self).__init__(*args, **kwargs)
 
+    def setup_test_environment(self, **kwargs):
+        super(KALiteTestRunner, self).setup_test_environment(**kwargs)
+        # Sessions are kept in their own database, which the test database doesn't replace
+        self._session_dir = tempfile.mkdtemp()
+        self._session_settings = override_settings(SESSION_DATABASE_PATH=os.path.join(self._session_dir, "sessions.sqlite"))
+        self._session_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._session_settings.disable()
+        shutil.rmtree(self._session_dir, ignore_errors=True)
+        super(KALiteTestRunner, self).teardown_test_environment(**kwargs)
+
     def make_bdd_test_suite(self, features_dir, feature_name=None):
         return DjangoBehaveTestCase(features_dir=features_dir, option_info=self.option_info, feature_name=feature_name)
 
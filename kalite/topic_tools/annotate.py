@@ -2,8 +2,9 @@ import os
 
 from django.conf import settings as django_settings
 
-from kalite.i18n.base import get_subtitle_file_path, get_language_name
-from kalite.updates.videos import get_local_video_size
+from kalite.i18n.base import get_language_name
+
+from .manifest import get_content_manifest
 
 
 logging = django_settings.LOG
@@ -15,11 +16,17 @@ def is_content_on_disk(content_id, format="mp4", content_path=None):
     return os.path.isfile(content_file)
 
 
-def create_thumbnail_url(thumbnail):
-    if is_content_on_disk(thumbnail, "png"):
-        return django_settings.CONTENT_URL + thumbnail + ".png"
-    elif is_content_on_disk(thumbnail, "jpg"):
-        return django_settings.CONTENT_URL + thumbnail + ".jpg"
+def create_thumbnail_url(thumbnail, manifest=None):
+    """
+    :param manifest: A ContentManifest to look the thumbnail up in, instead of checking the disk.
+    """
+    for format in ("png", "jpg"):
+        if manifest:
+            on_disk = manifest.has_file(thumbnail + "." + format)
+        else:
+            on_disk = is_content_on_disk(thumbnail, format)
+        if on_disk:
+            return django_settings.CONTENT_URL + thumbnail + "." + format
     return None
 
 
@@ -29,23 +36,8 @@ def update_content_availability(content_list, language="en", channel="khan"):
     # that the content is available in.
 
     # turn this whole function into a generator
-    try:
-        contents_folder = os.listdir(django_settings.CONTENT_ROOT)
-    except OSError:
-        contents_folder = []
-
-    subtitle_langs = {}
-
-    if os.path.exists(get_subtitle_file_path()):
-        for (dirpath, dirnames, filenames) in os.walk(get_subtitle_file_path()):
-            # Only both looking at files that are inside a 'subtitles' directory
-            if os.path.basename(dirpath) == "subtitles":
-                lc = os.path.basename(os.path.dirname(dirpath))
-                for filename in filenames:
-                    if filename in subtitle_langs:
-                        subtitle_langs[filename].append(lc)
-                    else:
-                        subtitle_langs[filename] = [lc]
+    # All file lookups are answered by the manifest, which only re-reads directories that have changed.
+    manifest = get_content_manifest()
 
     subtitle_language_dir = language.replace("-", "_")
 
@@ -67,17 +59,17 @@ def update_content_availability(content_list, language="en", channel="khan"):
             continue
         else:
             file_id = content.get("youtube_id")
-            default_thumbnail = create_thumbnail_url(content.get("id"))
+            default_thumbnail = create_thumbnail_url(content.get("id"), manifest=manifest)
             format = content.get("format", "")
             filename = file_id + "." + format if file_id else None
 
             # Get list of subtitle language codes currently available
-            subtitle_lang_codes = subtitle_langs.get("{id}.vtt".format(id=content.get("id")), [])
+            subtitle_lang_codes = manifest.subtitle_languages("{id}.vtt".format(id=content.get("id")))
 
-            if filename and filename in contents_folder:
+            if filename and manifest.has_file(filename):
                 update["files_complete"] = 1
                 # File for this language is available and downloaded, so let's stamp the file size on it!
-                update["size_on_disk"] = get_local_video_size(content.get("youtube_id"))
+                update["size_on_disk"] = manifest.file_size("%s.mp4" % content.get("youtube_id"))
             else:
                 # The video file for this content item does not exist. Set the files_complete and size_on_disk to 0
                 if content.get("files_complete"):
@@ -87,7 +79,7 @@ def update_content_availability(content_list, language="en", channel="khan"):
                 # Set file_id to None as a flag that this file should not be used in any later processing.
                 file_id = None
 
-            if not file_id and subtitle_language_dir in subtitle_lang_codes and (content.get("id") + "." + format in contents_folder):
+            if not file_id and subtitle_language_dir in subtitle_lang_codes and manifest.has_file(content.get("id") + "." + format):
                 # The file is not available in this language, but it is available in English and can be subtitled
                 file_id = content.get("id")
                 filename = file_id + "." + format
@@ -95,7 +87,7 @@ def update_content_availability(content_list, language="en", channel="khan"):
             if file_id:
                 # We have a valid file_id (i.e. some file that we can use is available locally)
                 update["available"] = True
-                thumbnail = create_thumbnail_url(file_id) or default_thumbnail
+                thumbnail = create_thumbnail_url(file_id, manifest=manifest) or default_thumbnail
                 update["content_urls"] = {
                     "stream": django_settings.CONTENT_URL + filename,
                     "stream_type": "{kind}/{format}".format(kind=content.get("kind").lower(), format=format),
@@ -0,0 +1,122 @@
+"""
+Process-wide registry of open content databases.
+
+Opening a content database means creating a new SQLite connection and applying
+CONTENT_DB_SQLITE_PRAGMAS, which is expensive compared to the queries we run against it.
+Instead of doing this on every call into content_models, we keep one peewee database object
+per (channel, language, path) for the lifetime of the process. peewee keeps one connection
+per thread on that object, so every CherryPy worker thread reuses its own connection.
+
+Before handing out a database, the registry checks that the file on disk is still the one it
+was opened against (see ContentDatabase.is_healthy). When a content pack is replaced, either
+by this process or another one, the stale database is dropped and reopened on the next call.
+"""
+import os
+import threading
+
+from peewee import SqliteDatabase
+
+from django.conf import settings
+logging = settings.LOG
+
+
+def file_signature(path):
+    """
+    Returns a tuple which changes whenever the file at path is replaced or modified,
+    or None if the file doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime
+
+
+class ContentDatabase(object):
+    """
+    A long-lived peewee database for a single content database file, along with
+    the signature of the file it was opened against.
+    """
+
+    def __init__(self, path, pragmas=None):
+        self.path = path
+        self.db = SqliteDatabase(path, pragmas=list(pragmas or []), threadlocals=True)
+        self.signature = file_signature(path)
+
+    def is_healthy(self):
+        """
+        A database is healthy if the file it was opened against is still in place and unchanged.
+        """
+        return self.signature is not None and self.signature == file_signature(self.path)
+
+    def refresh(self):
+        """
+        Record the current state of the file, e.g. after this process has written to it.
+        """
+        self.signature = file_signature(self.path)
+
+    def close(self):
+        """
+        Close the calling thread's connection. Connections held by other threads are closed
+        when the database object is garbage collected.
+        """
+        if not self.db.is_closed():
+            self.db.close()
+
+
+class ContentDatabaseRegistry(object):
+    """
+    Thread-safe mapping from (channel, language, path) to a ContentDatabase.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._databases = {}
+
+    def get(self, channel, language, path):
+        """
+        Return the peewee database for the given content database, opening it if needed.
+        The file is only checked when the calling thread is not already inside a transaction
+        on it, so that nested calls never swap the connection from under an open transaction.
+        """
+        key = (channel, language, path)
+        with self._lock:
+            database = self._databases.get(key)
+            if database and database.db.transaction_depth() == 0 and not database.is_healthy():
+                logging.debug("Content database {path} has changed on disk, reopening.".format(path=path))
+                database.close()
+                database = None
+            if not database:
+                database = ContentDatabase(path, pragmas=settings.CONTENT_DB_SQLITE_PRAGMAS)
+                self._databases[key] = database
+            return database.db
+
+    def release(self, channel, language, path):
+        """
+        Called when a call on the database has finished. Once the calling thread is out of its
+        outermost transaction, records the state of the file so that our own writes don't
+        cause the database to be reopened.
+        """
+        with self._lock:
+            database = self._databases.get((channel, language, path))
+            if database and database.db.transaction_depth() == 0:
+                database.refresh()
+
+    def invalidate(self, channel=None, language=None, path=None):
+        """
+        Drop all databases matching the given channel, language and/or path, so that they are
+        reopened on next use. With no arguments, drops every database.
+        """
+        with self._lock:
+            for key in self._databases.keys():
+                key_channel, key_language, key_path = key
+                if channel and channel != key_channel:
+                    continue
+                if language and language != key_language:
+                    continue
+                if path and os.path.abspath(path) != os.path.abspath(key_path):
+                    continue
+                self._databases.pop(key).close()
+
+
+content_databases = ContentDatabaseRegistry()
@@ -13,22 +13,45 @@ All functions return the model data as a dictionary, in order to prevent externa
 implementation details about the model class used in this module.
 """
 import json
+import os
+import re
+import threading
+import time
+import weakref
 
 import itertools
 
-from peewee import Model, SqliteDatabase, CharField, TextField, BooleanField, ForeignKeyField, PrimaryKeyField, Using,\
+from peewee import Model, CharField, TextField, BooleanField, ForeignKeyField, PrimaryKeyField, \
     DoesNotExist, fn, IntegerField, OperationalError, FloatField
 
+from playhouse.migrate import SqliteMigrator, migrate
 from playhouse.shortcuts import model_to_dict
 
 from .base import available_content_databases
-from .settings import CONTENT_DATABASE_PATH, CHANNEL
+from .connections import content_databases
+from .settings import CONTENT_DATABASE_PATH, CHANNEL, RELATED_SUBTOPICS_LIMIT
 from .annotate import update_content_availability
 
 from django.conf import settings
 logging = settings.LOG
 
 
+class JSONField(TextField):
+    """
+    Stores a JSON serializable value, which is decoded when read.
+    """
+
+    def db_value(self, value):
+        return None if value is None else json.dumps(value)
+
+    def python_value(self, value):
+        return json.loads(value) if value else None
+
+
+# Fields that used to be kept in extra_fields, and now have a column of their own
+PROMOTED_FIELDS = ("prerequisites", "format", "content_urls", "subtitle_urls", "tags", "duration")
+
+
 # This Item is defined without a database.
 # This allows us to use a separate database for each language, so that we
 # can reduce performance cost, and keep queries simple for multiple languages.
@@ -39,7 +62,7 @@ class Item(Model):
     available = BooleanField()
     files_complete = IntegerField(default=0)
     total_files = IntegerField(default=0)
-    kind = CharField()
+    kind = CharField(index=True)
     parent = ForeignKeyField("self", default=None, null=True, index=True, related_name="children")
     id = CharField(index=True)
     pk = PrimaryKeyField(primary_key=True)
@@ -50,6 +73,13 @@ class Item(Model):
     size_on_disk = IntegerField(default=0)
     remote_size = IntegerField(default=0)
     sort_order = FloatField(default=0)
+    # See PROMOTED_FIELDS
+    prerequisites = JSONField(null=True)
+    format = CharField(null=True)
+    content_urls = JSONField(null=True)
+    subtitle_urls = JSONField(null=True)
+    tags = JSONField(null=True)
+    duration = IntegerField(null=True)
 
     class Meta:
         # Order by sort_order by default for all queries.
@@ -69,11 +99,57 @@ class AssessmentItem(Model):
     author_names = CharField(max_length=200)  # A serialized JSON list
 
 
+class ItemAncestor(Model):
+    """
+    Closure table over the topic tree, with one row for every (ancestor, descendant) pair,
+    including a row with depth 0 linking every indexed node to itself.
+    Ancestry is derived from the materialized `path` of each node, so that lookups on this table
+    return the same nodes as the `Item.path.contains(...)` scans they replace, but through indexes.
+    Built by build_topic_tree_index; nodes added since the last build have no rows here, in which
+    case queries fall back to scanning paths.
+    """
+    ancestor = ForeignKeyField(Item, related_name="descendant_links")
+    descendant = ForeignKeyField(Item, related_name="ancestor_links")
+    depth = IntegerField()
+
+    class Meta:
+        indexes = (
+            (("ancestor", "depth"), False),
+        )
+
+
+class RelatedSubtopic(Model):
+    """
+    Precomputed recommendation graph over subtopics (the children of the top level topics), with
+    one row for every subtopic and each of its related subtopics, ranked from most to least related.
+    Built by build_recommendation_graph; see rank_related_subtopics for how subtopics are ranked.
+    """
+    subtopic = CharField()
+    related = CharField()
+    distance = IntegerField()
+    rank = IntegerField()
+
+    class Meta:
+        indexes = (
+            (("subtopic", "rank"), False),
+        )
+
+
 def parse_model_data(item):
+    if not item:
+        return item
+
     extra_fields = item.get("extra_fields", {})
 
     if type(extra_fields) is not dict:
-        extra_fields = json.loads(extra_fields)
+        extra_fields = json.loads(extra_fields or "{}")
+    else:
+        extra_fields = dict(extra_fields)
+
+    # Fields with a column of their own are stored there, even if passed in extra_fields
+    for key in PROMOTED_FIELDS:
+        if key in extra_fields:
+            item.setdefault(key, extra_fields.pop(key))
 
     remove_keys = []
     for key, value in item.iteritems():
@@ -90,50 +166,131 @@ def parse_model_data(item):
 
 def unparse_model_data(item):
 
-    extra_fields = json.loads(item.get("extra_fields", "{}"))
+    # Most items have nothing left in extra_fields, so don't bother decoding it
+    extra_fields = item.get("extra_fields")
+    extra_fields = json.loads(extra_fields) if extra_fields and extra_fields != "{}" else {}
 
     # Do this to ensure any model fields that have accidentally
     # been folded into extra fields are not overwritten on output
     extra_fields.update(item)
-    return extra_fields
+    return _drop_unset_fields(extra_fields)
+
+
+def _drop_unset_fields(item):
+    """
+    Remove promoted fields without a value, as they would have been missing from extra_fields.
+    """
+    for key in PROMOTED_FIELDS:
+        if key in item and item[key] is None:
+            del item[key]
+    return item
+
+
+_upgraded_databases = weakref.WeakSet()
+_upgrade_lock = threading.Lock()
+
+
+def upgrade_content_database(db):
+    """
+    Bring a content database created by an older version up to date, by adding the columns for
+    PROMOTED_FIELDS and moving their values out of extra_fields, and adding missing indexes.
+    Does nothing if the database is already up to date.
+    """
+    columns = set(row[1] for row in db.execute_sql("PRAGMA table_info(item)").fetchall())
+    if not columns:
+        # No content in this database yet
+        return
+
+    missing = [key for key in PROMOTED_FIELDS if key not in columns]
+    indexes = set(row[1] for row in db.execute_sql("PRAGMA index_list(item)").fetchall())
+    migrator = SqliteMigrator(db)
+    operations = [migrator.add_column("item", key, Item._meta.fields[key]) for key in missing]
+    if "item_kind" not in indexes:
+        operations.append(migrator.add_index("item", ("kind",), False))
+    if not operations:
+        return
+
+    logging.info("Upgrading content database {path}".format(path=db.database))
+    with db.atomic():
+        migrate(*operations)
+        if missing:
+            rows = db.execute_sql("SELECT pk, extra_fields FROM item WHERE extra_fields IS NOT NULL AND extra_fields NOT IN ('', '{}')")
+            updates = []
+            for pk, extra_fields in rows.fetchall():
+                extra_fields = json.loads(extra_fields)
+                values = [extra_fields.pop(key, None) for key in PROMOTED_FIELDS]
+                if any(value is not None for value in values):
+                    updates.append([Item._meta.fields[key].db_value(value) for key, value in zip(PROMOTED_FIELDS, values)] +
+                                   [json.dumps(extra_fields), pk])
+            db.get_cursor().executemany(
+                "UPDATE item SET {columns}, extra_fields = ? WHERE pk = ?".format(
+                    columns=", ".join("{key} = ?".format(key=key) for key in PROMOTED_FIELDS)),
+                updates
+            )
+
+
+def _upgrade_content_database_once(db):
+    """
+    Upgrade each database object handed out by the registry the first time it is used.
+    The registry hands out a new object whenever the file changes, e.g. when a content pack is installed.
+    """
+    with _upgrade_lock:
+        if db in _upgraded_databases:
+            return
+        _upgraded_databases.add(db)
+        if not os.path.exists(db.database):
+            return
+        try:
+            upgrade_content_database(db)
+        except OperationalError as e:
+            logging.error("Could not upgrade content database {path}: {error}".format(path=db.database, error=e))
 
 
 def set_database(function):
     """
     Sets the appropriate database for the ensuing model interactions.
+    Databases are long-lived and shared by all calls in the process, see connections.py.
     """
 
     def wrapper(*args, **kwargs):
         language = kwargs.get("language", "en")
+        channel = kwargs.get("channel", CHANNEL)
 
         path = kwargs.pop("database_path", None)
         if not path:
             path = CONTENT_DATABASE_PATH.format(
-                channel=kwargs.get("channel", CHANNEL),
+                channel=channel,
                 language=language
             )
 
-        db = SqliteDatabase(path, pragmas=settings.CONTENT_DB_SQLITE_PRAGMAS)
+        db = content_databases.get(channel, language, path)
+        _upgrade_content_database_once(db)
 
         kwargs["db"] = db
 
-        db.connect()
-
         # This should contain all models in the database to make them available to the wrapped function
+        models = [Item, AssessmentItem, ItemAncestor, RelatedSubtopic]
+        original_databases = [model._meta.database for model in models]
+        for model in models:
+            model._meta.database = db
 
-        with Using(db, [Item, AssessmentItem]):
-
-            try:
+        try:
 
+            with db.atomic():
                 output = function(*args, **kwargs)
 
-            except DoesNotExist:
-                output = None
+        except DoesNotExist:
+            output = None
 
-            except OperationalError:
-                logging.error("No content database file found")
-                raise
-        db.close()
+        except OperationalError:
+            logging.error("No content database file found")
+            content_databases.invalidate(path=path)
+            raise
+
+        finally:
+            for model, original_database in zip(models, original_databases):
+                model._meta.database = original_database
+            content_databases.release(channel, language, path)
 
         return output
     return wrapper
@@ -165,6 +322,40 @@ def parse_data(function):
     return wrapper
 
 
+def ancestor_paths(path):
+    """
+    Returns the paths of all possible ancestors of the node at path, from the root down.
+    e.g. "khan/math/arithmetic/" -> ["khan/", "khan/math/"]
+    """
+    segments = path.strip("/").split("/")
+    return ["/".join(segments[:idx]) + "/" for idx in range(1, len(segments))]
+
+
+def _is_indexed(node):
+    """
+    Whether the node has been included in the topic tree index (see ItemAncestor).
+    Also returns False when the content database has no index at all.
+    """
+    try:
+        return ItemAncestor.select().where((ItemAncestor.ancestor == node.pk) & (ItemAncestor.depth == 0)).exists()
+    except OperationalError:
+        return False
+
+
+def _descendants(node, *fields):
+    """
+    Returns a query for all descendants of node, using the topic tree index where possible.
+    :param node: An Item instance.
+    :param fields: The fields to select, defaults to all fields of Item.
+    """
+    fields = fields or (Item,)
+    if _is_indexed(node):
+        return Item.select(*fields).join(
+            ItemAncestor, on=(ItemAncestor.descendant == Item.pk)
+        ).where((ItemAncestor.ancestor == node.pk) & (ItemAncestor.depth > 0))
+    return Item.select(*fields).where(Item.path.contains(node.path) & (Item.pk != node.pk))
+
+
 @parse_data
 @set_database
 def get_random_content(kinds=None, limit=1, available=None, **kwargs):
@@ -198,7 +389,7 @@ def get_content_item(content_id=None, topic=False, **kwargs):
             value = Item.get(Item.id == content_id, Item.kind == "Topic")
         else:
             value = Item.get(Item.id == content_id, Item.kind != "Topic")
-        return model_to_dict(value)
+        return _drop_unset_fields(model_to_dict(value))
 
 
 @parse_data
@@ -344,6 +535,76 @@ def get_topic_nodes_with_children(parent=None, **kwargs):
         return topics
 
 
+@set_database
+def get_subtopic_exercises(**kwargs):
+    """
+    Convenience function for returning every exercise along with the subtopic and topic it falls under,
+    where topics are the children of the root and subtopics are their children.
+    Used to build the lookup tables for content recommendation in one pass over the exercises.
+    :return: A list of (exercise id, subtopic id, topic id) tuples, in topic tree order.
+    """
+    Topic = Item.alias()
+    Root = Item.alias()
+    subtopics = dict((path, (subtopic_id, topic_id)) for path, subtopic_id, topic_id in Item.select(
+        Item.path, Item.id, Topic.id
+    ).join(
+        Topic, on=(Item.parent == Topic.pk)
+    ).join(
+        Root, on=(Topic.parent == Root.pk)
+    ).where(Root.parent.is_null()).tuples())
+
+    output = []
+    for exercise_id, path in Item.select(Item.id, Item.path).where(Item.kind == "Exercise").tuples():
+        for ancestor_path in ancestor_paths(path):
+            if ancestor_path in subtopics:
+                output.append((exercise_id,) + subtopics[ancestor_path])
+                break
+    return output
+
+
+@set_database
+def get_exercise_prerequisites(**kwargs):
+    """
+    Convenience function for returning the prerequisites of every exercise that has any,
+    without reading any other fields.
+    Used to build the lookup tables for content recommendation.
+    :return: A dictionary of exercise ids to lists of prerequisite exercise ids.
+    """
+    output = {}
+    for exercise_id, prerequisites in Item.select(Item.id, Item.prerequisites).where(
+            (Item.kind == "Exercise") & (Item.prerequisites.is_null(False))).tuples():
+        if prerequisites:
+            output[exercise_id] = prerequisites
+    return output
+
+
+@set_database
+def get_playlist_entries(**kwargs):
+    """
+    Convenience function for returning every video and exercise along with each playlist it falls under,
+    where playlists are the topics that videos and exercises are the direct children of.
+    Used to compute progress on all playlists without querying the contents of each one.
+    :return: A list of (playlist id, content id, kind, whether the playlist is the content's parent) tuples.
+    """
+    topic_parents = {}
+    topic_ids = {}
+    for pk, parent, topic_id in Item.select(Item.pk, Item.parent, Item.id).where(Item.kind == "Topic").tuples():
+        topic_parents[pk] = parent
+        topic_ids[pk] = topic_id
+    leaves = list(Item.select(Item.id, Item.kind, Item.parent).where(Item.kind.in_(["Video", "Exercise"])).tuples())
+
+    playlists = set(parent for _, _, parent in leaves if parent in topic_ids)
+
+    output = []
+    for content_id, kind, parent in leaves:
+        ancestor = parent
+        while ancestor is not None:
+            if ancestor in playlists:
+                output.append((topic_ids[ancestor], content_id, kind, ancestor == parent))
+            ancestor = topic_parents.get(ancestor)
+    return output
+
+
 @parse_data
 @set_database
 def get_content_parents(ids=None, **kwargs):
@@ -394,7 +655,62 @@ def get_topic_contents(kinds=None, topic_id=None, **kwargs):
 
         if not kinds:
             kinds = ["Video", "Audio", "Exercise", "Document"]
-        return Item.select(Item).where(Item.kind.in_(kinds), Item.path.contains(topic_node.path))
+        return _descendants(topic_node).where(Item.kind.in_(kinds))
+
+
+@parse_data
+@set_database
+def get_ancestors(path=None, **kwargs):
+    """
+    Convenience function for returning all ancestors of a node, from the root down.
+    :param path: The unique path of the node.
+    :return: A list of content dictionaries.
+    """
+    if path:
+        try:
+            node = Item.select(Item.pk, Item.path).where(Item.path == path).get()
+        except DoesNotExist:
+            node = None
+        if node and _is_indexed(node):
+            return Item.select(Item).join(
+                ItemAncestor, on=(ItemAncestor.ancestor == Item.pk)
+            ).where((ItemAncestor.descendant == node.pk) & (ItemAncestor.depth > 0)).order_by(ItemAncestor.depth.desc())
+        # The path column is uniquely indexed, so this is still an indexed lookup.
+        return Item.select(Item).where(Item.path.in_(ancestor_paths(path))).order_by(fn.Length(Item.path))
+    else:
+        return list()
+
+
+@set_database
+def get_leaf_counts(topic_ids=None, kinds=None, **kwargs):
+    """
+    Convenience function for counting the content/leaf nodes contained within a set of topics.
+    :param topic_ids: A list of topic ids.
+    :param kinds: A list of content kinds to count.
+    :return: A dictionary mapping each topic id to the number of leaves under it.
+    """
+    if topic_ids:
+        if not kinds:
+            kinds = ["Video", "Audio", "Exercise", "Document"]
+        counts = {}
+        Topic = Item.alias()
+        topic_nodes = Item.select(Item.pk, Item.id, Item.path).where(Item.id.in_(topic_ids) & (Item.kind == "Topic"))
+        for topic_node in topic_nodes:
+            if _is_indexed(topic_node):
+                continue
+            counts[topic_node.id] = counts.get(topic_node.id, 0) + _descendants(topic_node).where(Item.kind.in_(kinds)).count()
+        indexed = Item.select(Topic.id, fn.Count(Item.pk)).join(
+            ItemAncestor, on=(ItemAncestor.descendant == Item.pk)
+        ).join(Topic, on=(ItemAncestor.ancestor == Topic.pk)).where(
+            Topic.id.in_(topic_ids) & (Topic.kind == "Topic") & (ItemAncestor.depth > 0) & Item.kind.in_(kinds)
+        ).group_by(Topic.pk).order_by()
+        try:
+            for topic_id, count in indexed.tuples():
+                counts[topic_id] = counts.get(topic_id, 0) + count
+        except OperationalError:
+            # No index in this content database; every topic was counted above.
+            pass
+        return counts
 
 
 @set_database
@@ -410,14 +726,24 @@ def get_download_youtube_ids(paths=None, downloaded=False, **kwargs):
     if paths:
         youtube_ids = dict()
         for path in paths:
-            selector = (Item.kind != "Topic") & (Item.path.contains(path)) & (Item.youtube_id.is_null(False))
+            selector = (Item.kind != "Topic") & (Item.youtube_id.is_null(False))
 
             if downloaded:
                 selector &= Item.files_complete > 0
             else:
                 selector &= Item.files_complete == 0
 
-            youtube_ids.update(dict([item for item in Item.select(Item.youtube_id, Item.title).where(selector).tuples() if item[0]]))
+            try:
+                node = Item.select(Item.pk, Item.path).where(Item.path == path).get()
+                queries = [
+                    Item.select(Item.youtube_id, Item.title).where((Item.pk == node.pk) & selector),
+                    _descendants(node, Item.youtube_id, Item.title).where(selector),
+                ]
+            except DoesNotExist:
+                queries = [Item.select(Item.youtube_id, Item.title).where((Item.path.contains(path)) & selector)]
+
+            for query in queries:
+                youtube_ids.update(dict([item for item in query.tuples() if item[0]]))
 
         return youtube_ids
 
@@ -450,10 +776,98 @@ def _get_video_from_youtube_id(youtube_id=None, **kwargs):
         return model_to_dict(value)
 
 
+# Full-text search index over the content database, tried in order of preference.
+# The rowid of each row in the index is the pk of the Item it was built from.
+SEARCH_INDEX_DEFINITIONS = (
+    "CREATE VIRTUAL TABLE itemsearch USING fts5(title, description, keywords, prefix='2 3')",
+    "CREATE VIRTUAL TABLE itemsearch USING fts4(title, description, keywords, prefix='2,3', tokenize=unicode61)",
+    "CREATE VIRTUAL TABLE itemsearch USING fts4(title, description, keywords, prefix='2,3')",
+)
+
+# Keys of extra_fields which are included in the search index
+SEARCH_INDEX_EXTRA_FIELDS = ("keywords", "tags")
+
+
+def _search_keywords(extra_fields, tags=None):
+    """
+    Flatten the searchable extra fields of a node into a single string for indexing.
+    """
+    try:
+        extra_fields = json.loads(extra_fields or "{}")
+    except ValueError:
+        extra_fields = {}
+    if tags:
+        extra_fields["tags"] = tags
+    keywords = []
+    for key in SEARCH_INDEX_EXTRA_FIELDS:
+        value = extra_fields.get(key)
+        if isinstance(value, (list, tuple)):
+            keywords.extend(unicode(v) for v in value)
+        elif value:
+            keywords.append(unicode(value))
+    return " ".join(keywords)
+
+
+def _search_index(db):
+    """
+    Returns the flavour of the search index ("fts5" or "fts4") if the database has one and it covers
+    every node in the database, None otherwise.
+    """
+    try:
+        definition = db.execute_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'itemsearch'").fetchone()
+        if not definition:
+            return None
+        # Nodes added since the index was built would be missing from search results.
+        if db.execute_sql("SELECT max(rowid) FROM itemsearch").fetchone()[0] != Item.select(fn.Max(Item.pk)).scalar():
+            return None
+    except OperationalError:
+        # e.g. the index was built by an SQLite with a full-text search module that we don't have.
+        return None
+    return "fts5" if "fts5" in definition[0].lower() else "fts4"
+
+
+def _search_match_expression(query):
+    """
+    Turn a free-text query into an FTS MATCH expression that requires every word in the query,
+    matching words by prefix so that results can be shown as the user types.
+    Words are quoted so that FTS syntax in the query is ignored.
+    """
+    words = re.findall(r"\w+", query, re.UNICODE)
+    return " ".join('"{word}"*'.format(word=word) for word in words)
+
+
+@set_database
+def build_search_index(**kwargs):
+    """
+    (Re)build the full-text search index used by search_topic_nodes.
+    Should be run whenever content is loaded, e.g. when a content pack is installed.
+    """
+    db = kwargs.get("db")
+    if db:
+        db.execute_sql("DROP TABLE IF EXISTS itemsearch")
+        for definition in SEARCH_INDEX_DEFINITIONS:
+            try:
+                db.execute_sql(definition)
+                break
+            except OperationalError:
+                continue
+        else:
+            logging.warn("SQLite full-text search is not available, searches will scan the content database.")
+            return
+
+        rows = Item.select(Item.pk, Item.title, Item.description, Item.extra_fields, Item.tags).order_by().tuples()
+        db.get_cursor().executemany(
+            "INSERT INTO itemsearch (rowid, title, description, keywords) VALUES (?, ?, ?, ?)",
+            ((pk, title, description, _search_keywords(extra_fields, tags)) for pk, title, description, extra_fields, tags in rows)
+        )
+
+
 @set_database
 def search_topic_nodes(kinds=None, query=None, page=1, items_per_page=10, exact=True, **kwargs):
     """
     Search all nodes and return limited fields.
+    Uses the full-text search index where available (see build_search_index), returning results ranked by
+    relevance and matching words by prefix. Otherwise falls back to substring matches on titles and extra fields.
     :param kinds: A list of content kinds.
     :param query: Text string to search for in titles or extra fields.
     :param page: Which page of the paginated search to return.
@@ -464,24 +878,9 @@ def search_topic_nodes(kinds=None, query=None, page=1, items_per_page=10, exact=
     if query:
         if not kinds:
             kinds = ["Video", "Audio", "Exercise", "Document", "Topic"]
-        try:
-            topic_node = Item.select(
-                Item.title,
-                Item.description,
-                Item.available,
-                Item.kind,
-                Item.id,
-                Item.path,
-                Item.slug,
-            ).where((fn.Lower(Item.title) == query) & (Item.kind.in_(kinds))).get()
-            if exact:
-                # If allowing an exact match, just return that one match and we're done!
-                return [model_to_dict(topic_node)], True, None
-        except DoesNotExist:
-            topic_node = {}
-            pass
-        # For efficiency, don't do substring matches when we've got lots of results
-        topic_nodes = Item.select(
+        db = kwargs.get("db")
+        search_index = _search_index(db) if db else None
+        fields = (
             Item.title,
             Item.description,
             Item.available,
@@ -489,9 +888,52 @@ def search_topic_nodes(kinds=None, query=None, page=1, items_per_page=10, exact=
             Item.id,
             Item.path,
             Item.slug,
-        ).where((Item.kind.in_(kinds)) & ((fn.Lower(Item.title).contains(query)) | (fn.Lower(Item.extra_fields).contains(query))))
-        pages = topic_nodes.count() / items_per_page
-        topic_nodes = [item for item in topic_nodes.paginate(page, items_per_page).dicts()]
+        )
+        try:
+            selector = (fn.Lower(Item.title) == query) & (Item.kind.in_(kinds))
+            words = re.findall(r"\w+", query, re.UNICODE)
+            if search_index and words:
+                # Narrow the exact match down through the index, rather than lowercasing every title.
+                matches = db.execute_sql(
+                    "SELECT rowid FROM itemsearch WHERE itemsearch MATCH ?",
+                    ('title:"{phrase}"'.format(phrase=" ".join(words)),)
+                )
+                selector &= Item.pk.in_([row[0] for row in matches])
+            topic_node = Item.select(*fields).where(selector).get()
+            if exact:
+                # If allowing an exact match, just return that one match and we're done!
+                return [model_to_dict(topic_node)], True, None
+        except DoesNotExist:
+            topic_node = {}
+            pass
+        if search_index:
+            match_expression = _search_match_expression(query)
+            if not match_expression:
+                topic_nodes, count = [], 0
+            else:
+                from_clause = (
+                    "FROM itemsearch JOIN item ON item.pk = itemsearch.rowid "
+                    "WHERE itemsearch MATCH ? AND item.kind IN ({kinds}) "
+                ).format(kinds=", ".join("?" * len(kinds)))
+                # bm25 ranks better matches lower; weight title matches above keywords, above descriptions.
+                order = "bm25(itemsearch, 10.0, 1.0, 5.0)" if search_index == "fts5" else "item.sort_order"
+                params = [match_expression] + list(kinds)
+                count = db.execute_sql("SELECT count(*) " + from_clause, params).fetchone()[0]
+                pks = [row[0] for row in db.execute_sql(
+                    "SELECT item.pk " + from_clause + "ORDER BY {order} LIMIT ? OFFSET ?".format(order=order),
+                    params + [items_per_page, max(page - 1, 0) * items_per_page]
+                )]
+                ranks = dict((pk, rank) for rank, pk in enumerate(pks))
+                topic_nodes = sorted(
+                    Item.select(Item.pk, *fields).where(Item.pk.in_(pks)).dicts(),
+                    key=lambda item: ranks[item.pop("pk")]
+                )
+            pages = count / items_per_page
+        else:
+            # For efficiency, don't do substring matches when we've got lots of results
+            topic_nodes = Item.select(*fields).where((Item.kind.in_(kinds)) & ((fn.Lower(Item.title).contains(query)) | (fn.Lower(Item.extra_fields).contains(query)) | (fn.Lower(Item.tags).contains(query))))
+            pages = topic_nodes.count() / items_per_page
+            topic_nodes = [item for item in topic_nodes.paginate(page, items_per_page).dicts()]
         if topic_node:
             # If we got an exact match, show it first.
             topic_nodes.insert(0, model_to_dict(topic_node))
@@ -554,8 +996,15 @@ def delete_instances(ids, **kwargs):
     :return: None
     """
     if ids:
+        pks = []
         for item in Item.select().where(Item.id.in_(ids)):
+            pks.append(item.pk)
             item.delete_instance()
+        try:
+            ItemAncestor.delete().where(ItemAncestor.descendant.in_(pks) | ItemAncestor.ancestor.in_(pks)).execute()
+        except OperationalError:
+            # This content database has no topic tree index.
+            pass
 
 
 @set_database
@@ -646,6 +1095,142 @@ def create_table(**kwargs):
         db.create_tables([Item, AssessmentItem])
 
 
+@set_database
+def build_topic_tree_index(**kwargs):
+    """
+    (Re)build the topic tree index (see ItemAncestor) from the paths of all nodes in the database.
+    Should be run whenever the shape of the topic tree changes, e.g. when a content pack is installed.
+    """
+    db = kwargs.get("db")
+    if db:
+        db.drop_tables([ItemAncestor], safe=True)
+        db.create_tables([ItemAncestor])
+
+        pks_by_path = dict(Item.select(Item.path, Item.pk).order_by().tuples())
+        rows = []
+        for path, pk in pks_by_path.iteritems():
+            rows.append({"ancestor": pk, "descendant": pk, "depth": 0})
+            ancestors = ancestor_paths(path)
+            for depth, ancestor_path in enumerate(reversed(ancestors), 1):
+                ancestor_pk = pks_by_path.get(ancestor_path)
+                if ancestor_pk:
+                    rows.append({"ancestor": ancestor_pk, "descendant": pk, "depth": depth})
+
+        # Limit to 300 rows at a time, to stay below SQLite's limit on the number of bound variables.
+        for idx in range(0, len(rows), 300):
+            ItemAncestor.insert_many(rows[idx:idx + 300]).execute()
+
+        logging.info("Indexed {nodes} nodes in the topic tree.".format(nodes=len(pks_by_path)))
+
+
+# Distances between subtopics in the recommendation graph. Subtopics of the same topic are siblings,
+# subtopics of different topics are only connected through the root: subtopic, topic, root, topic, subtopic.
+SIBLING_DISTANCE = 1
+COUSIN_DISTANCE = 4
+
+
+def rank_related_subtopics(topics, limit=None):
+    """
+    Ranks the subtopics of each topic by how closely they are related to every other subtopic.
+    Subtopics are ranked by their distance in the topic tree, and then by how close they are to each other
+    in the order of the tree, the one before coming first.
+    :param topics: A list of lists of subtopic ids, one for each topic, in topic tree order.
+    :param limit: The maximum number of related subtopics to return per subtopic, including itself.
+    :return: A dictionary of subtopic ids to lists of (related subtopic id, distance), starting with itself.
+    """
+    sequence = [subtopic for subtopics in topics for subtopic in subtopics]
+    # Index of the first subtopic of each topic in sequence, followed by the length of sequence
+    starts = [0]
+    for subtopics in topics:
+        starts.append(starts[-1] + len(subtopics))
+
+    def outward(idx):
+        # Indices in sequence by increasing distance from idx, the one before coming first
+        for offset in range(1, len(sequence)):
+            for other_idx in (idx - offset, idx + offset):
+                if 0 <= other_idx < len(sequence):
+                    yield other_idx
+
+    graph = {}
+    for topic_idx in range(len(topics)):
+        start, end = starts[topic_idx], starts[topic_idx + 1]
+        for idx in range(start, end):
+            subtopic = sequence[idx]
+            if subtopic in graph:
+                continue
+            siblings = ((sequence[other_idx], SIBLING_DISTANCE) for other_idx in outward(idx) if start <= other_idx < end)
+            cousins = ((sequence[other_idx], COUSIN_DISTANCE) for other_idx in outward(idx) if not start <= other_idx < end)
+            related = []
+            seen = set()
+            for other, distance in itertools.chain([(subtopic, 0)], siblings, cousins):
+                if limit and len(related) >= limit:
+                    break
+                if other not in seen:
+                    seen.add(other)
+                    related.append((other, distance))
+            graph[subtopic] = related
+    return graph
+
+
+@set_database
+def build_recommendation_graph(limit=RELATED_SUBTOPICS_LIMIT, **kwargs):
+    """
+    (Re)build the recommendation graph (see RelatedSubtopic) from the topic tree, and store it in the database.
+    If the database can't be written to, the graph is still returned.
+    :param limit: The maximum number of related subtopics to keep per subtopic, including itself.
+    :return: A dictionary of subtopic ids to lists of (related subtopic id, distance), as for rank_related_subtopics.
+    """
+    db = kwargs.get("db")
+    if db:
+        Topic = Item.alias()
+        Root = Item.alias()
+        subtopics = Item.select(Item.id, Topic.pk).join(
+            Topic, on=(Item.parent == Topic.pk)
+        ).join(
+            Root, on=(Topic.parent == Root.pk)
+        ).where(Root.parent.is_null()).order_by(Topic.sort_order, Topic.pk, Item.sort_order, Item.pk).tuples()
+
+        topics = [[subtopic for subtopic, _ in group] for _, group in itertools.groupby(subtopics, lambda row: row[1])]
+        graph = rank_related_subtopics(topics, limit=limit)
+
+        rows = []
+        for subtopic, related in graph.iteritems():
+            for rank, (related_subtopic, distance) in enumerate(related):
+                rows.append({"subtopic": subtopic, "related": related_subtopic, "distance": distance, "rank": rank})
+
+        try:
+            with db.atomic():
+                db.drop_tables([RelatedSubtopic], safe=True)
+                db.create_tables([RelatedSubtopic])
+                # Limit to 200 rows at a time, to stay below SQLite's limit on the number of bound variables.
+                for chunk in _chunks(rows, 200):
+                    RelatedSubtopic.insert_many(chunk).execute()
+        except OperationalError as e:
+            logging.warn("Could not store the recommendation graph: {error}".format(error=e))
+        else:
+            logging.info("Stored the recommendation graph for {subtopics} subtopics.".format(subtopics=len(graph)))
+
+        return graph
+
+
+@set_database
+def get_recommendation_graph(**kwargs):
+    """
+    Read the recommendation graph stored by build_recommendation_graph.
+    :return: A dictionary of subtopic ids to lists of (related subtopic id, distance), or None if it hasn't been built.
+    """
+    graph = {}
+    try:
+        rows = RelatedSubtopic.select(
+            RelatedSubtopic.subtopic, RelatedSubtopic.related, RelatedSubtopic.distance
+        ).order_by(RelatedSubtopic.subtopic, RelatedSubtopic.rank).tuples()
+        for subtopic, related, distance in rows:
+            graph.setdefault(subtopic, []).append((related, distance))
+    except OperationalError:
+        return None
+    return graph or None
+
+
 def annotate_content_models_by_youtube_id(channel="khan", language="en", youtube_ids=None):
     """
     Annotate content models that have the youtube ids specified in a list.
@@ -656,80 +1241,135 @@ def annotate_content_models_by_youtube_id(channel="khan", language="en", youtube
     annotate_content_models(channel=channel, language=language, ids=youtube_ids, iterator_content_items=iterator_content_items_by_youtube_id)
 
 
+def _chunks(values, size=500):
+    """
+    Split values into lists of at most size elements, e.g. to stay below SQLite's limit on bound variables.
+    """
+    values = list(values)
+    for idx in range(0, len(values), size):
+        yield values[idx:idx + size]
+
+
+def _bulk_update_items(db, updates):
+    """
+    Apply many updates to the item table at once, with one executemany per distinct set of updated columns.
+    :param updates: An iterable of (pk, dictionary of field names to new values) tuples.
+    """
+    grouped = {}
+    for pk, values in updates:
+        fields = tuple(sorted(values))
+        grouped.setdefault(fields, []).append([Item._meta.fields[field].db_value(values[field]) for field in fields] + [pk])
+
+    cursor = db.get_cursor()
+    for fields, rows in grouped.iteritems():
+        sql = 'UPDATE "item" SET {columns} WHERE "pk" = ?'.format(
+            columns=", ".join('"{column}" = ?'.format(column=Item._meta.fields[field].db_column) for field in fields)
+        )
+        cursor.executemany(sql, rows)
+
+
+# Fields of topic nodes which are aggregated from their children by annotate_content_models
+AGGREGATED_FIELDS = ("available", "files_complete", "remote_size", "size_on_disk")
+
+
+def _aggregate_children(children):
+    """
+    Compute the annotation of a topic from the (already annotated) dictionaries of its children.
+    """
+    total_files = sum(child["total_files"] for child in children)
+    return {
+        "available": any(child["available"] for child in children),
+        # ensure files_complete doesn't go above total_files; can be removed after fix is in for:
+        # https://github.com/fle-internal/content-pack-maker/issues/38
+        "files_complete": min(total_files, sum(child["files_complete"] for child in children)),
+        # Topics count everything left to download beneath them, content only counts if it isn't available yet.
+        "remote_size": sum(child["remote_size"] for child in children if child["kind"] == "Topic" or not child["available"]),
+        "size_on_disk": sum(child["size_on_disk"] for child in children),
+    }
+
+
 @set_database
 def annotate_content_models(channel="khan", language="en", ids=None, iterator_content_items=iterator_content_items, **kwargs):
     """
     Annotate content models that have the ids specified in a list.
     Our ids can be duplicated at the moment, so this may be several content items per id.
     When a content item has been updated, propagate availability up the topic tree.
+
+    Leaf updates are applied in batches, then every ancestor of an updated leaf is recomputed once,
+    deepest first, so that each topic is aggregated from its already updated children.
     :param channel: Channel to update.
     :param language: Language of channel to update.
     :param ids: List of content ids to find content models for annotation.
     :param iterator_content_items: Generator function to use to yield paths and updates.
+    :return: Dictionary with the number of updated leaves and topics, and the time spent on each stage.
     """
 
     db = kwargs.get("db")
 
     if db:
 
-        content_models = iterator_content_items(ids=ids, channel=channel, language=language)
+        stats = {}
 
-        with db.atomic() as transaction:
+        start = time.time()
+        updates = dict((path, update) for path, update in iterator_content_items(ids=ids, channel=channel, language=language) if update)
+        stats["scan_time"] = time.time() - start
 
-            def update_parent_annotation(parent):
-
-                children = list(Item.select(Item.available, Item.total_files, Item.files_complete, Item.remote_size, Item.size_on_disk).where(Item.parent == parent.pk))
-
-                available = any(child.available for child in children)
-                total_files = sum(child.total_files for child in children)
-                files_complete = sum(child.files_complete for child in children)
-                child_remote = sum(child.remote_size for child in children if (not child.available and child.kind != "Topic") or (child.kind == "Topic"))
-                child_on_disk = sum(child.size_on_disk for child in children)
-
-                # ensure files_complete doesn't go above total_files; can be removed after fix is in for:
-                # https://github.com/fle-internal/content-pack-maker/issues/38
-                files_complete = min(total_files, files_complete)
-
-                if parent.available != available:
-                    parent.available = available
-                if parent.files_complete != files_complete:
-                    parent.files_complete = files_complete
-                if parent.remote_size != child_remote:
-                    parent.remote_size = child_remote
-                if parent.size_on_disk != child_on_disk:
-                    parent.size_on_disk = child_on_disk
-                if parent.is_dirty():
-                    parent.save()
-                    return True  # return True to indicate we need to continue up the tree
-                else:
-                    return False  # return False to indicate we don't need to continue up the tree
-
-
-            parents_to_update = {}
-            for path, update in content_models:
-                if update:
-                    # We have duplicates in the topic tree, make sure the stamping happens to all of them.
-                    item = Item.get(Item.path == path)
-                    if item.kind != "Topic":
-                        item_data = unparse_model_data(model_to_dict(item, recurse=False))
-                        item_data.update(update)
-                        item_data = parse_model_data(item_data)
-                        for attr, val in item_data.iteritems():
-                            setattr(item, attr, val)
-                        item.save()
-
-                        # Be robust by checking that the item has a parent
-                        # before appending it...
-                        if item.parent:
-                            parents_to_update[item.parent.pk] = item.parent
-
-            while parents_to_update:
-                new_parents_to_update = {}
-                for node in parents_to_update.values():
-                    changed = update_parent_annotation(node)
-                    if changed and node.parent:
-                        new_parents_to_update[node.parent.pk] = node.parent
-                parents_to_update = new_parents_to_update
+        start = time.time()
+        leaf_updates = []
+        parent_pks = set()
+        for paths in _chunks(updates):
+            for item in Item.select().where(Item.path.in_(paths) & (Item.kind != "Topic")).dicts():
+                item_data = unparse_model_data(item)
+                item_data.update(updates[item["path"]])
+                item_data = parse_model_data(item_data)
+                changed = dict((field, value) for field, value in item_data.iteritems() if value != item.get(field))
+                if changed:
+                    leaf_updates.append((item["pk"], changed))
+                # Be robust by checking that the item has a parent before propagating up the tree
+                if item["parent"]:
+                    parent_pks.add(item["parent"])
+        _bulk_update_items(db, leaf_updates)
+        stats["leaves_updated"] = len(leaf_updates)
+        stats["leaf_time"] = time.time() - start
+
+        start = time.time()
+        fields = (Item.pk, Item.parent, Item.kind, Item.total_files) + tuple(getattr(Item, field) for field in AGGREGATED_FIELDS)
+
+        # Collect every ancestor of the updated leaves, walking up the tree one level per query.
+        ancestors = {}
+        while parent_pks:
+            for pks in _chunks(parent_pks):
+                for node in Item.select(*fields).where(Item.pk.in_(pks)).order_by().dicts():
+                    ancestors[node["pk"]] = node
+            parent_pks = set(node["parent"] for node in ancestors.itervalues() if node["parent"]) - set(ancestors)
+
+        children = {}
+        for pks in _chunks(ancestors):
+            for node in Item.select(*fields).where(Item.parent.in_(pks)).order_by().dicts():
+                # Make sure ancestors that are also children are only represented once, so updates are seen by their parent
+                children.setdefault(node["parent"], []).append(ancestors.get(node["pk"], node))
+
+        def depth(pk):
+            parent = ancestors[pk]["parent"]
+            return depth(parent) + 1 if parent in ancestors else 0
+
+        topic_updates = []
+        for pk in sorted(ancestors, key=depth, reverse=True):
+            node = ancestors[pk]
+            aggregate = _aggregate_children(children.get(pk, []))
+            changed = dict((field, value) for field, value in aggregate.iteritems() if value != node[field])
+            if changed:
+                node.update(changed)
+                topic_updates.append((pk, changed))
+        _bulk_update_items(db, topic_updates)
+        stats["topics_updated"] = len(topic_updates)
+        stats["topic_time"] = time.time() - start
+
+        logging.info(
+            "Annotated {leaves_updated} content items in {leaf_time:.2f}s (scanning content took {scan_time:.2f}s), "
+            "and {topics_updated} topics in {topic_time:.2f}s.".format(**stats)
+        )
+        return stats
 
 
 @set_database
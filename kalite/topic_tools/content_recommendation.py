@@ -5,16 +5,19 @@ Three main functions:
     - get_next_recommendations(user)
     - get_explore_recommendations(user)
 '''
-import collections
 import datetime
-import itertools
 import logging
 import random
+import threading
+from collections import Counter
 
-from django.db.models import Count
-from kalite.facility.models import FacilityUser
-from kalite.main.models import ExerciseLog, VideoLog, ContentLog
-from kalite.topic_tools.content_models import get_content_item, get_topic_nodes_with_children, get_topic_contents, get_content_items
+from django.db.models import Count, Sum
+from django.db.models.signals import post_delete, post_save
+from fle_utils.collections_local_copy import OrderedDict
+from kalite.main.models import ExerciseLog, ExerciseTransition, VideoLog, ContentLog
+from kalite.topic_tools.connections import file_signature
+from kalite.topic_tools.content_models import get_content_item, get_topic_contents, \
+    build_recommendation_graph, get_recommendation_graph, get_subtopic_exercises, get_exercise_prerequisites
 
 from . import settings
 
@@ -43,12 +46,134 @@ def get_resume_recommendations(user, request):
         return []
 
 
+class LearnerState(object):
+    """What content recommendation needs to know about a user's exercises, read from their
+    ExerciseLogs in a single query and kept up to date as they are saved (see update_learner_state).
+
+    recent -- exercise ids, most recently active first
+    complete -- set of completed exercise ids
+    struggling -- set of exercise ids the user is struggling with
+    """
+
+    def __init__(self, logs):
+        """:param logs: (exercise_id, complete, struggling, latest_activity_timestamp) tuples, most recent first."""
+        self.recent = []
+        self.complete = set()
+        self.struggling = set()
+        self.latest_activity = None
+        for exercise_id, complete, struggling, timestamp in logs:
+            self.recent.append(exercise_id)
+            if complete:
+                self.complete.add(exercise_id)
+            if struggling:
+                self.struggling.add(exercise_id)
+            self.latest_activity = self.latest_activity or timestamp
+
+    @classmethod
+    def for_user(cls, user):
+        return cls(ExerciseLog.objects.filter(user=user).order_by("-latest_activity_timestamp")
+            .values_list("exercise_id", "complete", "struggling", "latest_activity_timestamp"))
+
+    def update(self, exercise_log):
+        """Apply a saved log to the state.
+        :return: False if the log is older than the most recent activity, in which case it
+        can't be placed in order without reloading the state.
+        """
+        timestamp = exercise_log.latest_activity_timestamp
+        if self.latest_activity and (not timestamp or timestamp < self.latest_activity):
+            return False
+        exercise_id = exercise_log.exercise_id
+        if exercise_id in self.recent:
+            self.recent.remove(exercise_id)
+        self.recent.insert(0, exercise_id)
+        for attr in ("complete", "struggling"):
+            if getattr(exercise_log, attr):
+                getattr(self, attr).add(exercise_id)
+            else:
+                getattr(self, attr).discard(exercise_id)
+        self.latest_activity = timestamp
+        return True
+
+    def copy(self):
+        state = LearnerState([])
+        state.recent = list(self.recent)
+        state.complete = set(self.complete)
+        state.struggling = set(self.struggling)
+        state.latest_activity = self.latest_activity
+        return state
+
+
+class LearnerStateCache(object):
+    """Thread-safe LRU cache of the LearnerState of the most recently active users."""
+
+    def __init__(self, size):
+        self.size = size
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, user):
+        """Return a copy of the user's state, loading it if it isn't cached."""
+        with self._lock:
+            state = self._states.pop(user.pk, None)
+            if state:
+                self._states[user.pk] = state
+                return state.copy()
+            generation = self._generation
+
+        state = LearnerState.for_user(user)
+        with self._lock:
+            # Only cache the state if no logs were saved while it was being loaded,
+            # as they may not be part of it.
+            if self._generation == generation:
+                self._states[user.pk] = state
+                while len(self._states) > self.size:
+                    self._states.popitem(last=False)
+            return state.copy()
+
+    def update(self, exercise_log):
+        """Apply a saved log to the state of its user, if cached."""
+        with self._lock:
+            self._generation += 1
+            state = self._states.get(exercise_log.user_id)
+            if state and not state.update(exercise_log):
+                del self._states[exercise_log.user_id]
+
+    def invalidate(self, user_id=None):
+        """Drop the state of a user, or of all users."""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(user_id, None)
+
+
+learner_states = LearnerStateCache(settings.LEARNER_STATE_CACHE_SIZE)
+
+def update_learner_state(sender, **kwargs):
+    instance = kwargs["instance"]
+    if kwargs.get("raw"):
+        learner_states.invalidate(instance.user_id)
+    else:
+        learner_states.update(instance)
+post_save.connect(update_learner_state, sender=ExerciseLog)
+
+def invalidate_learner_state(sender, **kwargs):
+    learner_states.invalidate(kwargs["instance"].user_id)
+post_delete.connect(invalidate_learner_state, sender=ExerciseLog)
+
+
+def get_learner_state(user):
+    """Return the LearnerState of the user."""
+
+    return learner_states.get(user)
+
+
 def get_completed_exercises(user):
-    """Return a list of all completed exercises (ids) by user."""
+    """Return a set of all completed exercises (ids) by user."""
 
-    exercises_by_user = ExerciseLog.objects.filter(user=user, complete=True).values_list("exercise_id", flat=True)
- 
-    return exercises_by_user
+    return get_learner_state(user).complete
 
 
 def get_next_recommendations(user, request):
@@ -67,9 +192,10 @@ def get_next_recommendations(user, request):
 
     exercise_parents_table = get_exercise_parents_lookup_table()
 
-    most_recent = get_most_recent_exercises(user)
+    state = get_learner_state(user)
+    most_recent = state.recent
 
-    complete_exercises = set(get_completed_exercises(user))
+    complete_exercises = state.complete
 
     def filter_complete(ex):
         return ex not in complete_exercises
@@ -90,10 +216,10 @@ def get_next_recommendations(user, request):
     topic_tree_based_data = [ex for ex in topic_tree_based_data if ex not in most_recent or filter_complete(ex)]
 
     #logic to generate recommendations based on exercises student is struggling with
-    struggling = filter(filter_complete, get_exercise_prereqs(get_struggling_exercises(user)))
+    struggling = filter(filter_complete, get_exercise_prereqs([ex for ex in most_recent if ex in state.struggling]))
 
     #logic to get recommendations based on group patterns, if applicable
-    group = filter(filter_complete, get_group_recommendations(user))
+    group = filter(filter_complete, get_group_recommendations(user, state=state))
   
     #now append titles and other metadata to each exercise id
     final = [] # final data to return
@@ -111,66 +237,55 @@ def get_next_recommendations(user, request):
     return final
 
 
-def get_group_recommendations(user):
+def get_group_recommendations(user, state=None):
     """Returns a list of exercises immediately tackled by other individuals in the same group."""
 
-    recent_exercises = get_most_recent_exercises(user)
-    
-    user_list = FacilityUser.objects.filter(group=user.group)
-
-    if recent_exercises:
-
-        #If the user has recently engaged with exercises, use these exercises as the basis for filtering
-        user_exercises = ExerciseLog.objects\
-            .filter(user__in=user_list).order_by("-latest_activity_timestamp")\
-            .extra(select={'null_complete': "completion_timestamp is null"},
-                order_by=["-null_complete", "-completion_timestamp"])
-    
-        exercise_counts = collections.defaultdict(lambda: 0)
-
-        for user in user_list:
-            logs = list(user_exercises.filter(user=user))
-            for log, prev_log in itertools.izip(logs[1:], logs):
-                if log.exercise_id in recent_exercises:
-                    exercise_counts[prev_log.exercise_id] += 1
-
-        exercise_counts = [{"exercise_id": key, "count": value} for key, value in exercise_counts.iteritems()]
+    state = state or get_learner_state(user)
+
+    if state.recent:
+        #If the user has recently engaged with exercises, count the exercises others in the group
+        #completed right after them (see ExerciseTransition)
+        #(a few hundred exercises at a time, to stay within SQLite's limit on query parameters)
+        counts = Counter()
+        for i in range(0, len(state.recent), 500):
+            exercise_counts = ExerciseTransition.objects\
+                .filter(group=user.group, from_exercise_id__in=state.recent[i:i + 500])\
+                .values("to_exercise_id")\
+                .annotate(count=Sum("count"))
+            for c in exercise_counts:
+                counts[c["to_exercise_id"]] += c["count"]
+        group_rec = [exercise_id for exercise_id, count in counts.most_common()]
 
     else:
         #If not, only look at the group data
-        exercise_counts = ExerciseLog.objects.filter(user__in=user_list).values("exercise_id").annotate(count=Count("exercise_id"))
-
-    #sort the results in order of highest counts to smallest
-    sorted_counts = sorted(exercise_counts, key=lambda k:k['count'], reverse=False)
-    
-    #the final list of recommendations to return, WITHOUT counts
-    group_rec = [c['exercise_id'] for c in sorted_counts]
-
+        exercise_counts = ExerciseLog.objects\
+            .filter(user__group=user.group)\
+            .values("exercise_id")\
+            .annotate(count=Count("exercise_id"))\
+            .order_by("-count")
+        group_rec = [c["exercise_id"] for c in exercise_counts]
+
+    #the final list of recommendations, in order of highest counts to smallest, WITHOUT counts
     return group_rec
 
 def get_struggling_exercises(user):
     """Return a list of all exercises (ids) that the user is currently struggling on."""
 
     # Return all exercise ids that the user is struggling on, ordered most recent first.
-    struggles = ExerciseLog.objects.filter(
-        user=user, struggling=True).order_by(
-        "-latest_activity_timestamp").values_list(
-        "exercise_id", flat=True)
-
-    return struggles
+    state = get_learner_state(user)
+    return [exercise_id for exercise_id in state.recent if exercise_id in state.struggling]
 
 
 def get_exercise_prereqs(exercises):
     """Return a list of prequisites (if applicable) for each specified exercise.
 
     :param exercise_ids: A list of exercise ids.
-    :return: A list of prerequisite exercises (as dicts), if any are known.
+    :return: A list of prerequisite exercise ids, if any are known.
     """
-    if exercises:
-        exercises = get_content_items(ids=exercises)
+    prerequisites = get_exercise_lookup_tables()["prerequisites"]
     prereqs = []
-    for exercise in exercises:
-        prereqs += exercise.get('prerequisites', [])
+    for exercise_id in exercises:
+        prereqs += prerequisites.get(exercise_id, [])
 
     return list(set(prereqs))
 
@@ -221,43 +336,61 @@ def get_explore_recommendations(user, request):
 
     return final
 
-exercise_parents_lookup_table = {}
-CACHE_VARS.append("exercise_parents_lookup_table")
-def get_exercise_parents_lookup_table():
-    """Return a dictionary with exercise ids as keys and topic_ids as values."""
+exercise_lookup_tables = {}
+CACHE_VARS.append("exercise_lookup_tables")
+def get_exercise_lookup_tables(channel=settings.CHANNEL, language="en"):
+    """Return lookup tables between exercises and the subtopics they fall under.
 
-    global exercise_parents_lookup_table
+    Returns a dictionary with:
+    parents -- exercise ids to a dictionary with their 'subtopic_id' and 'topic_id'
+    exercises -- subtopic ids to a list of their exercise ids, in topic tree order
+    recommended -- subtopic ids to their recommended exercise ids, filled in by get_recommended_exercises
+    prerequisites -- exercise ids to a list of their prerequisite exercise ids
 
-    if exercise_parents_lookup_table:
-        return exercise_parents_lookup_table
+    The tables are built from two queries, and kept in memory until the content database changes.
+    """
 
-    ### topic tree for traversal###
-    tree = get_topic_nodes_with_children(parent="root")
+    path = settings.CONTENT_DATABASE_PATH.format(channel=channel, language=language)
+    version = file_signature(path)
+    cached_version, tables = exercise_lookup_tables.get(path, (None, None))
+    if tables is not None and cached_version == version:
+        return tables
+
+    parents = {}
+    exercises = {}
+    for exercise_id, subtopic_id, topic_id in get_subtopic_exercises(channel=channel, language=language) or []:
+        if exercise_id not in parents:
+            parents[exercise_id] = {
+                "subtopic_id": subtopic_id,
+                "topic_id": topic_id,
+            }
+        exercises.setdefault(subtopic_id, []).append(exercise_id)
+
+    tables = {
+        "parents": parents,
+        "exercises": exercises,
+        "recommended": {},
+        "prerequisites": get_exercise_prerequisites(channel=channel, language=language) or {},
+    }
+    exercise_lookup_tables[path] = (version, tables)
+    return tables
 
-    #3 possible layers
-    for topic in tree:
-        for subtopic_id in topic['children']:
-            exercises = get_topic_contents(topic_id=subtopic_id, kinds=["Exercise"])
-            
-            if exercises is None:
-                raise RuntimeError("Caught exception, tried to find topic contents for {}".format(subtopic_id))
-            
-            for ex in exercises:
-                if ex['id'] not in exercise_parents_lookup_table:
-                    exercise_parents_lookup_table[ ex['id'] ] = {
-                        "subtopic_id": subtopic_id,
-                        "topic_id": topic['id'],
-                    }
+def get_exercise_parents_lookup_table():
+    """Return a dictionary with exercise ids as keys and topic_ids as values."""
 
-    return exercise_parents_lookup_table
+    return get_exercise_lookup_tables()["parents"]
 
 def get_exercises_from_topics(topicId_list):
     """Return an ordered list of the first 5 exercise ids under a given subtopic/topic."""
 
+    subtopic_exercises = get_exercise_lookup_tables()["exercises"]
+
     exs = []
     for topic in topicId_list:
-        if topic:
-            exercises = get_topic_contents(topic_id=topic, kinds=["Exercise"])[:5] #can change this line to allow for more to be returned
+        if topic in subtopic_exercises:
+            exs += subtopic_exercises[topic][:5] #can change this line to allow for more to be returned
+        elif topic:
+            exercises = (get_topic_contents(topic_id=topic, kinds=["Exercise"]) or [])[:5]
             for e in exercises:
                 exs.append(e['id'])  # only add the id to the list
 
@@ -301,82 +434,37 @@ def get_most_recent_incomplete_item(user):
 def get_most_recent_exercises(user):
     """Return a list of the most recent exercises (ids) accessed by the user."""
 
-    exercises_by_user = ExerciseLog.objects.filter(user=user).order_by("-latest_activity_timestamp").values_list("exercise_id", flat=True)
- 
-    return exercises_by_user
+    return get_learner_state(user).recent
 
 recommendation_data = {}
 CACHE_VARS.append("recommendation_data")
-def generate_recommendation_data():
-    """Traverses topic tree to generate a dictionary with related subtopics per subtopic."""
-
-    global recommendation_data
-    if recommendation_data:
-        return recommendation_data
-
-    ### populate data exploiting structure of topic tree ###
-    tree = get_topic_nodes_with_children(parent="root")
-
-    ######## DYNAMIC ALG #########
-
-    ##
-    # ITERATION 1 - grabs all immediate neighbors of each subtopic
-    ##
-
-    #array indices for the current topic and subtopic
-    topic_index = 0
-    subtopic_index = 0
-
-    #for each topic 
-    for topic in tree:
-
-        subtopic_index = 0
-
-        #for each subtopic add the neighbors at distance 0 and 1 (at dist one has 2 for each)
-        for subtopic_id in topic['children']:
-
-            neighbors_dist_1 = get_neighbors_at_dist_1(topic_index, subtopic_index, topic)
+def generate_recommendation_data(channel=settings.CHANNEL, language="en"):
+    """Return a dictionary with the related subtopics of each subtopic, most related first.
 
-            #add to recommendation_data - distance 0 (itself) + distance 1
-            recommendation_data[ subtopic_id ] = { 'related_subtopics' : ([subtopic_id + ' 0'] + neighbors_dist_1) }
-            subtopic_index+=1
-            
-        topic_index+=1
-
-    ##
-    # ITERATION 2 - grabs all subsequent neighbors of each subtopic via 
-    # Breadth-first search (BFS)
-    ##
-
-    #loop through all subtopics currently in recommendation_data dict
-    for subtopic in recommendation_data:
-        related = recommendation_data[subtopic]['related_subtopics'] # list of related subtopics (right now only 2)
-        other_neighbors = get_subsequent_neighbors(related, recommendation_data, subtopic)
-        recommendation_data[subtopic]['related_subtopics'] += other_neighbors ##append new neighbors
-
-
-    ##
-    # ITERATION 2.5 - Sort all results by increasing distance and to strip the final
-    # result of all distance values in recommendation_data (note that there are only 3 possible: 0,1,4).
-    ##
+    Each subtopic maps to a dictionary with its 'related_subtopics' (starting with itself) and
+    the 'distances' to each of them in the topic tree. The graph is stored in the content database
+    when it is first needed (see build_recommendation_graph), and kept in memory until the content
+    database changes.
+    """
 
-    #for each item in recommendation_data
-    for subtopic in recommendation_data:
-        at_dist_4 = []          #array to hold the subtopic ids of recs at distance 4
-        at_dist_lt_4 = []       #array to hold subtopic ids of recs at distance 0 or 1
+    path = settings.CONTENT_DATABASE_PATH.format(channel=channel, language=language)
+    version, data = recommendation_data.get(path, (None, None))
+    if data is not None and version == file_signature(path):
+        return data
 
-        #for this item, loop through all recommendations
-        for recc in recommendation_data[subtopic]['related_subtopics']:
-            if recc.split(" ")[1] == '4':   #if at dist 4, add to the array
-                at_dist_4.append(recc.split(" ")[0])
-            else:
-                at_dist_lt_4.append(recc.split(" ")[0])
+    graph = get_recommendation_graph(channel=channel, language=language)
+    if graph is None:
+        graph = build_recommendation_graph(channel=channel, language=language) or {}
 
-       
-        sorted_related = at_dist_lt_4 + at_dist_4 #append later items at end of earlier
-        recommendation_data[subtopic]['related_subtopics'] = sorted_related
+    data = {}
+    for subtopic, related in graph.iteritems():
+        data[subtopic] = {
+            'related_subtopics': [related_subtopic for related_subtopic, _ in related],
+            'distances': [distance for _, distance in related],
+        }
 
-    return recommendation_data
+    recommendation_data[path] = (file_signature(path), data)
+    return data
 
 def get_recommendation_tree(data):
     """Returns a dictionary of related exercises for each subtopic.
@@ -387,23 +475,14 @@ def get_recommendation_tree(data):
     
     """
 
+    subtopic_exercises = get_exercise_lookup_tables()["exercises"]
+
     recommendation_tree = {}  # tree to return
 
-    #loop through all subtopics passed in data
     for subtopic in data:
-        recommendation_tree[str(subtopic)] = [] #initialize an empty list for the current s.t.
-
         related_subtopics = data[subtopic]['related_subtopics'] #list of related subtopic ids
 
-        #loop through all of the related subtopics
-        for rel_subtopic in related_subtopics:
-            
-            #make sure related is not an empty string (shouldn't happen but to be safe)
-            if rel_subtopic:
-                exercises = get_topic_contents(topic_id=rel_subtopic, kinds=["Exercise"])
-
-                for ex in exercises:
-                    recommendation_tree[str(subtopic)].append(ex['id'])
+        recommendation_tree[str(subtopic)] = [ex for rel_subtopic in related_subtopics for ex in subtopic_exercises.get(rel_subtopic, [])]
 
     return recommendation_tree
       
@@ -413,188 +492,11 @@ def get_recommended_exercises(subtopic_id):
     if not subtopic_id:
         return []
 
-    #get a recommendation lookup tree
-    tree = get_recommendation_tree(generate_recommendation_data())
-
-    #currently returning everything, perhaps we should just limit the
-    #recommendations to a set amount??
-    return tree[subtopic_id]
-
-def get_neighbors_at_dist_1(topic_index, subtopic_index, topic):
-    """Return a list of the neighbors at distance 1 from the specified subtopic."""
-
-    neighbors = []  #neighbor list to be returned
-
-    tree = get_topic_nodes_with_children(parent="root")
-
-    #pointers to the previous and next subtopic (list indices)
-    prev = subtopic_index - 1 
-    next = subtopic_index + 1
-
-    #if there is a previous topic (neighbor to left)
-    if (prev > -1 ) and prev < len(topic['children']):
-        neighbors.append(topic['children'][prev] + ' 1') # neighbor on the left side
-
-    #else check if there is a neighboring topic (left)    
-    else:
-        if (topic_index-1) > -1 and topic_index - 1 < len(tree) and len(tree[(topic_index-1)]['children']) > 1:
-            neighbor_length = len(tree[(topic_index-1)]['children'])
-            neighbors.append(tree[(topic_index-1)]['children'][(neighbor_length-1)] + ' 4')
-
-        else:
-            neighbors.append(' ') # no neighbor to the left
-
-    #if there is a neighbor to the right
-    if(next < len(topic['children'])):
-        neighbors.append(topic['children'][next] + ' 1') # neighbor on the right side
-
-    #else check if there is a neighboring topic (right)
-    else:
-        if (topic_index + 1) < len(tree) and tree[(topic_index+1)]['children']:
-            #the 4 denotes the # of nodes in path to this other node, will always be 4
-            neighbors.append(tree[(topic_index+1)]['children'][0] + ' 4') 
-
-        else:
-            neighbors.append(' ') # no neighbor on right side
-
-
-    return neighbors
-
-def get_subsequent_neighbors(nearest_neighbors, data, curr):
-    """BFS algorithm. Returns a list of the other neighbors (dist > 1) for the given subtopic.
-
-    Args:
-    nearest_neighbors -- list of neighbors at dist 1 from subtopic.
-    data -- the dictionary of subtopics and their neighbors at distance 1
-    curr -- the current subtopic
-    
-    Example:
-    curr = u'subsubtopic4_4'
-    data = {
-        u'subsubtopic4_4': {'related_subtopics': [u'subsubtopic4_4 0', u'subsubtopic4_3 1', ' ']},
-        u'subsubtopic2': {'related_subtopics': [u'subsubtopic2 0', u'subsubtopic1 1', u'subsubtopic0_0 4']},
-        u'subsubtopic1': {'related_subtopics': [u'subsubtopic1 0', u'subsubtopic0 1', u'subsubtopic2 1']},
-        u'subsubtopic0': {'related_subtopics': [u'subsubtopic0 0', u'subsubtopic2 4', u'subsubtopic1 1']},
-        u'subsubtopic4_0': {'related_subtopics': [u'subsubtopic4_0 0', u'subsubtopic3_4 4', u'subsubtopic4_1 1']},
-        u'subsubtopic4_1': {'related_subtopics': [u'subsubtopic4_1 0', u'subsubtopic4_0 1', u'subsubtopic4_2 1']},
-        u'subsubtopic4_2': {'related_subtopics': [u'subsubtopic4_2 0', u'subsubtopic4_1 1', u'subsubtopic4_3 1']},
-        u'subsubtopic4_3': {'related_subtopics': [u'subsubtopic4_3 0', u'subsubtopic4_2 1', u'subsubtopic4_4 1']},
-        u'subsubtopic3_4': {'related_subtopics': [u'subsubtopic3_4 0', u'subsubtopic3_3 1', u'subsubtopic4_0 4']},
-        u'subsubtopic3_3': {'related_subtopics': [u'subsubtopic3_3 0', u'subsubtopic3_2 1', u'subsubtopic3_4 1']},
-        u'subsubtopic3_2': {'related_subtopics': [u'subsubtopic3_2 0', u'subsubtopic3_1 1', u'subsubtopic3_3 1']},
-        u'subsubtopic3_1': {'related_subtopics': [u'subsubtopic3_1 0', u'subsubtopic3_0 1', u'subsubtopic3_2 1']},
-        u'subsubtopic3_0': {'related_subtopics': [u'subsubtopic3_0 0', u'subsubtopic2_4 4', u'subsubtopic3_1 1']}, u'subsubtopic2_4': {'related_subtopics': [u'subsubtopic2_4 0', u'subsubtopic2_3 1', u'subsubtopic3_0 4']}, u'subsubtopic2_2': {'related_subtopics': [u'subsubtopic2_2 0', u'subsubtopic2_1 1', u'subsubtopic2_3 1']}, u'subsubtopic2_3': {'related_subtopics': [u'subsubtopic2_3 0', u'subsubtopic2_2 1', u'subsubtopic2_4 1']}, u'subsubtopic2_0': {'related_subtopics': [u'subsubtopic2_0 0', u'subsubtopic1_4 4', u'subsubtopic2_1 1']}, u'subsubtopic2_1': {'related_subtopics': [u'subsubtopic2_1 0', u'subsubtopic2_0 1', u'subsubtopic2_2 1']}, u'subsubtopic1_1': {'related_subtopics': [u'subsubtopic1_1 0', u'subsubtopic1_0 1', u'subsubtopic1_2 1']}, u'subsubtopic1_0': {'related_subtopics': [u'subsubtopic1_0 0', u'subsubtopic0_4 4', u'subsubtopic1_1 1']}, u'subsubtopic1_3': {'related_subtopics': [u'subsubtopic1_3 0', u'subsubtopic1_2 1', u'subsubtopic1_4 1']}, u'subsubtopic1_2': {'related_subtopics': [u'subsubtopic1_2 0', u'subsubtopic1_1 1', u'subsubtopic1_3 1']}, u'subsubtopic1_4': {'related_subtopics': [u'subsubtopic1_4 0', u'subsubtopic1_3 1', u'subsubtopic2_0 4']}, u'subsubtopic0_0': {'related_subtopics': [u'subsubtopic0_0 0', u'subsubtopic4_4 4', u'subsubtopic0_1 1']}, u'subsubtopic0_1': {'related_subtopics': [u'subsubtopic0_1 0', u'subsubtopic0_0 1', u'subsubtopic0_2 1']}, u'subsubtopic0_2': {'related_subtopics': [u'subsubtopic0_2 0', u'subsubtopic0_1 1', u'subsubtopic0_3 1']}, u'subsubtopic0_3': {'related_subtopics': [u'subsubtopic0_3 0', u'subsubtopic0_2 1', u'subsubtopic0_4 1']}, u'subsubtopic0_4': {'related_subtopics': [u'subsubtopic0_4 0', u'subsubtopic0_3 1', u'subsubtopic1_0 4']}}
-    nearest_neighbors = [u'subsubtopic4_4 0', u'subsubtopic4_3 1', ' ']
-    
-    Loops infinitely at:
-    [u'subsubtopic0 1', u'subsubtopic2 4']
-    [u'subsubtopic0 1', u'subsubtopic2 4']   subsubtopic1
-    """
-    
-    # import web_pdb; web_pdb.set_trace()
-
-    left_neigh = nearest_neighbors[1].split(' ')  # subtopic id and distance string of left neighbor
-    right_neigh = nearest_neighbors[2].split(' ') # same but for right
-
-    left = left_neigh[0]    #subtopic id of left
-    right = right_neigh[0]  #subtopic id of right
-
-    at_four_left = False    #boolean flag to denote that all other nodes to the left are at dist 4
-    at_four_right = False   #same as above but for right nodes
-
-    #checks, only applies to when left or right is ' ' (no neighbor)
-    if len(left_neigh) <= 1:
-        left = ' '
+    tables = get_exercise_lookup_tables()
+    recommended = tables["recommended"]
 
-    if not len(right_neigh) <= 1:
-        right = ' '
+    if subtopic_id not in recommended:
+        related_subtopics = generate_recommendation_data()[subtopic_id]['related_subtopics']
+        recommended[subtopic_id] = [ex for rel_subtopic in related_subtopics for ex in tables["exercises"].get(rel_subtopic, [])]
 
-    other_neighbors = []
-
-    # Loop while there are still neighbors
-    cycle_detection_left = []
-    cycle_detection_right = []
-    
-    while left != ' ' or right != ' ':
-
-        # benjaoming: This function is so horrid that I can only think of adding
-        # this and be done with it.
-        if left in cycle_detection_left:
-            break
-        if right in cycle_detection_right:
-            break
-        cycle_detection_left.append(left)
-        cycle_detection_right.append(right)
-
-        # benjaoming: what on earth is this?
-        if left == '':
-            left= ' '
-
-        # If there is a left neighbor, append its left neighbor
-        if left != ' ':
-            
-            if data[left]['related_subtopics'][1] != ' ':
-
-                #series of checks for each case
-                #if all other nodes are at dist 4 (the first dist 4 was found)
-                if(at_four_left):
-                    new_dist = 4
-                    at_four_left = True
-
-                else:
-                    try:
-                        #if immediate left node is 4
-                        if data[ curr ]['related_subtopics'][1].split(' ')[1] == '4':
-                            at_four_left = True
-                            new_dist = 4
-                        elif data[left]['related_subtopics'][1].split(' ')[1] == '4': #if the next left neighbor is at dist 4
-                            at_four_left = True
-                            new_dist = 4
-                        else: #this means that the next left node is at dist 1
-                            new_dist = 1
-                    except IndexError:
-                        new_dist = 1
-
-                    other_neighbors.append(data[left]['related_subtopics'][1].split(' ')[0] + ' ' + str(new_dist))
-            
-                # Update left neighbors
-                left = data[left]['related_subtopics'][1].split(' ')[0]
-            else:
-                left = " "
-        
-        if right == '':
-            right = ' '
-
-        # Repeat for right neighbor
-        if right != ' ':
-            if data[right]['related_subtopics'][2] != ' ':
-
-                #series of checks for each case
-                #if all other nodes are at dist 4 (the first dist 4 was found)
-                if(at_four_right):
-                    new_dist = 4
-                    at_four_right = True
-
-                else:
-                    #if immediate right node is 4
-                    if data[ curr ]['related_subtopics'][2].split(' ')[1] == '4':           
-                        at_four_right = True
-                        new_dist = 4
-                    elif data[right]['related_subtopics'][2].split(' ')[1] == '4': #if the next right neighbor is at dist 4
-                        at_four_right = True
-                        new_dist = 4
-                    else: #this means that the next right node is at dist 1
-                        new_dist = 1
-
-                if new_dist == 4:
-                    at_four_right = True
-
-                other_neighbors.append(data[right]['related_subtopics'][2].split(' ')[0] + ' ' + str(new_dist))
-            
-                # Update right neighbors
-                right = data[right]['related_subtopics'][2].split(' ')[0]
-
-            else:
-                right = " "
-        
-    return other_neighbors
+    return list(recommended[subtopic_id])
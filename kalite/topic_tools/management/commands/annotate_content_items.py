@@ -2,7 +2,8 @@ from optparse import make_option
 
 from django.conf import settings as django_settings
 from django.core.management.base import BaseCommand
-from kalite.topic_tools.content_models import annotate_content_models
+from kalite.topic_tools.content_models import annotate_content_models, build_topic_tree_index, \
+    build_search_index, build_recommendation_graph
 from kalite.topic_tools.settings import CONTENT_DATABASE_PATH
 
 
@@ -46,6 +47,9 @@ class Command(BaseCommand):
             )
         )
         annotate_content_models(database_path=database_path, channel=channel, language=language)
+        build_topic_tree_index(database_path=database_path, channel=channel, language=language)
+        build_search_index(database_path=database_path, channel=channel, language=language)
+        build_recommendation_graph(database_path=database_path, channel=channel, language=language)
 
         logging.info("Annotation complete for language: {language}, channel: {channel}".format(
             language=language,
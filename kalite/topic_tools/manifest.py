@@ -0,0 +1,213 @@
+"""
+A manifest of the files in CONTENT_ROOT and its subtitle tree, so that annotation can answer
+"is this file present / how big is it / which subtitle languages exist" from memory.
+
+The manifest records the name, size and mtime of every file, along with the mtime of the
+directory it was read from. When a directory's mtime hasn't changed since it was last read, no
+files have been added, removed or renamed in it, so it is not read again. (A file rewritten in
+place doesn't change its directory's mtime, so file sizes are checked when they are looked up.)
+The manifest is persisted between runs (see settings.CONTENT_MANIFEST_PATH), so that a fresh
+process only has to stat a handful of directories when nothing has changed.
+"""
+import json
+import os
+import stat
+import threading
+import time
+
+from django.conf import settings as django_settings
+logging = django_settings.LOG
+
+from . import settings
+
+# Some filesystems (e.g. FAT on USB drives) only store mtimes to the nearest 2 seconds, so a
+# directory modified within that window of being read may look unchanged afterwards.
+MTIME_RESOLUTION = 2
+
+MANIFEST_VERSION = 1
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _is_unchanged(record, path):
+    """
+    Whether the directory at path is unchanged since record was taken.
+    """
+    if "scanned" not in record:
+        return False
+    mtime = _mtime(path)
+    if mtime is None:
+        # Still missing
+        return record.get("mtime") is None
+    return (
+        record.get("mtime") == mtime and
+        # Don't trust an mtime that was recent when we read the directory, it may hide later changes.
+        mtime < record.get("scanned", 0) - MTIME_RESOLUTION
+    )
+
+
+def _scan_directory(path, stat_files=True):
+    """
+    Read a directory, returning a record of its mtime and of the files in it.
+    :param stat_files: Whether to record the size and mtime of each file, or just its name.
+    """
+    record = {"mtime": _mtime(path), "scanned": time.time(), "files": {}}
+    try:
+        filenames = os.listdir(path)
+    except OSError:
+        return record
+    for filename in filenames:
+        if stat_files:
+            try:
+                file_stat = os.stat(os.path.join(path, filename))
+            except OSError:
+                continue
+            if not stat.S_ISDIR(file_stat.st_mode):
+                record["files"][filename] = [file_stat.st_size, file_stat.st_mtime]
+        else:
+            record["files"][filename] = None
+    return record
+
+
+class ContentManifest(object):
+    """
+    In-memory index of the files in a content root, see module docstring.
+    """
+
+    def __init__(self, root, manifest_path=None):
+        self.root = root
+        self.manifest_path = manifest_path
+        self.content = {}
+        self.subtitles = {}
+        self._subtitle_languages = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def subtitle_root(self):
+        return os.path.join(self.root, "srt")
+
+    def load(self):
+        """
+        Load the manifest persisted by a previous run, if it was for the same content root.
+        """
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path) as f:
+                data = json.load(f)
+        except (IOError, ValueError) as e:
+            logging.warn("Ignoring unreadable content manifest {path}: {error}".format(path=self.manifest_path, error=e))
+            return
+        if data.get("version") == MANIFEST_VERSION and data.get("root") == self.root:
+            self.content = data.get("content", {})
+            self.subtitles = data.get("subtitles", {})
+            self._index_subtitles()
+
+    def save(self):
+        if not self.manifest_path:
+            return
+        data = {
+            "version": MANIFEST_VERSION,
+            "root": self.root,
+            "content": self.content,
+            "subtitles": self.subtitles,
+        }
+        try:
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            if os.path.exists(self.manifest_path):
+                # os.rename doesn't replace existing files on Windows
+                os.remove(self.manifest_path)
+            os.rename(tmp_path, self.manifest_path)
+        except (IOError, OSError) as e:
+            logging.warn("Could not save content manifest {path}: {error}".format(path=self.manifest_path, error=e))
+
+    def refresh(self):
+        """
+        Bring the manifest up to date with the disk, only re-reading directories that have changed.
+        :return: True if anything was re-read.
+        """
+        with self._lock:
+            changed = False
+
+            if not _is_unchanged(self.content, self.root):
+                self.content = _scan_directory(self.root)
+                changed = True
+
+            # Subtitles live in srt/<language>/subtitles/<content id>.vtt
+            languages = self.subtitles.get("languages", {})
+            if not _is_unchanged(self.subtitles, self.subtitle_root):
+                record = _scan_directory(self.subtitle_root, stat_files=False)
+                self.subtitles = {"mtime": record["mtime"], "scanned": record["scanned"]}
+                languages = dict((lc, languages.get(lc, {})) for lc in record["files"])
+                changed = True
+            for lc, language_record in languages.items():
+                subtitle_dir = os.path.join(self.subtitle_root, lc, "subtitles")
+                if not _is_unchanged(language_record, subtitle_dir):
+                    languages[lc] = _scan_directory(subtitle_dir, stat_files=False)
+                    changed = True
+            self.subtitles["languages"] = languages
+
+            if changed:
+                self._index_subtitles()
+                self.save()
+            return changed
+
+    def _index_subtitles(self):
+        subtitle_languages = {}
+        for lc, record in sorted(self.subtitles.get("languages", {}).items()):
+            for filename in record.get("files", {}):
+                subtitle_languages.setdefault(filename, []).append(lc)
+        self._subtitle_languages = subtitle_languages
+
+    def has_file(self, filename):
+        """
+        Whether a file with this name is in the content root.
+        """
+        return filename in self.content.get("files", {})
+
+    def file_size(self, filename, default=None):
+        """
+        Size in bytes of the file with this name in the content root.
+        A file can be rewritten in place (e.g. copied over, or resumed) without changing the mtime of
+        its directory, so its record is checked against the disk here.
+        """
+        files = self.content.get("files", {})
+        if filename not in files:
+            return default
+        try:
+            file_stat = os.stat(os.path.join(self.root, filename))
+        except OSError:
+            return default
+        files[filename] = [file_stat.st_size, file_stat.st_mtime]
+        return file_stat.st_size
+
+    def subtitle_languages(self, filename):
+        """
+        Language codes of the subtitle directories that contain a file with this name.
+        """
+        return list(self._subtitle_languages.get(filename, []))
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_content_manifest():
+    """
+    Returns the up-to-date manifest for the current CONTENT_ROOT, shared by the whole process.
+    """
+    root = django_settings.CONTENT_ROOT
+    with _manifests_lock:
+        if root not in _manifests:
+            _manifests[root] = ContentManifest(root, manifest_path=settings.CONTENT_MANIFEST_PATH)
+        manifest = _manifests[root]
+    manifest.refresh()
+    return manifest
@@ -15,6 +15,9 @@ from django.conf import settings
 # Where runtime data is stored
 CONTENT_DATABASE_PATH = os.path.join(settings.DEFAULT_DATABASE_DIR, "content_{channel}_{language}.sqlite")
 
+# Where the manifest of files in CONTENT_ROOT is persisted between runs, see manifest.py
+CONTENT_MANIFEST_PATH = os.path.join(settings.DEFAULT_DATABASE_DIR, "content_manifest.json")
+
 # Where db templates are stored
 CONTENT_DATABASE_TEMPLATE_PATH = os.path.join(settings.DB_CONTENT_ITEM_TEMPLATE_DIR, "content_{channel}_{language}.sqlite")
 
@@ -24,3 +27,9 @@ KHAN_EXERCISES_DIRPATH = os.path.join(settings.STATIC_ROOT, "js", "distributed",
 
 # How many topics to recommend
 TOPIC_RECOMMENDATION_SIZE = 3
+
+# How many related subtopics to keep for each subtopic in the recommendation graph, including itself
+RELATED_SUBTOPICS_LIMIT = 50
+
+# How many users' exercise progress to keep in memory for content recommendation, see LearnerStateCache
+LEARNER_STATE_CACHE_SIZE = getattr(settings, "LEARNER_STATE_CACHE_SIZE", 500)
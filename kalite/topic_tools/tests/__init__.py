@@ -2,4 +2,8 @@ from explore_tests import *
 from helper_tests import *
 from next_tests import *
 from resume_tests import *
-from content_models_tests import UpdateItemTestCase, ContentModelsTestCase, ContentModelRegressionTestCase
+from content_models_tests import UpdateItemTestCase, ContentModelsTestCase, ContentModelRegressionTestCase, \
+    ContentDatabaseRegistryTestCase, TopicTreeIndexTestCase, SearchIndexTestCase, \
+    AnnotateContentModelsTestCase, RecommendationGraphTestCase, PlaylistEntriesTestCase, \
+    ContentDatabaseUpgradeTestCase
+from manifest_tests import *
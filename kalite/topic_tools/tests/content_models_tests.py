@@ -1,6 +1,16 @@
+import json
+import os
+import sqlite3
+import tempfile
+
 from kalite.testing.base import KALiteTestCase
 from kalite.topic_tools.content_models import update_item, get_random_content, get_content_item, \
-    get_topic_nodes, get_content_parents
+    get_topic_nodes, get_content_parents, get_topic_contents, get_ancestors, get_leaf_counts, \
+    build_topic_tree_index, create_table, bulk_insert, search_topic_nodes, build_search_index, \
+    update_parents, annotate_content_models, get_topic_update_nodes, rank_related_subtopics, \
+    build_recommendation_graph, get_recommendation_graph, get_subtopic_exercises, get_playlist_entries, \
+    get_content_items, get_exercise_prerequisites
+from kalite.topic_tools.connections import ContentDatabaseRegistry, content_databases
 
 
 class ContentModelRegressionTestCase(KALiteTestCase):
@@ -31,3 +41,286 @@ class ContentModelsTestCase(KALiteTestCase):
         empty list of ids is passed to it.
         """
         self.assertEqual(get_content_parents(ids=list()), list())
+
+
+class ContentDatabaseRegistryTestCase(KALiteTestCase):
+
+    def setUp(self):
+        super(ContentDatabaseRegistryTestCase, self).setUp()
+        self.registry = ContentDatabaseRegistry()
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+
+    def tearDown(self):
+        self.registry.invalidate()
+        os.unlink(self.path)
+        super(ContentDatabaseRegistryTestCase, self).tearDown()
+
+    def test_database_is_reused(self):
+        db = self.registry.get("khan", "en", self.path)
+        db.execute_sql("SELECT 1")
+        self.assertIs(db, self.registry.get("khan", "en", self.path))
+        self.assertIs(db.get_conn(), self.registry.get("khan", "en", self.path).get_conn())
+
+    def test_database_is_reopened_when_file_changes(self):
+        db = self.registry.get("khan", "en", self.path)
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertIsNot(db, self.registry.get("khan", "en", self.path))
+
+    def test_own_writes_do_not_reopen_database(self):
+        db = self.registry.get("khan", "en", self.path)
+        db.execute_sql("CREATE TABLE foo (bar INTEGER)")
+        self.registry.release("khan", "en", self.path)
+        self.assertIs(db, self.registry.get("khan", "en", self.path))
+
+    def test_invalidate(self):
+        db = self.registry.get("khan", "en", self.path)
+        self.registry.invalidate(language="en")
+        self.assertIsNot(db, self.registry.get("khan", "en", self.path))
+
+
+
+class TemporaryContentDatabaseTestCase(KALiteTestCase):
+    """
+    Sets up a small, well-formed topic tree in its own content database.
+    """
+
+    def setUp(self):
+        super(TemporaryContentDatabaseTestCase, self).setUp()
+        fd, self.database_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        create_table(database_path=self.database_path)
+        items = [{"id": "khan", "path": "khan/", "kind": "Topic", "total_files": 2}]
+        parents = {}
+        for topic in ["topic0", "topic1"]:
+            items.append({"id": topic, "path": "khan/{}/".format(topic), "kind": "Topic", "total_files": 1})
+            parents["khan/{}/".format(topic)] = "khan"
+            for idx in range(3):
+                slug = "{}-exercise-{}".format(topic, idx)
+                items.append({"id": slug, "path": "khan/{}/{}/".format(topic, slug), "kind": "Exercise"})
+            items.append({"id": topic + "-video", "path": "khan/{}/video/".format(topic), "kind": "Video", "keywords": ["fractions"],
+                          "total_files": 1, "remote_size": 100})
+            for item in items[-4:]:
+                parents[item["path"]] = topic
+        for item in items:
+            item.update({"slug": item["id"], "title": item["id"], "description": "", "available": True})
+        bulk_insert(items, database_path=self.database_path)
+        update_parents(parent_mapping=parents, database_path=self.database_path)
+
+    def tearDown(self):
+        content_databases.invalidate(path=self.database_path)
+        os.unlink(self.database_path)
+        super(TemporaryContentDatabaseTestCase, self).tearDown()
+
+
+class TopicTreeIndexTestCase(TemporaryContentDatabaseTestCase):
+
+    def test_topic_contents_match_path_scan(self):
+        expected = sorted(item["path"] for item in get_topic_contents(topic_id="khan", database_path=self.database_path))
+        build_topic_tree_index(database_path=self.database_path)
+        actual = sorted(item["path"] for item in get_topic_contents(topic_id="khan", database_path=self.database_path))
+        self.assertEqual(len(expected), 8)
+        self.assertEqual(expected, actual)
+
+    def test_get_ancestors(self):
+        path = "khan/topic1/topic1-exercise-0/"
+        expected = ["khan", "topic1"]
+        self.assertEqual([item["id"] for item in get_ancestors(path=path, database_path=self.database_path)], expected)
+        build_topic_tree_index(database_path=self.database_path)
+        self.assertEqual([item["id"] for item in get_ancestors(path=path, database_path=self.database_path)], expected)
+
+    def test_get_leaf_counts(self):
+        expected = {"khan": 6, "topic0": 3, "topic1": 3}
+        topic_ids = expected.keys()
+        self.assertEqual(get_leaf_counts(topic_ids=topic_ids, kinds=["Exercise"], database_path=self.database_path), expected)
+        build_topic_tree_index(database_path=self.database_path)
+        self.assertEqual(get_leaf_counts(topic_ids=topic_ids, kinds=["Exercise"], database_path=self.database_path), expected)
+
+
+class SearchIndexTestCase(TemporaryContentDatabaseTestCase):
+
+    def search(self, query, **kwargs):
+        return search_topic_nodes(query=query, database_path=self.database_path, **kwargs)
+
+    def test_exact_match(self):
+        build_search_index(database_path=self.database_path)
+        matches, exact, pages = self.search("topic1-exercise-2")
+        self.assertTrue(exact)
+        self.assertEqual(matches[0]["id"], "topic1-exercise-2")
+
+    def test_prefix_match(self):
+        build_search_index(database_path=self.database_path)
+        matches, exact, pages = self.search("topic0 exer", kinds=["Exercise"])
+        self.assertFalse(exact)
+        self.assertEqual(sorted(match["id"] for match in matches), ["topic0-exercise-{}".format(idx) for idx in range(3)])
+
+    def test_keywords_are_searchable(self):
+        build_search_index(database_path=self.database_path)
+        matches, exact, pages = self.search("fraction")
+        self.assertEqual(sorted(match["id"] for match in matches), ["topic0-video", "topic1-video"])
+
+    def test_pagination(self):
+        build_search_index(database_path=self.database_path)
+        first_page, exact, pages = self.search("exercise", items_per_page=4)
+        second_page, exact, pages = self.search("exercise", items_per_page=4, page=2)
+        self.assertEqual(pages, 1)
+        self.assertEqual(len(first_page), 4)
+        self.assertEqual(len(second_page), 2)
+        self.assertFalse(set(match["id"] for match in first_page) & set(match["id"] for match in second_page))
+
+    def test_stale_index_falls_back_to_scan(self):
+        build_search_index(database_path=self.database_path)
+        bulk_insert([{"id": "late", "slug": "late", "path": "khan/late/", "kind": "Topic", "title": "Latecomer",
+                      "description": "", "available": True}], database_path=self.database_path)
+        matches, exact, pages = self.search("latecom")
+        self.assertEqual([match["id"] for match in matches], ["late"])
+
+
+class AnnotateContentModelsTestCase(TemporaryContentDatabaseTestCase):
+
+    def annotate(self, updates):
+        def iterator_content_items(**kwargs):
+            return updates.iteritems()
+        return annotate_content_models(database_path=self.database_path, iterator_content_items=iterator_content_items)
+
+    def test_availability_propagates_to_ancestors(self):
+        self.annotate({
+            "khan/topic0/video/": {"available": False, "files_complete": 0, "size_on_disk": 0},
+            "khan/topic1/video/": {"available": True, "files_complete": 1, "size_on_disk": 10},
+        })
+        self.annotate({
+            "khan/topic0/video/": {"available": True, "files_complete": 1, "size_on_disk": 20},
+        })
+        topics = dict((node["id"], node) for node in get_topic_update_nodes(parent="khan", database_path=self.database_path))
+        self.assertEqual(topics["topic0"]["files_complete"], 1)
+        self.assertEqual(topics["topic0"]["size_on_disk"], 20)
+        self.assertEqual(topics["topic0"]["remote_size"], 0)
+        root = get_ancestors(path="khan/topic0/", database_path=self.database_path)[0]
+        self.assertEqual(root["files_complete"], 2)
+        self.assertEqual(root["size_on_disk"], 30)
+
+    def test_remote_size_counts_unavailable_content(self):
+        stats = self.annotate({
+            "khan/topic0/video/": {"available": False, "files_complete": 0, "size_on_disk": 0},
+            "khan/topic1/video/": {"available": False, "files_complete": 0, "size_on_disk": 0},
+        })
+        self.assertEqual(stats["leaves_updated"], 2)
+        topics = dict((node["id"], node) for node in get_topic_update_nodes(parent="khan", database_path=self.database_path))
+        self.assertEqual(topics["topic0"]["remote_size"], 100)
+        self.assertEqual(topics["topic1"]["remote_size"], 100)
+        root = get_ancestors(path="khan/topic0/", database_path=self.database_path)[0]
+        self.assertEqual(root["remote_size"], 200)
+        self.assertEqual(root["files_complete"], 0)
+
+
+class RecommendationGraphTestCase(TemporaryContentDatabaseTestCase):
+
+    def test_rank_related_subtopics(self):
+        graph = rank_related_subtopics([["a0", "a1", "a2"], ["b0", "b1"]])
+        self.assertEqual(graph["a1"], [("a1", 0), ("a0", 1), ("a2", 1), ("b0", 4), ("b1", 4)])
+        self.assertEqual(graph["b0"], [("b0", 0), ("b1", 1), ("a2", 4), ("a1", 4), ("a0", 4)])
+
+    def test_rank_related_subtopics_limit(self):
+        graph = rank_related_subtopics([["a0", "a1", "a2"], ["b0", "b1"]], limit=3)
+        self.assertEqual(graph["a2"], [("a2", 0), ("a1", 1), ("a0", 1)])
+        self.assertEqual(graph["b1"], [("b1", 0), ("b0", 1), ("a2", 4)])
+
+    def test_graph_is_stored(self):
+        self.assertIsNone(get_recommendation_graph(database_path=self.database_path))
+        graph = build_recommendation_graph(database_path=self.database_path)
+        self.assertEqual(len(graph), 8)
+        self.assertEqual(graph["topic0-exercise-1"][:4], [
+            ("topic0-exercise-1", 0), ("topic0-exercise-0", 1), ("topic0-exercise-2", 1), ("topic0-video", 1),
+        ])
+        self.assertEqual(get_recommendation_graph(database_path=self.database_path), graph)
+
+    def test_get_subtopic_exercises(self):
+        items = [{"id": "subtopic", "path": "khan/topic1/subtopic/", "kind": "Topic"}]
+        parents = {"khan/topic1/subtopic/": "topic1"}
+        for idx in range(2):
+            slug = "subtopic-exercise-{}".format(idx)
+            items.append({"id": slug, "path": "khan/topic1/subtopic/{}/".format(slug), "kind": "Exercise", "sort_order": idx})
+            parents[items[-1]["path"]] = "subtopic"
+        for item in items:
+            item.update({"slug": item["id"], "title": item["id"], "description": "", "available": True})
+        bulk_insert(items, database_path=self.database_path)
+        update_parents(parent_mapping=parents, database_path=self.database_path)
+        self.assertEqual(get_subtopic_exercises(database_path=self.database_path), [
+            ("subtopic-exercise-0", "subtopic", "topic1"), ("subtopic-exercise-1", "subtopic", "topic1"),
+        ])
+
+
+class PlaylistEntriesTestCase(TemporaryContentDatabaseTestCase):
+
+    def test_get_playlist_entries(self):
+        entries = get_playlist_entries(database_path=self.database_path)
+        self.assertEqual(sorted(entries), sorted(
+            [(topic, "{}-exercise-{}".format(topic, idx), "Exercise", True) for topic in ["topic0", "topic1"] for idx in range(3)] +
+            [(topic, topic + "-video", "Video", True) for topic in ["topic0", "topic1"]]
+        ))
+
+    def test_get_playlist_entries_includes_nested_content(self):
+        items = [
+            {"id": "subtopic", "path": "khan/topic0/subtopic/", "kind": "Topic"},
+            {"id": "nested", "path": "khan/topic0/subtopic/nested/", "kind": "Exercise"},
+        ]
+        for item in items:
+            item.update({"slug": item["id"], "title": item["id"], "description": "", "available": True})
+        bulk_insert(items, database_path=self.database_path)
+        update_parents(parent_mapping={"khan/topic0/subtopic/": "topic0", "khan/topic0/subtopic/nested/": "subtopic"}, database_path=self.database_path)
+        entries = get_playlist_entries(database_path=self.database_path)
+        # Nested content counts towards every playlist it's under, but only one of them is its parent
+        self.assertIn(("subtopic", "nested", "Exercise", True), entries)
+        self.assertIn(("topic0", "nested", "Exercise", False), entries)
+
+
+class ContentDatabaseUpgradeTestCase(KALiteTestCase):
+    """
+    Content packs made before PROMOTED_FIELDS had their own columns are upgraded when first opened.
+    """
+
+    def setUp(self):
+        super(ContentDatabaseUpgradeTestCase, self).setUp()
+        fd, self.database_path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        connection = sqlite3.connect(self.database_path)
+        connection.execute(
+            "CREATE TABLE item (pk INTEGER PRIMARY KEY, title VARCHAR(255), description TEXT, available SMALLINT, "
+            "files_complete INTEGER, total_files INTEGER, kind VARCHAR(255), parent_id INTEGER, id VARCHAR(255), "
+            "slug VARCHAR(255), path VARCHAR(255), extra_fields VARCHAR(255), youtube_id VARCHAR(255), "
+            "size_on_disk INTEGER, remote_size INTEGER, sort_order REAL)"
+        )
+        connection.executemany(
+            "INSERT INTO item (pk, title, description, available, files_complete, total_files, kind, id, slug, path, "
+            "extra_fields, size_on_disk, remote_size, sort_order) VALUES (?, ?, '', 1, 0, 0, ?, ?, ?, ?, ?, 0, 0, 0)",
+            [
+                (1, "Exercise", "Exercise", "ex", "ex", "khan/ex/", json.dumps({"prerequisites": ["other"], "all_assessment_items": []})),
+                (2, "Video", "Video", "vid", "vid", "khan/vid/", json.dumps({"format": "mp4", "duration": 60, "content_urls": {"stream": "/foo"}})),
+                (3, "Topic", "Topic", "topic", "topic", "khan/", "{}"),
+            ]
+        )
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        content_databases.invalidate(path=self.database_path)
+        os.unlink(self.database_path)
+        super(ContentDatabaseUpgradeTestCase, self).tearDown()
+
+    def test_extra_fields_are_moved_to_columns(self):
+        items = dict((item["id"], item) for item in get_content_items(database_path=self.database_path))
+
+        self.assertEqual(items["ex"]["prerequisites"], ["other"])
+        self.assertEqual(items["ex"]["all_assessment_items"], [])
+        self.assertEqual(items["vid"]["format"], "mp4")
+        self.assertEqual(items["vid"]["duration"], 60)
+        self.assertEqual(items["vid"]["content_urls"], {"stream": "/foo"})
+        self.assertNotIn("prerequisites", items["topic"])
+        self.assertEqual(get_exercise_prerequisites(database_path=self.database_path), {"ex": ["other"]})
+
+        connection = sqlite3.connect(self.database_path)
+        extra_fields = dict(connection.execute("SELECT id, extra_fields FROM item").fetchall())
+        connection.close()
+        self.assertEqual(json.loads(extra_fields["ex"]), {"all_assessment_items": []})
+        self.assertEqual(json.loads(extra_fields["vid"]), {})
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import time
+
+from mock import patch
+
+from kalite.testing.base import KALiteTestCase
+from kalite.topic_tools import manifest as mod
+from kalite.topic_tools.manifest import ContentManifest
+
+
+class ContentManifestTestCase(KALiteTestCase):
+
+    def setUp(self):
+        super(ContentManifestTestCase, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(tempfile.mkdtemp(), "manifest.json")
+        self.write_file("abc.mp4", "12345")
+        self.write_file("srt/en/subtitles/abc.vtt")
+        self.write_file("srt/pt_BR/subtitles/abc.vtt")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+        shutil.rmtree(os.path.dirname(self.manifest_path))
+        super(ContentManifestTestCase, self).tearDown()
+
+    def write_file(self, path, data=""):
+        path = os.path.join(self.root, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(data)
+        self.age_directories()
+
+    def age_directories(self, seconds=60):
+        """
+        Backdate all directory mtimes, so that they are trusted by the manifest.
+        """
+        mtime = time.time() - seconds
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            os.utime(dirpath, (mtime, mtime))
+
+    def test_lookups(self):
+        manifest = ContentManifest(self.root, manifest_path=self.manifest_path)
+        manifest.refresh()
+        self.assertTrue(manifest.has_file("abc.mp4"))
+        self.assertFalse(manifest.has_file("def.mp4"))
+        self.assertEqual(manifest.file_size("abc.mp4"), 5)
+        self.assertEqual(manifest.subtitle_languages("abc.vtt"), ["en", "pt_BR"])
+
+    def test_unchanged_directories_are_not_read(self):
+        manifest = ContentManifest(self.root, manifest_path=self.manifest_path)
+        self.assertTrue(manifest.refresh())
+        with patch.object(mod, "_scan_directory", wraps=mod._scan_directory) as scan_directory:
+            self.assertFalse(manifest.refresh())
+            self.assertFalse(scan_directory.called)
+
+    def test_changed_directories_are_read(self):
+        manifest = ContentManifest(self.root, manifest_path=self.manifest_path)
+        manifest.refresh()
+        self.write_file("def.mp4")
+        os.remove(os.path.join(self.root, "srt", "pt_BR", "subtitles", "abc.vtt"))
+        self.age_directories(seconds=30)
+        self.assertTrue(manifest.refresh())
+        self.assertTrue(manifest.has_file("def.mp4"))
+        self.assertEqual(manifest.subtitle_languages("abc.vtt"), ["en"])
+
+    def test_file_rewritten_in_place(self):
+        manifest = ContentManifest(self.root, manifest_path=self.manifest_path)
+        manifest.refresh()
+        # e.g. a resumed download, or a copy over the file; neither changes the directory's mtime
+        with open(os.path.join(self.root, "abc.mp4"), "a") as f:
+            f.write("67890")
+        self.assertFalse(manifest.refresh())
+        self.assertEqual(manifest.file_size("abc.mp4"), 10)
+
+    def test_manifest_is_persisted(self):
+        ContentManifest(self.root, manifest_path=self.manifest_path).refresh()
+        manifest = ContentManifest(self.root, manifest_path=self.manifest_path)
+        self.assertFalse(manifest.refresh())
+        self.assertTrue(manifest.has_file("abc.mp4"))
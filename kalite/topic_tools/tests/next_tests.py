@@ -4,7 +4,10 @@ get the "Next" recommendations.
 '''
 import datetime
 
-from kalite.topic_tools.content_recommendation import get_group_recommendations, get_struggling_exercises, get_exercise_prereqs
+from mock import patch
+
+from kalite.topic_tools.content_recommendation import get_group_recommendations, get_struggling_exercises, get_exercise_prereqs, \
+	get_learner_state, LearnerStateCache
 from kalite.testing.base import KALiteTestCase
 from kalite.facility.models import Facility, FacilityUser, FacilityGroup
 from kalite.main.models import ExerciseLog
@@ -100,6 +103,11 @@ class TestNextMethods(KALiteTestCase):
 		actual = get_group_recommendations(user)
 
 		self.assertEqual(expected, actual, "Group recommendations incorrect.")
+
+		# The user's recent exercises come from their cached state
+		with patch("kalite.topic_tools.content_recommendation.ExerciseLog") as exercise_log:
+			self.assertEqual(expected, get_group_recommendations(user))
+		self.assertFalse(exercise_log.objects.filter.called)
 		
 
 	def test_struggling(self):
@@ -121,3 +129,38 @@ class TestNextMethods(KALiteTestCase):
 		actual = get_exercise_prereqs([ex_id])
 		
 		self.assertEqual(expected, actual, "Exercise Prereqs incorrect.")
+
+	def test_learner_state_updated_on_save(self):
+		'''get_learner_state() after a save'''
+		get_learner_state(self.user1)
+
+		log = ExerciseLog(exercise_id=self.EXERCISE_ID_STRUGGLE, user=self.user1, attempts=30)
+		log.latest_activity_timestamp = self.TIMESTAMP_LATER
+		log.save()
+
+		with self.assertNumQueries(0):
+			state = get_learner_state(self.user1)
+		self.assertEqual([self.EXERCISE_ID_STRUGGLE, self.EXERCISE_ID], state.recent)
+		self.assertEqual(set([self.EXERCISE_ID_STRUGGLE]), state.struggling)
+
+	def test_learner_state_reloaded_after_older_log(self):
+		'''get_learner_state() after a log from before the latest activity is saved'''
+		get_learner_state(self.user2)
+
+		log = ExerciseLog(exercise_id=self.content_exercises[3].id, user=self.user2)
+		log.latest_activity_timestamp = self.TIMESTAMP_STRUGGLE - datetime.timedelta(days=1)
+		log.save()
+
+		state = get_learner_state(self.user2)
+		self.assertEqual([self.EXERCISE_ID2, self.EXERCISE_ID, self.EXERCISE_ID_STRUGGLE, self.content_exercises[3].id], state.recent)
+
+	def test_learner_state_cache_is_bounded(self):
+		'''LearnerStateCache evicts the least recently used users'''
+		cache = LearnerStateCache(size=1)
+		cache.get(self.user1)
+		cache.get(self.user2)
+
+		with self.assertNumQueries(0):
+			cache.get(self.user2)
+		with self.assertNumQueries(1):
+			cache.get(self.user1)
@@ -1,9 +1,11 @@
-import json
+import datetime
 
 from django.conf import settings
 logging = settings.LOG
+from django.db import transaction
 
-from .settings import VIDEO_DOWNLOAD_QUEUE_FILE
+from .models import VideoQueueItem
+from .settings import VIDEO_DOWNLOAD_CLAIM_TIMEOUT, VIDEO_DOWNLOAD_MAX_ATTEMPTS
 
 class VideoQueue(object):
     """
@@ -11,59 +13,103 @@ class VideoQueue(object):
     It is written to by functions that manipulate the queue,
     and read from by the videodownload management command that
     ultimately downloads the videos.
+
+    The queue lives in the database (see VideoQueueItem), so that the web server
+    and any number of download processes can use it at once: a video is only
+    handed out to the first download that claims it.
     """
 
-    def __init__(self):
+    @transaction.commit_on_success
+    def add_files(self, files, language=None, priority=0):
+        """
+        Add files to the queue - this should be a dict of youtube_ids to titles,
+        and optionally, the language of the videos.
+        Videos that are already queued keep their place, but take the new language, and
+        the new priority if it's higher; failed ones are tried again.
+        """
+        queued_ids = set()
+        youtube_ids = files.keys()
+        for i in range(0, len(youtube_ids), 500):
+            queued_ids.update(VideoQueueItem.objects
+                .filter(youtube_id__in=youtube_ids[i:i + 500])
+                .values_list("youtube_id", flat=True))
+
+        VideoQueueItem.objects.bulk_create([
+            VideoQueueItem(youtube_id=youtube_id, title=title, language=language, priority=priority)
+            for youtube_id, title in files.items() if youtube_id not in queued_ids
+        ], batch_size=100)
+
+        queued_ids = list(queued_ids)
+        for i in range(0, len(queued_ids), 500):
+            items = VideoQueueItem.objects.filter(youtube_id__in=queued_ids[i:i + 500])
+            if language:
+                items.update(language=language)
+            items.filter(priority__lt=priority).update(priority=priority)
+            items.filter(status=VideoQueueItem.FAILED) \
+                .update(status=VideoQueueItem.QUEUED, attempts=0, last_error=None, queued_at=datetime.datetime.now())
 
-        self.load()
+    def claim(self):
+        """
+        Mark the next video to download as in progress, and return it as a dict,
+        or None if there's nothing left to download.
+        """
+        self.requeue_stale_claims()
+        while True:
+            video = VideoQueueItem.objects \
+                .filter(status=VideoQueueItem.QUEUED) \
+                .order_by("-priority", "queued_at", "id") \
+                .values("id", "youtube_id", "title", "language", "attempts")[:1]
+            if not video:
+                return None
+            video = video[0]
+            # Only one of any processes racing for this video will get to update it
+            claimed = VideoQueueItem.objects \
+                .filter(id=video["id"], status=VideoQueueItem.QUEUED) \
+                .update(status=VideoQueueItem.IN_PROGRESS, attempts=video["attempts"] + 1, claimed_at=datetime.datetime.now())
+            if claimed:
+                video["attempts"] += 1
+                return video
 
-    def add_files(self, files, language=None):
+    def touch(self, youtube_ids):
         """
-        Add files to the queue - this should be a list of youtube_ids
-        and optionally, the language of the video.
+        Record that the downloads of these videos are still going, so they aren't requeued.
         """
-        files = [{"youtube_id": key, "title": value, "language": language} for key, value in files.items()]
-        files.extend(self.queue)
-        self.queue = files
-        self.save()
+        VideoQueueItem.objects \
+            .filter(youtube_id__in=youtube_ids, status=VideoQueueItem.IN_PROGRESS) \
+            .update(claimed_at=datetime.datetime.now())
 
-    def save(self):
-        """Save the current queue to disk"""
-        try:
-            with open(VIDEO_DOWNLOAD_QUEUE_FILE, "w") as f:
-                json.dump(self.queue, f)
-        except IOError:
-            logging.warn("Failed to save video queue file.")
+    def requeue_stale_claims(self):
+        """
+        Put back videos claimed by downloads that have stopped reporting, e.g. because their process died.
+        """
+        timeout = datetime.datetime.now() - datetime.timedelta(seconds=VIDEO_DOWNLOAD_CLAIM_TIMEOUT)
+        VideoQueueItem.objects \
+            .filter(status=VideoQueueItem.IN_PROGRESS, claimed_at__lt=timeout) \
+            .update(status=VideoQueueItem.QUEUED)
 
-    def load(self):
-        """Load the queue from disk, or default to an empty list"""
-        try:
-            with open(VIDEO_DOWNLOAD_QUEUE_FILE, "r") as f:
-                self.queue = json.load(f) or []
-        except (IOError, ValueError):
-            self.queue = []
+    def complete(self, youtube_id):
+        """The video has been downloaded, so take it off the queue."""
+        VideoQueueItem.objects.filter(youtube_id=youtube_id).delete()
 
-    def remove_file(self, youtube_id):
-        """Remove the last file from the list, and check that it matches the passed in youtube_id"""
-        try:
-            removed_file = self.queue.pop()
-            if removed_file.get("youtube_id") != youtube_id:
-                logging.warn("Tried to remove {youtube_id} from file queue but found {removed_file} instead.".format(youtube_id=youtube_id, removed_file=removed_file.get("youtube_id")))
-            else:
-                self.save()
-        except IndexError:
-            logging.warn("Tried to remove {youtube_id} from file queue, but was empty instead.".format(youtube_id=youtube_id))
+    def fail(self, youtube_id, error=None, retry=True):
+        """
+        Give up on downloading the video for now. Unless retry is False, or it has been
+        tried VIDEO_DOWNLOAD_MAX_ATTEMPTS times already, it goes to the back of the queue.
+        :return: whether the video will be tried again.
+        """
+        requeued = VideoQueueItem.objects \
+            .filter(youtube_id=youtube_id, attempts__lt=VIDEO_DOWNLOAD_MAX_ATTEMPTS if retry else 0) \
+            .update(status=VideoQueueItem.QUEUED, last_error=error, queued_at=datetime.datetime.now())
+        if not requeued:
+            VideoQueueItem.objects \
+                .filter(youtube_id=youtube_id) \
+                .update(status=VideoQueueItem.FAILED, last_error=error)
+        return bool(requeued)
 
     def clear(self):
         """Clear all currently queued videos"""
-        self.queue = []
-        self.save()
-
-    def next(self):
-        try:
-            return self.queue[-1]
-        except IndexError:
-            return None
+        VideoQueueItem.objects.all().delete()
 
     def count(self):
-        return len(self.queue)
+        """Number of videos still to download, including those being downloaded."""
+        return VideoQueueItem.objects.exclude(status=VideoQueueItem.FAILED).count()
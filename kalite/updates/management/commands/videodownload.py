@@ -1,6 +1,8 @@
 """
 """
 import os
+import Queue
+import threading
 import youtube_dl
 import time
 from functools import partial
@@ -13,6 +15,7 @@ from django.utils.translation import ugettext as _
 from kalite.updates.management.utils import UpdatesDynamicCommand
 from ...videos import download_video
 from ...download_track import VideoQueue
+from ...settings import VIDEO_DOWNLOAD_MAX_RATE, VIDEO_DOWNLOAD_WORKERS
 from fle_utils import set_process_priority
 from fle_utils.videos import DownloadCancelled, URLNotFound
 from fle_utils.chronograph.management.croncommand import CronCommand
@@ -47,64 +50,116 @@ class Command(UpdatesDynamicCommand, CronCommand):
             default=False,
             help=_('Create cached files'),
             metavar="AUTO_CACHE"),
+        make_option('-w', '--workers',
+            action='store',
+            dest='workers',
+            type='int',
+            default=VIDEO_DOWNLOAD_WORKERS,
+            help=_('Number of videos to download at the same time')),
+        make_option('-r', '--max-rate',
+            action='store',
+            dest='max_rate',
+            type='int',
+            default=VIDEO_DOWNLOAD_MAX_RATE,
+            help=_('Bandwidth cap for each video being downloaded, in kilobytes per second (0 for none)')),
     )
 
     option_list = UpdatesDynamicCommand.option_list + CronCommand.unique_option_list + unique_option_list
 
 
     def download_progress_callback(self, videofile, percent):
-
-        video_changed = (not self.video) or self.video.get("youtube_id") != videofile.get("youtube_id")
-        video_done = self.video and percent == 100
-        video_error = self.video and not video_changed and (percent - self.video.get("percent_complete", 0) > 50)
-
-        if self.video and (percent - self.video.get("percent_complete", 0)) < 1 and not video_done and not video_changed and not video_error:
-            return
-
-        self.video = videofile
-
-        video_queue = VideoQueue()
-
+        """
+        Called from the worker threads. Only records the progress, which is reported
+        by the main thread (see report_progress), and stops the download if cancelled.
+        """
+        if self.cancelled.is_set():
+            raise DownloadCancelled()
+        self.progress[videofile.get("youtube_id")] = percent
+
+
+    def download(self, video, max_bytes_per_second=None):
+        """
+        Download a single video, in a worker thread, and report the outcome to self.results.
+        """
+        progress_callback = partial(self.download_progress_callback, video)
         try:
-            if not video_queue.count():
-                raise DownloadCancelled()
+            # Don't try to download a file that already exists in the content dir - just say it was successful
+            # and call it a day!
+            if not os.path.exists(os.path.join(settings.CONTENT_ROOT, "{id}.mp4".format(id=video.get("youtube_id")))):
 
-            else:
-                if video_error:
-                    self.video["percent_complete"] = 0
-                    return
+                try:
+                    # Download via urllib
+                    download_video(video.get("youtube_id"), callback=progress_callback, max_bytes_per_second=max_bytes_per_second)
+
+                except URLNotFound:
+                    # Video was not found on amazon cloud service,
+                    #   either due to a KA mistake, or due to the fact
+                    #   that it's a dubbed video.
+                    #
+                    # We can use youtube-dl to get that video!!
+                    logging.debug(_("Retrieving youtube video %(youtube_id)s via youtube-dl") % {"youtube_id": video.get("youtube_id")})
+
+                    def youtube_dl_cb(stats, progress_callback, *args, **kwargs):
+                        if stats['status'] == "finished":
+                            percent = 100.
+                        elif stats['status'] == "downloading":
+                            percent = 100. * stats['downloaded_bytes'] / stats['total_bytes']
+                        else:
+                            percent = 0.
+                        progress_callback(percent=percent)
+                    scrape_video(video.get("youtube_id"), quiet=not settings.DEBUG, callback=partial(youtube_dl_cb, progress_callback=progress_callback))
+
+            self.results.put((video, None))
 
-                elif (percent - self.video.get("percent_complete", 0)) >= 1 or video_done or video_changed:
-                    # Update to output (saved in chronograph log, so be a bit more efficient
-                    if int(percent) % 5 == 0 or percent == 100:
-                        self.stdout.write("%d\n" % percent)
+        except Exception as e:
+            self.results.put((video, e))
 
-                    self.video["percent_complete"] = percent
 
-                # update progress data
-                video_node = get_video_from_youtube_id(self.video.get("youtube_id"))
-                video_title = (video_node and video_node.get("title")) or self.video.get("title")
+    def report_progress(self, in_flight):
+        """
+        Report the progress of the video that has been downloading the longest.
+        """
+        if not in_flight:
+            return
+        # Keep our claim on the videos being downloaded
+        if time.time() - self.last_touched > 60:
+            VideoQueue().touch([v.get("youtube_id") for v in in_flight])
+            self.last_touched = time.time()
+
+        video = in_flight[0]
+        percent = self.progress.get(video.get("youtube_id"), 0)
 
-                # Calling update_stage, instead of next_stage when stage changes, will auto-call next_stage appropriately.
-                self.update_stage(stage_name=self.video.get("youtube_id"), stage_percent=percent/100., notes=_("Downloading '%(video_title)s'") % {"video_title": _(video_title)})
+        if self.video.get("youtube_id") == video.get("youtube_id") and percent - self.video.get("percent_complete", 0) < 1:
+            return
 
-                if percent == 100:
-                    self.video = {}
+        # Update to output (saved in chronograph log, so be a bit more efficient
+        if int(percent) / 5 != int(self.video.get("percent_complete", 0)) / 5 or self.video.get("youtube_id") != video.get("youtube_id"):
+            self.stdout.write("%d\n" % percent)
 
-        except DownloadCancelled as de:
-            if self.video:
-                self.stdout.write(_("Download cancelled!") + "\n")
+        self.video = video
+        self.video["percent_complete"] = percent
 
-                self.video = {}
+        # update progress data
+        video_node = get_video_from_youtube_id(video.get("youtube_id"))
+        video_title = (video_node and video_node.get("title")) or video.get("title")
 
-            # Progress info will be updated when this exception is caught.
-            raise
+        # Calling update_stage, instead of next_stage when stage changes, will auto-call next_stage appropriately.
+        self.update_stage(stage_name=video.get("youtube_id"), stage_percent=percent/100., notes=_("Downloading '%(video_title)s'") % {"video_title": _(video_title)})
 
 
     def handle(self, *args, **options):
         self.setup(options)
         self.video = {}
 
+        # Shared with the worker threads
+        self.progress = {}  # percent complete, by youtube_id
+        self.results = Queue.Queue()
+        self.cancelled = threading.Event()
+        self.last_touched = time.time()
+
+        max_bytes_per_second = options["max_rate"] * 1024 or None
+        in_flight = []  # videos being downloaded, in the order they were started
+
         handled_youtube_ids = []  # stored to deal with caching
         failed_youtube_ids = []  # stored to avoid requerying failures.
 
@@ -113,89 +168,86 @@ class Command(UpdatesDynamicCommand, CronCommand):
         try:
             while True:
                 # loop until the method is aborted
-                # Grab any video that hasn't been tried yet
-
                 video_queue = VideoQueue()
 
                 video_count = video_queue.count()
                 if video_count == 0:
-                    self.stdout.write(_("Nothing to download; exiting.") + "\n")
+                    if in_flight:
+                        # The queue was cleared, which is how downloads are cancelled
+                        self.cancelled.set()
+                    else:
+                        self.stdout.write(_("Nothing to download; exiting.") + "\n")
+                        break
+                if self.cancelled.is_set() and not in_flight:
                     break
 
-                # Grab a video as OURS to handle, set fields to indicate to others that we're on it!
-                # Update the video logging
-                video = video_queue.next()
+                # Grab any videos that aren't being downloaded yet, up to the number of workers
+                while not self.cancelled.is_set() and len(in_flight) < max(options["workers"], 1):
+                    # Grab a video as OURS to handle; other processes won't get it
+                    video = video_queue.claim()
+                    if not video:
+                        break
 
-                video["download_in_progress"] = True
-                video["percent_complete"] = 0
-                self.stdout.write((_("Downloading video '%(youtube_id)s'...") + "\n") % {"youtube_id": video.get("youtube_id")})
+                    video["download_in_progress"] = True
+                    video["percent_complete"] = 0
+                    self.stdout.write((_("Downloading video '%(youtube_id)s'...") + "\n") % {"youtube_id": video.get("youtube_id")})
 
-                # Update the progress logging
-                self.set_stages(num_stages=video_count + len(handled_youtube_ids) + len(failed_youtube_ids) + int(options["auto_cache"]))
-                if not self.started():
-                    self.start(stage_name=video.get("youtube_id"))
+                    # Update the progress logging
+                    self.set_stages(num_stages=video_count + len(handled_youtube_ids) + len(failed_youtube_ids) + int(options["auto_cache"]))
+                    if not self.started():
+                        self.start(stage_name=video.get("youtube_id"))
+
+                    in_flight.append(video)
+                    worker = threading.Thread(target=self.download, args=(video, max_bytes_per_second))
+                    worker.daemon = True
+                    worker.start()
 
-                # Initiate the download process
                 try:
+                    video, error = self.results.get(timeout=1)
+                except Queue.Empty:
+                    self.report_progress(in_flight)
+                    continue
 
-                    progress_callback = partial(self.download_progress_callback, video)
-
-                    # Don't try to download a file that already exists in the content dir - just say it was successful
-                    # and call it a day!
-                    if not os.path.exists(os.path.join(settings.CONTENT_ROOT, "{id}.mp4".format(id=video.get("youtube_id")))):
-
-                        try:
-                            # Download via urllib
-                            download_video(video.get("youtube_id"), callback=progress_callback)
-
-                        except URLNotFound:
-                            # Video was not found on amazon cloud service,
-                            #   either due to a KA mistake, or due to the fact
-                            #   that it's a dubbed video.
-                            #
-                            # We can use youtube-dl to get that video!!
-                            logging.debug(_("Retrieving youtube video %(youtube_id)s via youtube-dl") % {"youtube_id": video.get("youtube_id")})
-
-                            def youtube_dl_cb(stats, progress_callback, *args, **kwargs):
-                                if stats['status'] == "finished":
-                                    percent = 100.
-                                elif stats['status'] == "downloading":
-                                    percent = 100. * stats['downloaded_bytes'] / stats['total_bytes']
-                                else:
-                                    percent = 0.
-                                progress_callback(percent=percent)
-                            scrape_video(video.get("youtube_id"), quiet=not settings.DEBUG, callback=partial(youtube_dl_cb, progress_callback=progress_callback))
-
-                        except IOError as e:
-                            logging.exception(e)
-                            failed_youtube_ids.append(video.get("youtube_id"))
-                            video_queue.remove_file(video.get("youtube_id"))
-                            time.sleep(10)
-                            continue
+                in_flight.remove(video)
+                self.progress.pop(video.get("youtube_id"), None)
+                video_queue = VideoQueue()
 
+                if error is None:
                     # If we got here, we downloaded ... somehow :)
+                    if self.video is video:
+                        self.stdout.write("%d\n" % 100)
+                        self.update_stage(stage_percent=1.)
+                        self.video = {}
                     handled_youtube_ids.append(video.get("youtube_id"))
-                    video_queue.remove_file(video.get("youtube_id"))
+                    video_queue.complete(video.get("youtube_id"))
                     self.stdout.write(_("Download is complete!") + "\n")
 
                     annotate_content_models_by_youtube_id(youtube_ids=[video.get("youtube_id")], language=video.get("language"))
 
-                except DownloadCancelled:
+                elif isinstance(error, DownloadCancelled):
                     # Cancellation event
+                    if self.video:
+                        self.stdout.write(_("Download cancelled!") + "\n")
+                        self.video = {}
                     video_queue.clear()
                     failed_youtube_ids.append(video.get("youtube_id"))
 
-                except Exception as e:
+                elif isinstance(error, IOError):
+                    # What we got is kept, and resumed when the video comes up again.
+                    logging.error(_("Error in downloading %(youtube_id)s: %(error_msg)s") % {"youtube_id": video.get("youtube_id"), "error_msg": unicode(error)})
+                    if not video_queue.fail(video.get("youtube_id"), error=unicode(error)):
+                        failed_youtube_ids.append(video.get("youtube_id"))
+
+                else:
                     # On error, report the error, mark the video as not downloaded,
                     #   and allow the loop to try other videos.
-                    msg = _("Error in downloading %(youtube_id)s: %(error_msg)s") % {"youtube_id": video.get("youtube_id"), "error_msg": unicode(e)}
+                    msg = _("Error in downloading %(youtube_id)s: %(error_msg)s") % {"youtube_id": video.get("youtube_id"), "error_msg": unicode(error)}
                     self.stderr.write("%s\n" % msg)
 
                     # Rather than getting stuck on one video, continue to the next video.
                     self.update_stage(stage_status="error", notes=_("%(error_msg)s; continuing to next video.") % {"error_msg": msg})
                     failed_youtube_ids.append(video.get("youtube_id"))
-                    video_queue.remove_file(video.get("youtube_id"))
-                    continue
+                    video_queue.fail(video.get("youtube_id"), error=msg, retry=False)
 
             # Update
             self.complete(notes=_("Downloaded %(num_handled_videos)s of %(num_total_videos)s videos successfully.") % {
@@ -204,5 +256,9 @@ class Command(UpdatesDynamicCommand, CronCommand):
             })
 
         except Exception as e:
+            # Stop the workers before giving up, and let someone else have their videos
+            self.cancelled.set()
+            for video in in_flight:
+                VideoQueue().fail(video.get("youtube_id"), error=unicode(e))
             self.cancel(stage_status="error", notes=_("Error: %(error_msg)s") % {"error_msg": e})
             raise
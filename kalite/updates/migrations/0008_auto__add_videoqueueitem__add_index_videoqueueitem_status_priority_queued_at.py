@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'VideoQueueItem'
+        db.create_table(u'updates_videoqueueitem', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('youtube_id', self.gf('django.db.models.fields.CharField')(unique=True, max_length=20)),
+            ('title', self.gf('django.db.models.fields.TextField')(null=True, blank=True)),
+            ('language', self.gf('django.db.models.fields.CharField')(max_length=8, null=True, blank=True)),
+            ('priority', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('status', self.gf('django.db.models.fields.CharField')(default='queued', max_length=16)),
+            ('attempts', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('last_error', self.gf('django.db.models.fields.TextField')(null=True, blank=True)),
+            ('queued_at', self.gf('django.db.models.fields.DateTimeField')(default=datetime.datetime.now)),
+            ('claimed_at', self.gf('django.db.models.fields.DateTimeField')(null=True, blank=True)),
+        ))
+        db.send_create_signal(u'updates', ['VideoQueueItem'])
+
+        # Adding index on 'VideoQueueItem', fields ['status', 'priority', 'queued_at']
+        db.create_index(u'updates_videoqueueitem', ['status', 'priority', 'queued_at'])
+
+    def backwards(self, orm):
+        # Removing index on 'VideoQueueItem', fields ['status', 'priority', 'queued_at']
+        db.delete_index(u'updates_videoqueueitem', ['status', 'priority', 'queued_at'])
+
+        # Deleting model 'VideoQueueItem'
+        db.delete_table(u'updates_videoqueueitem')
+
+
+    models = {
+        u'updates.updateprogresslog': {
+            'Meta': {'object_name': 'UpdateProgressLog'},
+            'cancel_requested': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'completed': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'current_stage': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'end_time': ('django.db.models.fields.DateTimeField', [], {'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'notes': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'process_name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'process_percent': ('django.db.models.fields.FloatField', [], {'default': '0'}),
+            'stage_name': ('django.db.models.fields.CharField', [], {'max_length': '100', 'null': 'True'}),
+            'stage_percent': ('django.db.models.fields.FloatField', [], {'default': '0'}),
+            'stage_status': ('django.db.models.fields.CharField', [], {'max_length': '16', 'null': 'True'}),
+            'start_time': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'total_stages': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'})
+        },
+        u'updates.videoqueueitem': {
+            'Meta': {'object_name': 'VideoQueueItem', 'index_together': "[['status', 'priority', 'queued_at']]"},
+            'attempts': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'claimed_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'language': ('django.db.models.fields.CharField', [], {'max_length': '8', 'null': 'True', 'blank': 'True'}),
+            'last_error': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'priority': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'queued_at': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'status': ('django.db.models.fields.CharField', [], {'default': "'queued'", 'max_length': '16'}),
+            'title': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'youtube_id': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '20'})
+        }
+    }
+
+    complete_apps = ['updates']
\ No newline at end of file
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import DataMigration
+from django.db import models
+
+from kalite.updates.settings import VIDEO_DOWNLOAD_QUEUE_FILE
+
+# The old queue file is kept under this name, rather than deleted, in case the migration doesn't go through
+IMPORTED_QUEUE_FILE = VIDEO_DOWNLOAD_QUEUE_FILE + ".imported"
+
+
+class Migration(DataMigration):
+
+    def forwards(self, orm):
+        # Move any videos still waiting in the old JSON queue file over to the new table
+        if db.dry_run or not os.path.exists(VIDEO_DOWNLOAD_QUEUE_FILE):
+            return
+        try:
+            with open(VIDEO_DOWNLOAD_QUEUE_FILE, "r") as f:
+                queue = json.load(f) or []
+        except (IOError, ValueError):
+            queue = []
+        # The old queue was downloaded from the end
+        for video in reversed(queue):
+            orm['updates.VideoQueueItem'].objects.get_or_create(youtube_id=video["youtube_id"], defaults={
+                "title": video.get("title"),
+                "language": video.get("language"),
+            })
+        os.rename(VIDEO_DOWNLOAD_QUEUE_FILE, IMPORTED_QUEUE_FILE)
+
+    def backwards(self, orm):
+        if not db.dry_run and os.path.exists(IMPORTED_QUEUE_FILE) and not os.path.exists(VIDEO_DOWNLOAD_QUEUE_FILE):
+            os.rename(IMPORTED_QUEUE_FILE, VIDEO_DOWNLOAD_QUEUE_FILE)
+
+    models = {
+        u'updates.updateprogresslog': {
+            'Meta': {'object_name': 'UpdateProgressLog'},
+            'cancel_requested': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'completed': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'current_stage': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'end_time': ('django.db.models.fields.DateTimeField', [], {'null': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'notes': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'process_name': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'process_percent': ('django.db.models.fields.FloatField', [], {'default': '0'}),
+            'stage_name': ('django.db.models.fields.CharField', [], {'max_length': '100', 'null': 'True'}),
+            'stage_percent': ('django.db.models.fields.FloatField', [], {'default': '0'}),
+            'stage_status': ('django.db.models.fields.CharField', [], {'max_length': '16', 'null': 'True'}),
+            'start_time': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'total_stages': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'})
+        },
+        u'updates.videoqueueitem': {
+            'Meta': {'object_name': 'VideoQueueItem', 'index_together': "[['status', 'priority', 'queued_at']]"},
+            'attempts': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'claimed_at': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'language': ('django.db.models.fields.CharField', [], {'max_length': '8', 'null': 'True', 'blank': 'True'}),
+            'last_error': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'priority': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'queued_at': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'status': ('django.db.models.fields.CharField', [], {'default': "'queued'", 'max_length': '16'}),
+            'title': ('django.db.models.fields.TextField', [], {'null': 'True', 'blank': 'True'}),
+            'youtube_id': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '20'})
+        }
+    }
+
+    complete_apps = ['updates']
+    symmetrical = True
@@ -184,6 +184,39 @@ class UpdateProgressLog(ExtendedModel):
         return log
 
 
+class VideoQueueItem(models.Model):
+    """
+    A video waiting to be downloaded by the videodownload command, see download_track.VideoQueue.
+    Completed downloads are deleted; videos that keep failing are kept with status FAILED.
+    """
+    QUEUED = "queued"
+    IN_PROGRESS = "in_progress"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, _("queued")),
+        (IN_PROGRESS, _("in progress")),
+        (FAILED, _("failed")),
+    )
+
+    youtube_id = models.CharField(max_length=20, unique=True)
+    title = models.TextField(blank=True, null=True)
+    language = models.CharField(max_length=8, blank=True, null=True)
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    queued_at = models.DateTimeField(default=datetime.datetime.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        index_together = [
+            ["status", "priority", "queued_at"],
+        ]
+
+    def __unicode__(self):
+        return u"%s (%s, %d attempts)" % (self.youtube_id, self.status, self.attempts)
+
+
 # Signals
 
 @receiver(post_save, sender=Job)
@@ -12,4 +12,17 @@ only on django.conf.settings
 import os
 from django.conf import settings
 
+# Where the video download queue used to be kept, before it moved to the database (see VideoQueueItem)
 VIDEO_DOWNLOAD_QUEUE_FILE = os.path.join(settings.USER_DATA_ROOT, "videos_to_download.json")
+
+# How many times a video is tried before it's marked as failed
+VIDEO_DOWNLOAD_MAX_ATTEMPTS = getattr(settings, "VIDEO_DOWNLOAD_MAX_ATTEMPTS", 3)
+
+# Seconds after which a video claimed by a download that has stopped reporting is put back in the queue
+VIDEO_DOWNLOAD_CLAIM_TIMEOUT = getattr(settings, "VIDEO_DOWNLOAD_CLAIM_TIMEOUT", 30 * 60)
+
+# How many videos the videodownload command downloads at the same time
+VIDEO_DOWNLOAD_WORKERS = getattr(settings, "VIDEO_DOWNLOAD_WORKERS", 2)
+
+# Bandwidth cap for each video being downloaded, in kilobytes per second, or 0 for none
+VIDEO_DOWNLOAD_MAX_RATE = getattr(settings, "VIDEO_DOWNLOAD_MAX_RATE", 0)
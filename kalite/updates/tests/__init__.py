@@ -2,4 +2,6 @@ from api_tests import *
 from availability_tests import *
 from base import *
 from class_tests import *
+from download_tests import *
 from regression_tests import *
+from scheduler_tests import *
@@ -0,0 +1,195 @@
+"""
+Testing of the video download queue, and of resumable video downloads
+"""
+import datetime
+import os
+import shutil
+import socket
+import tempfile
+
+from django.utils import unittest
+from mock import patch, MagicMock
+
+from fle_utils import videos
+from fle_utils.internet import download
+
+from .base import UpdatesTestCase
+from ..download_track import VideoQueue
+from ..models import VideoQueueItem
+
+VIDEO_DATA = "0123456789" * 100
+
+
+def fake_get(data, fail_after=None):
+    """
+    Mock for requests.get, which serves data, honouring Range headers, and
+    optionally drops the connection after sending fail_after bytes.
+    """
+    def get(url, headers=None, **kwargs):
+        start = int(headers["range"][len("bytes="):-1]) if "range" in (headers or {}) else 0
+        body = data[start:]
+        response = MagicMock()
+        response.status_code = 206 if start else 200
+        response.headers = {"content-length": str(len(body))}
+        if start:
+            response.headers["content-range"] = "bytes %d-%d/%d" % (start, len(data) - 1, len(data))
+
+        def iter_content(chunk_size):
+            # Small chunks, so that the connection can drop part way through
+            for i in range(0, len(body), 100):
+                if fail_after is not None and start + i >= fail_after:
+                    raise socket.timeout("timed out")
+                yield body[i:i + 100]
+        response.iter_content = iter_content
+        return response
+    return get
+
+
+class ResumableDownloadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.download_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.download_path)
+
+    def test_download_file_resumes_partial_file(self):
+        dst = os.path.join(self.download_path, "video.mp4")
+        with open(dst, "wb") as f:
+            f.write(VIDEO_DATA[:300])
+
+        with patch.object(download.requests, "get", side_effect=fake_get(VIDEO_DATA)) as get:
+            response = download.download_file("http://example.com/video.mp4", dst, callback=lambda fraction: None, resume=True)
+
+        self.assertEqual(get.call_args[1]["headers"]["range"], "bytes=300-")
+        self.assertEqual(download.get_total_size(response), len(VIDEO_DATA))
+        with open(dst, "rb") as f:
+            self.assertEqual(f.read(), VIDEO_DATA)
+
+    @patch.object(videos.time, "sleep")
+    def test_download_video_keeps_partial_file_after_network_error(self, sleep):
+        partial_path = os.path.join(self.download_path, "abc.mp4" + videos.PARTIAL_SUFFIX)
+
+        with patch.object(download.requests, "get", side_effect=fake_get(VIDEO_DATA, fail_after=500)):
+            with self.assertRaises(socket.timeout):
+                videos.download_video("abc", self.download_path, retries=0)
+        self.assertEqual(os.path.getsize(partial_path), 500)
+        self.assertFalse(os.path.exists(os.path.join(self.download_path, "abc.mp4")))
+
+        # The next attempt picks up from where the last one stopped
+        with patch.object(download.requests, "get", side_effect=fake_get(VIDEO_DATA)) as get:
+            videos.download_video("abc", self.download_path)
+        self.assertEqual(get.call_args_list[0][1]["headers"]["range"], "bytes=500-")
+        self.assertFalse(os.path.exists(partial_path))
+        with open(os.path.join(self.download_path, "abc.mp4"), "rb") as f:
+            self.assertEqual(f.read(), VIDEO_DATA)
+
+    @patch.object(videos.time, "sleep")
+    def test_download_video_retries_dropped_connection(self, sleep):
+        get = fake_get(VIDEO_DATA, fail_after=500)
+        calls = []
+
+        def flaky_get(url, headers=None, **kwargs):
+            calls.append(headers.get("range"))
+            # Only the first request for the video drops
+            return (get if len(calls) == 1 else fake_get(VIDEO_DATA))(url, headers=headers, **kwargs)
+
+        with patch.object(download.requests, "get", side_effect=flaky_get):
+            videos.download_video("abc", self.download_path, retries=1)
+        self.assertEqual(calls[:2], [None, "bytes=500-"])
+        self.assertEqual(os.path.getsize(os.path.join(self.download_path, "abc.mp4")), len(VIDEO_DATA))
+
+
+    def test_download_video_resumes_thumbnail(self):
+        # Both the video and its thumbnail were (all but) downloaded by an earlier attempt
+        with open(os.path.join(self.download_path, "abc.mp4" + videos.PARTIAL_SUFFIX), "wb") as f:
+            f.write(VIDEO_DATA)
+        with open(os.path.join(self.download_path, "abc.png"), "wb") as f:
+            f.write(VIDEO_DATA[:700])
+
+        with patch.object(download.requests, "get", side_effect=fake_get(VIDEO_DATA)):
+            videos.download_video("abc", self.download_path)
+        self.assertEqual(os.path.getsize(os.path.join(self.download_path, "abc.mp4")), len(VIDEO_DATA))
+        self.assertEqual(os.path.getsize(os.path.join(self.download_path, "abc.png")), len(VIDEO_DATA))
+
+    def test_download_video_keeps_complete_video_if_thumbnail_fails(self):
+        video_get = fake_get(VIDEO_DATA)
+
+        def get(url, headers=None, **kwargs):
+            if url.endswith(".png"):
+                response = MagicMock()
+                response.status_code = 404
+                response.headers = {}
+                response.iter_content = lambda chunk_size: iter([])
+                return response
+            return video_get(url, headers=headers, **kwargs)
+
+        with patch.object(download.requests, "get", side_effect=get):
+            with self.assertRaises(Exception):
+                videos.download_video("abc", self.download_path)
+        self.assertEqual(os.path.getsize(os.path.join(self.download_path, "abc.mp4" + videos.PARTIAL_SUFFIX)), len(VIDEO_DATA))
+
+
+class VideoQueueTests(UpdatesTestCase):
+
+    def setUp(self):
+        super(VideoQueueTests, self).setUp()
+        self.queue = VideoQueue()
+        self.queue.add_files({"first": "First"}, language="en")
+        self.queue.add_files({"second": "Second"}, language="en")
+
+    def test_claim_in_order(self):
+        self.queue.add_files({"urgent": "Urgent"}, priority=1)
+        self.assertEqual(self.queue.claim()["youtube_id"], "urgent")
+        self.assertEqual(self.queue.claim()["youtube_id"], "first")
+        self.assertEqual(self.queue.claim()["youtube_id"], "second")
+        self.assertEqual(self.queue.claim(), None)
+        # Videos being downloaded are still in the queue until they're complete
+        self.assertEqual(self.queue.count(), 3)
+
+        self.queue.complete("first")
+        self.assertEqual(self.queue.count(), 2)
+
+    def test_claimed_video_isnt_handed_out_twice(self):
+        video = self.queue.claim()
+        self.assertEqual(video["attempts"], 1)
+        self.assertNotEqual(VideoQueue().claim()["youtube_id"], video["youtube_id"])
+
+    def test_adding_queued_video_keeps_its_place(self):
+        self.queue.add_files({"first": "First"}, language="en")
+        self.assertEqual(VideoQueueItem.objects.count(), 2)
+        self.assertEqual(self.queue.claim()["youtube_id"], "first")
+
+    def test_adding_queued_video_updates_language_and_priority(self):
+        self.queue.add_files({"second": "Second"}, language="es", priority=1)
+        self.assertEqual(self.queue.claim()["youtube_id"], "second")
+        self.assertEqual(VideoQueueItem.objects.get(youtube_id="second").language, "es")
+
+        # A lower priority doesn't demote it
+        self.queue.add_files({"second": "Second"})
+        item = VideoQueueItem.objects.get(youtube_id="second")
+        self.assertEqual((item.language, item.priority), ("es", 1))
+
+    @patch("kalite.updates.download_track.VIDEO_DOWNLOAD_MAX_ATTEMPTS", 2)
+    def test_failed_video_is_retried_then_given_up(self):
+        self.queue.claim()
+        self.assertTrue(self.queue.fail("first", error="timed out"))
+        # Retries go to the back of the queue
+        self.assertEqual(self.queue.claim()["youtube_id"], "second")
+        self.assertEqual(self.queue.claim()["youtube_id"], "first")
+        self.assertFalse(self.queue.fail("first", error="timed out again"))
+
+        item = VideoQueueItem.objects.get(youtube_id="first")
+        self.assertEqual(item.status, VideoQueueItem.FAILED)
+        self.assertEqual(item.last_error, "timed out again")
+        self.assertEqual(self.queue.count(), 1)
+
+        # Queuing the video again gives it another chance
+        self.queue.add_files({"first": "First"})
+        self.assertEqual(self.queue.claim()["youtube_id"], "first")
+
+    @patch("kalite.updates.download_track.VIDEO_DOWNLOAD_CLAIM_TIMEOUT", 0)
+    def test_stale_claim_is_requeued(self):
+        self.assertEqual(self.queue.claim()["youtube_id"], "first")
+        VideoQueueItem.objects.filter(youtube_id="first").update(claimed_at=datetime.datetime.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(self.queue.claim()["youtube_id"], "first")
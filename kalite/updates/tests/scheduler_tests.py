@@ -0,0 +1,127 @@
+"""
+Testing of the job scheduler that runs update jobs, and of how job output is logged
+"""
+import datetime
+import sys
+import threading
+from StringIO import StringIO
+
+from mock import patch
+
+from fle_utils import set_process_priority
+from fle_utils.chronograph import scheduler as scheduler_module
+from fle_utils.chronograph.models import Job, Log
+from fle_utils.chronograph.output import redirect_output
+from fle_utils.chronograph.scheduler import Scheduler
+from fle_utils.chronograph.utils import force_job
+
+from .base import UpdatesTestCase
+
+
+class RecordingScheduler(Scheduler):
+    """
+    Scheduler which records the jobs it would start, instead of running them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingScheduler, self).__init__(*args, **kwargs)
+        self.started = []
+        self.woken = 0
+
+    def _start(self, job_id):
+        self.started.append(job_id)
+        self._threads[job_id] = None
+
+    def wake(self):
+        self.woken += 1
+        super(RecordingScheduler, self).wake()
+
+
+class JobSchedulerTests(UpdatesTestCase):
+
+    def create_job(self, name, next_run):
+        job = Job(name=name, command="videoscan", frequency="YEARLY")
+        job.save()
+        Job.objects.filter(id=job.id).update(next_run=next_run)
+        return job
+
+    def test_run_due_starts_due_jobs_in_order(self):
+        now = datetime.datetime.now()
+        later = self.create_job("later", now - datetime.timedelta(minutes=1))
+        earlier = self.create_job("earlier", now - datetime.timedelta(minutes=5))
+        self.create_job("over limit", now - datetime.timedelta(seconds=10))
+        self.create_job("future", now + datetime.timedelta(seconds=30))
+
+        scheduler = RecordingScheduler(workers=2, max_wait=600)
+        timeout = scheduler.run_due()
+
+        self.assertEqual(scheduler.started, [earlier.id, later.id])
+        # All workers are busy, so wait to be woken up by one of them
+        self.assertEqual(timeout, 600)
+
+    def test_run_due_waits_until_next_job(self):
+        self.create_job("future", datetime.datetime.now() + datetime.timedelta(seconds=30))
+
+        scheduler = RecordingScheduler(workers=2, max_wait=600)
+        timeout = scheduler.run_due()
+
+        self.assertEqual(scheduler.started, [])
+        self.assertTrue(25 < timeout <= 30, "Should wait until the next job is due, not %s seconds" % timeout)
+
+    def test_force_job_wakes_running_scheduler(self):
+        scheduler = RecordingScheduler()
+        scheduler_module._running_scheduler = scheduler
+        try:
+            force_job("videoscan", "Scan for videos")
+        finally:
+            scheduler_module._running_scheduler = None
+
+        self.assertEqual(scheduler.woken, 1)
+        self.assertEqual(Job.objects.due().count(), 1)
+
+    def test_job_run_logs_output(self):
+        job = Job(name="missing", command="no_such_command", frequency="YEARLY")
+        job.save()
+
+        log = job.run()
+
+        self.assertEqual(Log.objects.get().id, log.id)
+        self.assertFalse(log.success)
+        self.assertIn("no_such_command", log.stderr)
+        self.assertIsNotNone(log.end_date)
+        self.assertFalse(Job.objects.get(id=job.id).last_run_successful)
+
+    def test_job_forced_while_running_runs_again(self):
+        job = Job(name="videoscan", command="videoscan", frequency="YEARLY")
+        job.save()
+
+        def force_during_run(job, stdout=None, stderr=None):
+            force_job("videoscan")
+        with patch.object(Job, "run_management_command", force_during_run):
+            job.run()
+
+        self.assertEqual(Job.objects.due().count(), 1)
+
+    def test_priority_not_changed_from_thread(self):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(set_process_priority.lowest()))
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [False])
+
+    def test_redirect_output_only_affects_current_thread(self):
+        captured = StringIO()
+        other = StringIO()
+
+        def write_from_other_thread():
+            with redirect_output(other, other):
+                sys.stdout.write("other thread")
+
+        with redirect_output(captured, captured):
+            thread = threading.Thread(target=write_from_other_thread)
+            thread.start()
+            thread.join()
+            sys.stdout.write("this thread")
+
+        self.assertEqual(captured.getvalue(), "this thread")
+        self.assertEqual(other.getvalue(), "other thread")
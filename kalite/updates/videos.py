@@ -16,11 +16,11 @@ def get_local_video_size(youtube_id, default=None):
         return default
 
 
-def download_video(youtube_id, format="mp4", callback=None):
+def download_video(youtube_id, format="mp4", callback=None, max_bytes_per_second=None):
     """Downloads the video file to disk (note: this does NOT invalidate any of the cached html files in KA Lite)"""
 
     download_url = ("http://%s/download/videos/" % (settings.CENTRAL_SERVER_HOST)) + "%s/%s"
-    return videos.download_video(youtube_id, settings.CONTENT_ROOT, download_url, format, callback)
+    return videos.download_video(youtube_id, settings.CONTENT_ROOT, download_url, format, callback, max_bytes_per_second=max_bytes_per_second)
 
 
 def delete_downloaded_files(youtube_id):